@@ -13,8 +13,68 @@ endIndex = 2000
 
 isPrint = False
 
+# Draw filters, checked on the action tree before any replay, so filtered-out
+# draws cost nothing. includeFilter/excludeFilter are regexes searched in the
+# draw's marker path ("Marker/Nested marker/Draw name"); requireFlags/skipFlags
+# are ActionFlags names joined by "|" (e.g. "Drawcall|Indexed")
+includeFilter = None
+excludeFilter = None
+minIndices = 0
+requireFlags = None
+skipFlags = None
+
+# Save the textures of exported draws; textureFilter limits them to draws whose
+# marker path matches the regex
+exportTextures = True
+textureFilter = None
+
+# Replay / buffer reuse: draws don't force a full replay, and buffer contents
+# are reused across draws until the capture writes to them
+forceReplay = False
+reuseAcrossDraws = True
+bufferCacheMB = 512
+
+# Writer threads decode and write mesh files while the replay thread moves on;
+# at most queueDepth fetched draws wait in memory (0 threads writes inline)
+writerThreads = 2
+queueDepth = 8
+
+# Per-stage profiling: set to a path prefix to write <prefix>.trace.json
+# (Chrome trace events), <prefix>.summary.json and <prefix>.draws.csv
+profileOutput = None
+
+# Standalone mode only: number of worker processes exporting contiguous
+# shards of the draw range in parallel (also settable with --shards)
+shardCount = 1
+
+# Mesh output format: "csv" (default interchange format) or "meshbin"
+# (header plus raw little-endian column blocks, read by csv_to_obj.py)
+outputFormat = "csv"
+
+# Mesh stage: "vsin" exports the vertex inputs, "vsout" the post-vertex-shader
+# stream of the draw's first instance (skinned/deformed positions, clip space)
+meshStage = "vsin"
+# vsout only: clip-to-world matrix (inverse view-projection) as 16 floats, row
+# major. When set, output positions are written in world space
+postVSWorldMatrix = None
+
+# Per-instance vertex attributes: "table" writes the mesh once plus a compact
+# model_event{N}_instances table with one row per instance; "expand" writes
+# every instance into the mesh, with the per-instance values as extra columns
+instanceMode = "table"
+
+# Content-addressed mesh cache shared across runs and captures: set to a folder
+# to hard-link byte-identical meshes from earlier exports instead of decoding
+# and writing them again. Least recently used entries are evicted past the limit
+meshCacheFolder = None
+meshCacheMB = 4096
+
+# SQLite catalog in folderName with one row per exported draw (counts, bounds,
+# attribute layout, textures, paths), queried by csv_to_obj.py --query. None disables
+catalogName = "catalog.sqlite"
+
 # Import renderdoc if not already imported (e.g. in the UI)
-if 'renderdoc' not in sys.modules and '_renderdoc' not in sys.modules:
+if 'renderdoc' not in globals():
 	import renderdoc
 
 # Alias renderdoc for legibility
@@ -23,153 +83,1014 @@ rd = renderdoc
 # We'll need the struct data to read out of bytes objects
 import struct
 import os
+import json
+import bisect
+import collections
+import threading
+import time
+import queue
+import shutil
+import multiprocessing
+import array
+import itertools
+import hashlib
+import re
+try:
+	import sqlite3
+except ImportError:
+	# Not every embedded Python ships the sqlite3 module; the catalog is skipped then
+	sqlite3 = None
 
 # We base our data on a MeshFormat, but we add some properties
 class MeshData(rd.MeshFormat):
 	indexOffset = 0
+	vertexBufferOffset = 0
 	name = ''
+	restartIndex = None
+	perInstance = False
+	instanceRate = 1
+	instanceOffset = 0
+	numInstances = 1
+	postVS = False
+	clipPosition = False
+
+# Strip topologies, where a restart index starts a new strip
+restartTopologies = set(getattr(rd.Topology, name) for name in dir(rd.Topology)
+	if name in ["LineStrip", "LineStrip_Adj", "TriangleStrip", "TriangleStrip_Adj", "TriangleFan"])
+
+# Names of the primitive topologies, as written to the per-draw JSON and .meshbin header
+topologyNames = dict((getattr(rd.Topology, name), name) for name in dir(rd.Topology)
+	if not name.startswith("_") and isinstance(getattr(rd.Topology, name), int))
+
+# Names of the component types, as written to the per-draw JSON and catalog
+compTypeNames = dict((getattr(rd.CompType, name), name) for name in dir(rd.CompType)
+	if not name.startswith("_") and isinstance(getattr(rd.CompType, name), int))
+
+# Resource usages that modify a buffer's contents
+writeUsages = set(getattr(rd.ResourceUsage, name) for name in dir(rd.ResourceUsage)
+	if name in ["StreamOut", "ColorTarget", "DepthStencilTarget", "Clear", "Discard", "GenMips",
+		"Resolve", "ResolveDst", "Copy", "CopyDst", "CPUWrite"] or name.endswith("_RWResource"))
+
+class BufferCache:
+	"""
+	Run-wide cache of buffer contents. Data fetched at one event is reused by
+	later draws for as long as the capture doesn't write to the buffer in
+	between, which is checked against the resource's usage list. Decoded
+	draws are cached the same way, keyed by their buffer/layout fingerprint.
+	Args:
+		controller: Replay controller used to fetch buffer data
+		maxBytes: Least recently used buffers are evicted past this size
+	"""
+	def __init__(self, controller, maxBytes=512 * 1024 * 1024):
+		self.controller = controller
+		self.maxBytes = maxBytes
+		self.buffers = collections.OrderedDict()
+		self.ranges = {}
+		self.decoded = collections.OrderedDict()
+		self.writeEvents = {}
+		self.totalBytes = 0
+		self.fetchCount = 0
+		self.reuseCount = 0
+		self.decodeReuseCount = 0
+
+	def getWriteEvents(self, resourceId):
+		"""
+		Get the sorted event IDs that write to a resource
+		Args:
+			resourceId: The resource ID to look up
+		Returns:
+			Sorted list of event IDs, or None if usage information isn't available
+		"""
+		key = int(resourceId)
+		if key not in self.writeEvents:
+			try:
+				usage = self.controller.GetUsage(resourceId)
+				self.writeEvents[key] = sorted(u.eventId for u in usage if u.usage in writeUsages)
+			except Exception:
+				self.writeEvents[key] = None
+		return self.writeEvents[key]
+
+	def isUnchanged(self, resourceId, sinceEventId, eventId):
+		"""
+		Check that nothing writes to a resource after sinceEventId up to eventId
+		Args:
+			resourceId: The resource ID to check
+			sinceEventId: Event the cached data was fetched at
+			eventId: Event the data is needed at
+		Returns:
+			True if data fetched at sinceEventId is still valid at eventId
+		"""
+		if sinceEventId == eventId or resourceId == rd.ResourceId.Null():
+			return True
+		if not reuseAcrossDraws or sinceEventId > eventId:
+			return False
+		events = self.getWriteEvents(resourceId)
+		if events is None:
+			return False
+		i = bisect.bisect_right(events, sinceEventId)
+		return i == len(events) or events[i] > eventId
+
+	def get(self, resourceId, byteOffset, eventId, byteSize=0):
+		"""
+		Get byteSize bytes of a buffer starting at byteOffset. A range already
+		fetched as part of a larger, still valid range is sliced out of it.
+		Args:
+			resourceId: The resource ID of the buffer
+			byteOffset: Offset of the first byte needed
+			eventId: Event the data is needed at
+			byteSize: Number of bytes needed, 0 for everything up to the end of the buffer
+		Returns:
+			bytes object with the buffer data (shorter if the buffer ends first)
+		"""
+		rid = int(resourceId)
+		key = (rid, byteOffset, byteSize)
+		entry = self.buffers.get(key)
+		if entry is not None and self.isUnchanged(resourceId, entry[1], eventId):
+			self.buffers.move_to_end(key)
+			self.reuseCount += 1
+			return entry[0]
+
+		# Look for a fetched range covering this one
+		end = byteOffset + byteSize if byteSize > 0 else float("inf")
+		for otherKey in self.coveringRanges(rid, byteOffset, end):
+			data, fetchedAt = self.buffers[otherKey]
+			if self.isUnchanged(resourceId, fetchedAt, eventId):
+				self.buffers.move_to_end(otherKey)
+				self.reuseCount += 1
+				start = byteOffset - otherKey[1]
+				return data[start:start + byteSize] if byteSize > 0 else data[start:]
+
+		data = self.controller.GetBufferData(resourceId, byteOffset, byteSize)
+		self.fetchCount += 1
+		if entry is not None:
+			self.totalBytes -= len(entry[0])
+		self.buffers[key] = (data, eventId)
+		self.buffers.move_to_end(key)
+		self.addRange(key)
+		self.totalBytes += len(data)
+
+		# Evict least recently used buffers, but always keep the newest one
+		while self.totalBytes > self.maxBytes and len(self.buffers) > 1:
+			oldKey, (oldData, oldEventId) = self.buffers.popitem(last=False)
+			self.removeRange(oldKey)
+			self.totalBytes -= len(oldData)
+		return data
+
+	def coveringRanges(self, rid, start, end):
+		"""
+		Iterate over the indexed ranges of a buffer that cover start..end
+		Args:
+			rid: Resource ID of the buffer, as an int
+			start: Offset of the first byte needed
+			end: Offset past the last byte needed (inf for the rest of the buffer)
+		Returns:
+			Generator of keys in self.buffers, the one reaching furthest first
+		"""
+		starts, ends, keys = self.ranges.get(rid, ((), (), ()))
+		# Ends are sorted like starts: of the ranges starting at or before start,
+		# those that cover it are the last few
+		i = bisect.bisect_right(starts, start) - 1
+		while i >= 0 and ends[i] >= end:
+			yield keys[i]
+			i -= 1
+
+	def addRange(self, key):
+		"""
+		Index a newly fetched range. Ranges nested in it or containing it are
+		dropped from the index (their data stays cached for exact lookups), so
+		no range contains another and starts and ends are both sorted.
+		Args:
+			key: (rid, byteOffset, byteSize) key of the range in self.buffers
+		"""
+		rid, start, size = key
+		end = start + size if size > 0 else float("inf")
+		starts, ends, keys = self.ranges.setdefault(rid, ([], [], []))
+		lo = hi = bisect.bisect_left(starts, start)
+		# Earlier ranges that end at or after this one contain it
+		while lo > 0 and ends[lo - 1] >= end:
+			lo -= 1
+		# Later ranges that end first are nested in it; one at the same start is either
+		while hi < len(starts) and (ends[hi] <= end or starts[hi] == start):
+			hi += 1
+		starts[lo:hi] = [start]
+		ends[lo:hi] = [end]
+		keys[lo:hi] = [key]
+
+	def removeRange(self, key):
+		"""
+		Drop an evicted range from the index, if it is still indexed
+		Args:
+			key: (rid, byteOffset, byteSize) key of the range in self.buffers
+		"""
+		starts, ends, keys = self.ranges[key[0]]
+		i = bisect.bisect_left(starts, key[1])
+		if i < len(keys) and keys[i] == key:
+			del starts[i], ends[i], keys[i]
+
+	def getDecoded(self, fingerprint, resourceIds, eventId):
+		"""
+		Get a previously decoded draw with the same fingerprint
+		Args:
+			fingerprint: Buffer/layout fingerprint from drawFingerprint
+			resourceIds: Buffers the decoded data came from
+			eventId: Event the data is needed at
+		Returns:
+			The cached (indices, attrValues), or None
+		"""
+		entry = self.decoded.get(fingerprint)
+		if entry is None:
+			return None
+		if not all(self.isUnchanged(r, entry[0], eventId) for r in resourceIds):
+			del self.decoded[fingerprint]
+			return None
+		self.decoded.move_to_end(fingerprint)
+		self.decodeReuseCount += 1
+		return entry[1]
+
+	def putDecoded(self, fingerprint, eventId, decoded, maxEntries=16):
+		"""
+		Remember a decoded draw for reuse by later draws
+		Args:
+			fingerprint: Buffer/layout fingerprint from drawFingerprint
+			eventId: Event the data was decoded at
+			decoded: Tuple of (indices, attrValues)
+			maxEntries: Number of decoded draws to keep
+		"""
+		self.decoded[fingerprint] = (eventId, decoded)
+		self.decoded.move_to_end(fingerprint)
+		while len(self.decoded) > maxEntries:
+			self.decoded.popitem(last=False)
+
+# Buffer cache of the current run
+bufferCacheState = (None, None)
+
+def getBufferCache(controller):
+	"""
+	Get the run-wide buffer cache for a controller, creating it on first use
+	Args:
+		controller: Replay controller
+	Returns:
+		BufferCache for the controller
+	"""
+	global bufferCacheState
+	if bufferCacheState[0] is not controller:
+		bufferCacheState = (controller, BufferCache(controller, bufferCacheMB * 1024 * 1024))
+	return bufferCacheState[1]
+
+def drawFingerprint(meshData):
+	"""
+	Fingerprint the index/vertex buffers, draw parameters and vertex layout of a draw
+	Args:
+		meshData: List of mesh input data
+	Returns:
+		Hashable fingerprint; draws with equal fingerprints decode identically
+		as long as their buffers weren't written in between
+	"""
+	first = meshData[0]
+	layout = tuple((int(attr.vertexResourceId), attr.vertexBufferOffset, attr.vertexByteOffset, attr.vertexByteStride,
+		int(attr.format.compType), attr.format.compByteWidth, attr.format.compCount, attr.format.BGRAOrder(),
+		attr.format.Special(), attr.name, attr.perInstance, attr.instanceRate) for attr in meshData)
+	return (int(first.indexResourceId), first.indexByteOffset, first.indexByteStride, first.baseVertex,
+		first.indexOffset, first.numIndices, first.restartIndex, first.instanceOffset, first.numInstances, layout)
+
+class TextureExportRegistry:
+	"""
+	Run-wide registry of exported textures. Each (resourceId, mip, slice, format)
+	is saved once per version under a shared filename, and every draw records
+	which shared files it used so they can be referenced from the per-draw JSON.
+	A new version starts at every event that writes to the texture (render
+	targets, copies, UAV writes), found from the resource's usage list.
+	Args:
+		claimFolder: Folder shared by the export processes of a sharded run. A
+			texture is only saved by the process that creates its claim file.
+	"""
+	def __init__(self, claimFolder=None):
+		self.saved = {}
+		self.drawTextures = {}
+		self.writeEvents = {}
+		self.skippedCount = 0
+		self.claimFolder = claimFolder
+		self.otherShardCount = 0
+
+	def claim(self, relPath):
+		"""
+		Claim a texture file for this process in a sharded run
+		Args:
+			relPath: Path of the texture relative to folderName
+		Returns:
+			True if this process should save the texture
+		"""
+		if self.claimFolder is None:
+			return True
+		claimPath = "{0}/{1}".format(self.claimFolder, relPath.replace("/", "_"))
+		try:
+			os.close(os.open(claimPath, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+		except FileExistsError:
+			return False
+		return True
+
+	def getVersion(self, resourceId, eventId, controller):
+		"""
+		Get the version of a texture's contents at an event
+		Args:
+			resourceId: The resource ID of the texture
+			eventId: The event the texture is saved at
+			controller: The replay controller
+		Returns:
+			Last event up to eventId that writes to the texture, 0 if none does
+		"""
+		key = int(resourceId)
+		if key not in self.writeEvents:
+			try:
+				usage = controller.GetUsage(resourceId)
+				self.writeEvents[key] = sorted(u.eventId for u in usage if u.usage in writeUsages)
+			except Exception:
+				self.writeEvents[key] = None
+		events = self.writeEvents[key]
+		if events is None:
+			# Without usage information every event is its own version
+			return eventId
+		i = bisect.bisect_right(events, eventId)
+		return events[i - 1] if i > 0 else 0
+
+	def save(self, resourceId, eventId, controller, destType, folder, extension, mip=0, sliceIndex=0):
+		"""
+		Save a texture unless its contents at eventId were already saved during this run
+		Args:
+			resourceId: The resource ID of the texture
+			eventId: The event the texture is saved at
+			controller: The replay controller
+			destType: rd.FileType to save as
+			folder: Sub-folder of folderName to save into
+			extension: File extension for destType
+			mip: Mip level to save
+			sliceIndex: Array slice to save
+		Returns:
+			Path of the saved file relative to folderName
+		"""
+		version = self.getVersion(resourceId, eventId, controller)
+		key = (int(resourceId), mip, sliceIndex, int(destType), version)
+		relPath = self.saved.get(key)
+		if relPath is not None:
+			self.skippedCount += 1
+			return relPath
+
+		# The filename only depends on the resource and version, so draws share it.
+		# Textures not written during the frame keep the plain name
+		name = "texture_{0}".format(int(resourceId))
+		if version:
+			name = "{0}_event{1}".format(name, version)
+		relPath = "{0}/{1}_mip{2}_slice{3}.{4}".format(folder, name, mip, sliceIndex, extension)
+		if not self.claim(relPath):
+			# Another shard saves this texture
+			self.saved[key] = relPath
+			self.skippedCount += 1
+			self.otherShardCount += 1
+			return relPath
+
+		# Create the texture folder if it doesn't exist
+		textureFolder = "{0}/{1}".format(folderName, folder)
+		os.makedirs(textureFolder, exist_ok=True)
+
+		texsave = rd.TextureSave()
+		texsave.resourceId = resourceId
+		texsave.mip = mip
+		texsave.slice.sliceIndex = sliceIndex
+		texsave.alpha = rd.AlphaMapping.Preserve
+		texsave.destType = destType
+
+		outTexPath = "{0}/{1}".format(folderName, relPath)
+		controller.SaveTexture(texsave, outTexPath)
+		print("Saved texture: {0}".format(outTexPath))
+
+		self.saved[key] = relPath
+		return relPath
+
+	def use(self, eventId, textureType, resourceId, extension, relPath):
+		"""
+		Record that a draw used a saved texture file
+		Args:
+			eventId: The event ID of the draw
+			textureType: Role of the texture in the draw (e.g., "input", "output")
+			resourceId: The resource ID of the texture
+			extension: File type key for the entry (e.g., "png", "exr")
+			relPath: Path of the saved file relative to folderName
+		"""
+		textures = self.drawTextures.setdefault(eventId, {}).setdefault(textureType, [])
+		for entry in textures:
+			if entry["resourceId"] == int(resourceId):
+				break
+		else:
+			entry = {"resourceId": int(resourceId)}
+			textures.append(entry)
+		entry[extension] = relPath
+
+	def getDrawTextures(self, eventId):
+		"""
+		Get the textures a draw used, grouped by role
+		Args:
+			eventId: The event ID of the draw
+		Returns:
+			Dict mapping texture role to a list of {resourceId, png, exr} entries
+		"""
+		return self.drawTextures.get(eventId, {})
+
+# Textures exported during the current run
+textureRegistry = TextureExportRegistry()
+
+# Replay counters of the current run, and the event the controller is at
+replayStats = {"seeks": 0, "skipped": 0, "eventId": None}
+
+# Per-draw JSON entries written during the current run, for the run manifest
+exportedDraws = []
 
 def pySaveTexture(resourceId, eventId, controller, textureType="texture"):
 	"""
-	Save texture to disk as PNG. All textures are saved in a single folder.
+	Save texture to disk as PNG. All textures are saved in a single folder,
+	and a texture shared by several draws is only saved again once it changes.
 	Args:
 		resourceId: The resource ID of the texture
-		eventId: The event ID for naming
+		eventId: The event ID of the draw using the texture
 		controller: The replay controller
-		textureType: Type identifier for filename (e.g., "texture", "output")
+		textureType: Role of the texture in the draw (e.g., "input", "output")
+	Returns:
+		Path of the PNG relative to folderName, or None for a null resource
 	"""
-	texsave = rd.TextureSave()
-	texsave.resourceId = resourceId
-	if texsave.resourceId == rd.ResourceId.Null():
-		return False
+	if resourceId == rd.ResourceId.Null():
+		return None
 
-	# Create main texture folder if it doesn't exist
-	textureFolder = "{0}/textures".format(folderName)
-	if not os.path.exists(textureFolder):
-		os.makedirs(textureFolder)
-
-	# Generate unique filename with eventId and resourceId
-	filename = "{0}_event{1}_{2}".format(textureType, eventId, str(int(texsave.resourceId)))
-	
-	# Set texture save parameters
-	texsave.mip = 0
-	texsave.slice.sliceIndex = 0
-	texsave.alpha = rd.AlphaMapping.Preserve
-	texsave.destType = rd.FileType.PNG
-
-	# Save texture to the main texture folder
-	outTexPath = "{0}/{1}.png".format(textureFolder, filename)
-	controller.SaveTexture(texsave, outTexPath)
-	print("Saved texture: {0}".format(outTexPath))
-	return True
+	relPath = textureRegistry.save(resourceId, eventId, controller, rd.FileType.PNG, "textures", "png")
+	textureRegistry.use(eventId, textureType, resourceId, "png", relPath)
+	return relPath
 
 def pySaveTextureEXR(resourceId, eventId, controller, textureType="texture"):
 	"""
-	Save texture to disk as EXR. All EXR textures are saved in a separate folder.
+	Save texture to disk as EXR. All EXR textures are saved in a separate folder,
+	and a texture shared by several draws is only saved again once it changes.
 	Args:
 		resourceId: The resource ID of the texture
-		eventId: The event ID for naming
+		eventId: The event ID of the draw using the texture
 		controller: The replay controller
-		textureType: Type identifier for filename (e.g., "texture", "output")
+		textureType: Role of the texture in the draw (e.g., "input", "output")
+	Returns:
+		Path of the EXR relative to folderName, or None for a null resource
+	"""
+	if resourceId == rd.ResourceId.Null():
+		return None
+
+	relPath = textureRegistry.save(resourceId, eventId, controller, rd.FileType.EXR, "textures_exr", "exr")
+	textureRegistry.use(eventId, textureType, resourceId, "exr", relPath)
+	return relPath
+
+def writeDrawInfo(modelsFolder, eventId, name, textures, meshPath, topology=None, instances=None, stats=None):
+	"""
+	Write the per-draw JSON next to the mesh, referencing the shared texture files
+	Args:
+		modelsFolder: Folder the mesh was written to
+		eventId: The event ID of the draw
+		name: Name of the draw
+		textures: The draw's textures from TextureExportRegistry.getDrawTextures
+		meshPath: Path of the exported mesh file
+		topology: Primitive topology name of the draw (e.g., "TriangleStrip")
+		instances: Instancing info of a draw with per-instance attributes, or None
+		stats: Counts, bounds and attribute layout from drawStats, or None
+	"""
+	info = {
+		"eventId": eventId,
+		"name": name,
+		"mesh": os.path.basename(meshPath),
+		"topology": topology,
+		"textures": textures,
+	}
+	if instances is not None:
+		info["instances"] = instances
+	if stats is not None:
+		info.update(stats)
+	outPath = "{0}/model_event{1}.json".format(modelsFolder, eventId)
+	with open(outPath, "w") as infoFile:
+		json.dump(info, infoFile, indent=1)
+	exportedDraws.append(info)
+
+def writeManifest(outPath, draws, textures, shards=1):
+	"""
+	Write the run manifest listing every exported draw and texture
+	Args:
+		outPath: Path of the manifest
+		draws: Per-draw JSON entries
+		textures: Paths of the saved textures relative to folderName
+		shards: Number of processes the run was split into
+	"""
+	manifest = {
+		"shards": shards,
+		"draws": sorted(draws, key=lambda info: info["eventId"]),
+		"textures": sorted(set(textures)),
+	}
+	with open(outPath, "w") as manifestFile:
+		json.dump(manifest, manifestFile, indent=1)
+
+# Tables of the draw catalog. Paths are relative to folderName, bounds are
+# those of the position attribute and NULL without one
+catalogSchema = """
+CREATE TABLE draws (eventId INTEGER PRIMARY KEY, name TEXT, topology TEXT, vertexCount INTEGER,
+	indexCount INTEGER, instanceCount INTEGER, minX REAL, minY REAL, minZ REAL, maxX REAL, maxY REAL,
+	maxZ REAL, mesh TEXT, info TEXT, instanceTable TEXT);
+CREATE TABLE attributes (eventId INTEGER, name TEXT, type TEXT, width INTEGER, components INTEGER,
+	perInstance INTEGER);
+CREATE TABLE textures (eventId INTEGER, role TEXT, resourceId INTEGER, png TEXT, exr TEXT);
+CREATE INDEX attributesByName ON attributes (name);
+CREATE INDEX texturesByResource ON textures (resourceId);
+"""
+
+def writeCatalog(outPath, draws):
+	"""
+	Write the draw catalog, a SQLite database with one row per exported draw,
+	so draws can be selected without opening their mesh files
+	Args:
+		outPath: Path of the catalog, replaced if it exists
+		draws: Per-draw JSON entries
 	"""
-	texsave = rd.TextureSave()
-	texsave.resourceId = resourceId
-	if texsave.resourceId == rd.ResourceId.Null():
+	if sqlite3 is None:
+		print("No sqlite3 module, skipped the draw catalog")
+		return
+
+	# Built next to the old catalog and swapped in, so readers never see it half written
+	tmpPath = outPath + ".tmp"
+	removeFile(tmpPath)
+	connection = sqlite3.connect(tmpPath)
+	try:
+		connection.executescript(catalogSchema)
+		for info in draws:
+			eventId = info["eventId"]
+			bounds = info.get("bounds") or {"min": [], "max": []}
+			minimum = (list(bounds["min"]) + [None] * 3)[:3]
+			maximum = (list(bounds["max"]) + [None] * 3)[:3]
+			instances = info.get("instances") or {}
+			table = instances.get("table")
+			connection.execute("INSERT INTO draws VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+				[eventId, info["name"], info.get("topology"), info.get("vertexCount"), info.get("indexCount"),
+				instances.get("count", 1)] + minimum + maximum +
+				["models/" + info["mesh"], "models/model_event{0}.json".format(eventId),
+				"models/" + table if table else None])
+			connection.executemany("INSERT INTO attributes VALUES (?, ?, ?, ?, ?, ?)",
+				[(eventId, attr["name"], attr["type"], attr["width"], attr["components"], attr["perInstance"])
+				for attr in info.get("attributes", [])])
+			connection.executemany("INSERT INTO textures VALUES (?, ?, ?, ?, ?)",
+				[(eventId, role, entry["resourceId"], entry.get("png"), entry.get("exr"))
+				for role, entries in sorted(info["textures"].items()) for entry in entries])
+		connection.commit()
+	finally:
+		connection.close()
+	os.replace(tmpPath, outPath)
+
+class ProfileStage:
+	"""Context manager timing one stage for a Profiler"""
+	def __init__(self, profiler, name, eventId, byteCount):
+		self.profiler = profiler
+		self.name = name
+		self.eventId = eventId
+		self.byteCount = byteCount
+
+	def __enter__(self):
+		self.start = time.perf_counter()
+		return self
+
+	def __exit__(self, excType, excValue, traceback):
+		self.profiler.record(self.name, self.eventId, self.start, time.perf_counter() - self.start, self.byteCount)
 		return False
 
-	# Create EXR texture folder if it doesn't exist
-	textureExrFolder = "{0}/textures_exr".format(folderName)
-	if not os.path.exists(textureExrFolder):
-		os.makedirs(textureExrFolder)
+class Profiler:
+	"""
+	Per-stage timings and counters, per draw and summed for the run.
+	Stages can be recorded from any thread; each thread is a timeline row in
+	the Chrome trace. A disabled profiler records nothing.
+	Args:
+		enabled: Whether stages are recorded
+	"""
+	def __init__(self, enabled=True):
+		self.enabled = enabled
+		self.origin = time.perf_counter()
+		self.lock = threading.Lock()
+		self.traceEvents = []
+		self.totals = collections.OrderedDict()
+		self.draws = collections.OrderedDict()
+		self.threadIds = {}
+		self.currentEventId = None
+
+	def stage(self, name, eventId=None, byteCount=0):
+		"""
+		Time a stage: 'with profiler.stage("DecodeAttributes", eventId):'
+		Args:
+			name: Stage name
+			eventId: Draw the stage belongs to, defaults to the draw being replayed
+			byteCount: Bytes processed by the stage
+		Returns:
+			Context manager recording the stage on exit
+		"""
+		if eventId is None:
+			eventId = self.currentEventId
+		return ProfileStage(self, name, eventId, byteCount)
+
+	def record(self, name, eventId, start, duration, byteCount=0):
+		"""
+		Record a finished stage
+		Args:
+			name: Stage name
+			eventId: Draw the stage belongs to, or None
+			start: time.perf_counter() at the start of the stage
+			duration: Duration in seconds
+			byteCount: Bytes processed by the stage
+		"""
+		if not self.enabled:
+			return
+		thread = threading.current_thread()
+		with self.lock:
+			tid = self.threadIds.setdefault(thread.ident, (len(self.threadIds) + 1, thread.name))[0]
+			total = self.totals.setdefault(name, {"calls": 0, "seconds": 0.0, "bytes": 0})
+			total["calls"] += 1
+			total["seconds"] += duration
+			total["bytes"] += byteCount
+			if eventId is not None:
+				draw = self.draws.setdefault(eventId, {})
+				draw[name] = draw.get(name, 0.0) + duration
+			event = {"name": name, "ph": "X", "pid": os.getpid(), "tid": tid,
+				"ts": (start - self.origin) * 1e6, "dur": duration * 1e6, "args": {}}
+			if eventId is not None:
+				event["args"]["eventId"] = eventId
+			if byteCount:
+				event["args"]["bytes"] = byteCount
+			self.traceEvents.append(event)
+
+	def addBytes(self, name, byteCount):
+		"""
+		Add bytes to the last-recorded totals of a stage, for sizes only known afterwards
+		Args:
+			name: Stage name
+			byteCount: Bytes to add
+		"""
+		if not self.enabled:
+			return
+		with self.lock:
+			self.totals.setdefault(name, {"calls": 0, "seconds": 0.0, "bytes": 0})["bytes"] += byteCount
+
+	def write(self, prefix):
+		"""
+		Write the Chrome trace, the run summary and the per-draw table
+		Args:
+			prefix: Path prefix of the output files
+		"""
+		with self.lock:
+			threadNames = [{"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": name}}
+				for tid, name in self.threadIds.values()]
+			with open(prefix + ".trace.json", "w") as traceFile:
+				json.dump({"traceEvents": threadNames + self.traceEvents, "displayTimeUnit": "ms"}, traceFile)
+
+			with open(prefix + ".summary.json", "w") as summaryFile:
+				json.dump({"stages": self.totals, "draws": len(self.draws),
+					"wallSeconds": time.perf_counter() - self.origin}, summaryFile, indent=1)
+
+			stageNames = list(self.totals)
+			with open(prefix + ".draws.csv", "w", newline='') as drawsFile:
+				writer = csv.writer(drawsFile)
+				writer.writerow(["eventId"] + stageNames)
+				for eventId, stages in self.draws.items():
+					writer.writerow([eventId] + [stages.get(name, 0.0) for name in stageNames])
+
+	def printSummary(self):
+		"""Print per-stage totals, slowest first"""
+		for name, total in sorted(self.totals.items(), key=lambda item: -item[1]["seconds"]):
+			print("\t{0:<20} {1:>8} calls {2:>10.3f} s {3:>12} bytes".format(name, total["calls"], total["seconds"], total["bytes"]))
+
+class ProfiledController:
+	"""
+	Replay controller wrapper timing the calls the exporter makes.
+	Everything not instrumented is forwarded to the wrapped controller.
+	Args:
+		controller: Replay controller to wrap
+		profiler: Profiler to record into
+	"""
+	def __init__(self, controller, profiler):
+		self.controller = controller
+		self.profiler = profiler
 
-	# Generate unique filename with eventId and resourceId
-	filename = "{0}_event{1}_{2}".format(textureType, eventId, str(int(texsave.resourceId)))
-	
-	# Set texture save parameters for EXR
-	texsave.mip = 0
-	texsave.slice.sliceIndex = 0
-	texsave.alpha = rd.AlphaMapping.Preserve
-	texsave.destType = rd.FileType.EXR
-
-	# Save texture to the EXR texture folder
-	outTexPath = "{0}/{1}.exr".format(textureExrFolder, filename)
-	controller.SaveTexture(texsave, outTexPath)
-	print("Saved EXR texture: {0}".format(outTexPath))
-	return True
-
-def findIndexDrawLoop(d, index):
-	"""Recursively search for a draw call with specific index"""
-	ret = None
-	if d.eventId == index:
-		return d
-	
-	for c in d.children:
-		ret = findIndexDrawLoop(c, index)
-		if ret:
-			return ret
-	
-	return ret
+	def __getattr__(self, name):
+		return getattr(self.controller, name)
+
+	def SetFrameEvent(self, eventId, force):
+		with self.profiler.stage("SetFrameEvent", eventId):
+			return self.controller.SetFrameEvent(eventId, force)
+
+	def GetPipelineState(self):
+		with self.profiler.stage("GetPipelineState"):
+			return self.controller.GetPipelineState()
+
+	def GetBufferData(self, resourceId, byteOffset, byteSize):
+		start = time.perf_counter()
+		data = self.controller.GetBufferData(resourceId, byteOffset, byteSize)
+		self.profiler.record("GetBufferData", self.profiler.currentEventId, start, time.perf_counter() - start, len(data))
+		return data
+
+	def SaveTexture(self, texsave, path):
+		name = "SaveTextureEXR" if texsave.destType == rd.FileType.EXR else "SaveTexturePNG"
+		with self.profiler.stage(name):
+			return self.controller.SaveTexture(texsave, path)
+
+# Profiler of the current run
+profiler = Profiler(False)
+
+class DrawIndex:
+	"""
+	Flattened index of a capture's action tree, built once with an iterative
+	walk so deep marker hierarchies can't hit the recursion limit.
+	Args:
+		rootActions: Root actions of the capture
+	"""
+	def __init__(self, rootActions):
+		self.actions = {}
+		self.parents = {}
+
+		# Pre-order walk with an explicit stack
+		stack = [(d, None) for d in reversed(rootActions)]
+		while stack:
+			d, parent = stack.pop()
+			self.actions[d.eventId] = d
+			self.parents[d.eventId] = parent
+			stack.extend((child, d) for child in reversed(d.children))
+
+		self.eventIds = sorted(self.actions)
+
+	def find(self, eventId):
+		"""
+		Find an action by event ID
+		Args:
+			eventId: The event ID to look up
+		Returns:
+			The action, or None if there is none with that ID
+		"""
+		return self.actions.get(eventId)
+
+	def range(self, start, end):
+		"""
+		Get all actions with start <= eventId <= end
+		Args:
+			start: First event ID of the range
+			end: Last event ID of the range
+		Returns:
+			List of actions sorted by event ID
+		"""
+		lo = bisect.bisect_left(self.eventIds, start)
+		hi = bisect.bisect_right(self.eventIds, end)
+		return [self.actions[eventId] for eventId in self.eventIds[lo:hi]]
+
+	def path(self, action):
+		"""
+		Get the names of an action's enclosing markers and its own, joined by "/"
+		Args:
+			action: Action in the index
+		Returns:
+			Path such as "Frame/GBuffer/DrawIndexed(36)"
+		"""
+		names = [action.name]
+		parent = self.parents.get(action.eventId)
+		while parent is not None:
+			names.append(parent.name)
+			parent = self.parents.get(parent.eventId)
+		return "/".join(reversed(names))
+
+def parseActionFlags(names):
+	"""
+	Parse ActionFlags names joined by "|"
+	Args:
+		names: String such as "Drawcall|Indexed", or None
+	Returns:
+		Combined flags, 0 for none
+	"""
+	flags = 0
+	for name in (names or "").split("|"):
+		name = name.strip()
+		if not name:
+			continue
+		if not hasattr(rd.ActionFlags, name):
+			raise ValueError("Unknown action flag: {0}".format(name))
+		flags |= getattr(rd.ActionFlags, name)
+	return flags
+
+class DrawFilter:
+	"""
+	Cheap per-draw checks on the action tree, run before any draw is replayed.
+	Args:
+		include: Regex a draw's marker path must contain, or None
+		exclude: Regex a draw's marker path must not contain, or None
+		minIndices: Minimum numIndices of a draw
+		requireFlags: ActionFlags names a draw must all have, or None
+		skipFlags: ActionFlags names a draw must have none of, or None
+		textures: Save the textures of exported draws
+		textureInclude: Regex limiting texture saves to draws whose marker path contains it, or None
+	"""
+	def __init__(self, include=None, exclude=None, minIndices=0, requireFlags=None, skipFlags=None,
+		textures=True, textureInclude=None):
+		self.include = re.compile(include) if include else None
+		self.exclude = re.compile(exclude) if exclude else None
+		self.minIndices = minIndices
+		self.requireFlags = parseActionFlags(requireFlags)
+		self.skipFlags = parseActionFlags(skipFlags)
+		self.textures = textures
+		self.textureInclude = re.compile(textureInclude) if textureInclude else None
+		self.textureSkips = set()
+
+	def select(self, draws, drawIndex):
+		"""
+		Filter draws and note which of them skip their textures
+		Args:
+			draws: Actions to filter
+			drawIndex: DrawIndex the actions come from, for their marker paths
+		Returns:
+			List of the accepted actions, in order
+		"""
+		selected = []
+		for draw in draws:
+			if draw.numIndices < self.minIndices:
+				continue
+			if (draw.flags & self.requireFlags) != self.requireFlags or draw.flags & self.skipFlags:
+				continue
+			path = drawIndex.path(draw) if self.include or self.exclude or self.textureInclude else draw.name
+			if self.include is not None and not self.include.search(path):
+				continue
+			if self.exclude is not None and self.exclude.search(path):
+				continue
+			if not self.textures or (self.textureInclude is not None and not self.textureInclude.search(path)):
+				self.textureSkips.add(draw.eventId)
+			selected.append(draw)
+		return selected
+
+	def saveTextures(self, eventId):
+		"""Check whether the textures of a draw are saved"""
+		return eventId not in self.textureSkips
+
+# Filter of the current run, set up by sampleCode
+drawFilter = DrawFilter()
+
+# Index of the last controller passed to getDrawIndex
+drawIndexCache = (None, None)
+
+def getDrawIndex(controller):
+	"""
+	Get the draw index for a controller, building it on first use
+	Args:
+		controller: Replay controller
+	Returns:
+		DrawIndex of the controller's root actions
+	"""
+	global drawIndexCache
+	if drawIndexCache[0] is not controller:
+		drawIndexCache = (controller, DrawIndex(controller.GetRootActions()))
+	return drawIndexCache[1]
 
 def findIndexDraw(index, controller):
 	"""Find draw call by index"""
-	ret = None
-	for d in controller.GetDrawcalls():
-		if d.eventId == index:
-			ret = d
-			return ret
+	return getDrawIndex(controller).find(index)
+
+# Format character mapping for different component types and byte widths
+formatChars = {}
+#                                 012345678
+formatChars[rd.CompType.UInt]  = "xBHxIxxxL"
+formatChars[rd.CompType.SInt]  = "xbhxixxxl"
+formatChars[rd.CompType.Float] = "xxexfxxxd" # only 2, 4 and 8 are valid
+
+# These types have identical decodes, but we might post-process them
+formatChars[rd.CompType.UNorm] = formatChars[rd.CompType.UInt]
+formatChars[rd.CompType.UScaled] = formatChars[rd.CompType.UInt]
+formatChars[rd.CompType.SNorm] = formatChars[rd.CompType.SInt]
+formatChars[rd.CompType.SScaled] = formatChars[rd.CompType.SInt]
+
+def getPostProcess(fmt, normalize=True):
+	"""
+	Build the normalisation / swizzle step for a format
+	Args:
+		fmt: Format specification
+		normalize: Apply UNorm/SNorm normalisation, otherwise only swizzle
+	Returns:
+		Function mapping a raw unpacked tuple to the final value, or None
+	"""
+	steps = []
 
-		for c in d.children:
-			ret = findIndexDrawLoop(c, index)
-			if ret:
-				return ret	
-	return ret
+	# If the format needs post-processing such as normalisation, do that now
+	if not normalize:
+		pass
+	elif fmt.compType == rd.CompType.UNorm:
+		divisor = float((2 ** (fmt.compByteWidth * 8)) - 1)
+		steps.append(lambda value: tuple(float(i) / divisor for i in value))
+	elif fmt.compType == rd.CompType.SNorm:
+		maxNeg = -float(2 ** (fmt.compByteWidth * 8)) / 2
+		divisor = float(-(maxNeg-1))
+		steps.append(lambda value: tuple((float(i) if (i == maxNeg) else (float(i) / divisor)) for i in value))
 
-def unpackData(fmt, data):
+	# If the format is BGRA, swap the two components
+	if fmt.BGRAOrder():
+		steps.append(lambda value: (value[2], value[1], value[0], value[3]))
+
+	if not steps:
+		return None
+	if len(steps) == 1:
+		return steps[0]
+	return lambda value: steps[1](steps[0](value))
+
+def unpackData(fmt, data, offset=0):
 	"""
 	Unpack vertex data according to format specification
 	Args:
 		fmt: Format specification
 		data: Raw byte data
+		offset: Byte offset of the value within data
 	Returns:
 		Unpacked tuple of values
 	"""
 	if isPrint:
 		print("Unpacking data...")
-	
-	# Format character mapping for different component types and byte widths
-	formatChars = {}
-	#                                 012345678
-	formatChars[rd.CompType.UInt]  = "xBHxIxxxL"
-	formatChars[rd.CompType.SInt]  = "xbhxixxxl"
-	formatChars[rd.CompType.Float] = "xxexfxxxd" # only 2, 4 and 8 are valid
-
-	# These types have identical decodes, but we might post-process them
-	formatChars[rd.CompType.UNorm] = formatChars[rd.CompType.UInt]
-	formatChars[rd.CompType.UScaled] = formatChars[rd.CompType.UInt]
-	formatChars[rd.CompType.SNorm] = formatChars[rd.CompType.SInt]
-	formatChars[rd.CompType.SScaled] = formatChars[rd.CompType.SInt]
 
 	# We need to fetch compCount components
 	vertexFormat = str(fmt.compCount) + formatChars[fmt.compType][fmt.compByteWidth]
 
 	# Unpack the data
-	value = struct.unpack_from(vertexFormat, data, 0)
-
-	# If the format needs post-processing such as normalisation, do that now
-	if fmt.compType == rd.CompType.UNorm:
-		divisor = float((2 ** (fmt.compByteWidth * 8)) - 1)
-		value = tuple(float(i) / divisor for i in value)
-	elif fmt.compType == rd.CompType.SNorm:
-		maxNeg = -float(2 ** (fmt.compByteWidth * 8)) / 2
-		divisor = float(-(maxNeg-1))
-		value = tuple((float(i) if (i == maxNeg) else (float(i) / divisor)) for i in value)
+	value = struct.unpack_from(vertexFormat, data, offset)
 
-	# If the format is BGRA, swap the two components
-	if fmt.BGRAOrder():
-		value = tuple(value[i] for i in [2, 1, 0, 3])
+	postProcess = getPostProcess(fmt)
+	if postProcess is not None:
+		value = postProcess(value)
 
 	return value
 
+def indexRange(indices):
+	"""
+	Get the lowest and highest vertex index of a draw, skipping restart entries
+	Args:
+		indices: Vertex indices; -1 marks a primitive restart
+	Returns:
+		Tuple of (first, last), or (None, None) if there are no vertices
+	"""
+	if len(indices) == 0:
+		return (None, None)
+	first = min(indices)
+	if first >= 0:
+		return (first, max(indices))
+	valid = [i for i in indices if i >= 0]
+	if not valid:
+		return (None, None)
+	return (min(valid), max(valid))
+
+def decodeAttribute(fmt, data, stride, offset, indices, normalize=True, baseIndex=0):
+	"""
+	Decode one attribute for every index of a draw in a single pass
+	Args:
+		fmt: Format specification
+		data: Raw byte data of the bound vertex buffer, starting at vertex baseIndex
+		stride: Vertex stride in bytes
+		offset: Byte offset of the attribute from the start of vertex baseIndex
+		indices: Vertex indices to gather; -1 marks a primitive restart
+		normalize: Apply UNorm/SNorm normalisation (False keeps raw integers)
+		baseIndex: Index of the first vertex in data (see fetchVertexData)
+	Returns:
+		List with one unpacked tuple per index, identical to unpackData.
+		Restart entries get a tuple of zeros.
+	"""
+	if len(indices) == 0:
+		return []
+
+	elementFormat = str(fmt.compCount) + formatChars[fmt.compType][fmt.compByteWidth]
+	element = struct.Struct(elementFormat)
+	postProcess = getPostProcess(fmt, normalize)
+	first, last = indexRange(indices)
+	if first is None:
+		return [(0,) * fmt.compCount] * len(indices)
+	count = last - first + 1
+
+	if stride >= element.size:
+		# Pad each element out to the stride so the whole range of vertices
+		# decodes as one strided array in C
+		strided = struct.Struct(elementFormat + "x" * (stride - element.size))
+		start = offset + (first - baseIndex) * stride
+		block = data[start:start + count * stride]
+		# The last vertex may not have its trailing padding in the buffer
+		if len(block) < count * stride and len(block) >= (count - 1) * stride + element.size:
+			block = bytes(block) + bytes(count * stride - len(block))
+		values = list(strided.iter_unpack(block))
+	else:
+		# Overlapping or zero-stride elements can't be viewed as an array
+		values = [element.unpack_from(data, offset + (first - baseIndex + i) * stride) for i in range(count)]
+
+	if postProcess is not None:
+		values = list(map(postProcess, values))
+
+	if min(indices) < 0:
+		# Restart entries gather a row of zeros from past the end
+		values.append((0,) * fmt.compCount)
+		restartSlot = len(values) - 1
+		return [values[i - first] if i >= 0 else values[restartSlot] for i in indices]
+
+	# Gather by the index array in one step
+	if first == 0:
+		return list(map(values.__getitem__, indices))
+	return [values[i - first] for i in indices]
+
 def getMeshInputs(controller, draw):
 	"""
 	Get mesh input data and save associated textures
@@ -187,7 +1108,7 @@ def getMeshInputs(controller, draw):
 	attrs = state.GetVertexInputs()
 	
 	# Extract textures used by fragment shader - save both PNG and EXR formats
-	usedDescriptors = state.GetReadOnlyResources(renderdoc.ShaderStage.Fragment)
+	usedDescriptors = state.GetReadOnlyResources(renderdoc.ShaderStage.Fragment) if drawFilter.saveTextures(draw.eventId) else []
 	for usedDescriptor in usedDescriptors:
 		res = usedDescriptor.descriptor.resource
 		if res != rd.ResourceId.Null():
@@ -199,13 +1120,15 @@ def getMeshInputs(controller, draw):
 			if not pySaveTextureEXR(res, draw.eventId, controller, "input"):
 				break
 	
+	# Restart indices only split strips; in lists they are ordinary indices
+	topology = state.GetPrimitiveTopology()
+	restartIndex = None
+	if topology in restartTopologies and state.IsRestartEnabled():
+		restartIndex = state.GetRestartIndex()
+
 	meshInputs = []
 
 	for attr in attrs:
-		# We don't handle instance attributes
-		if attr.perInstance:
-			raise RuntimeError("Instanced properties are not supported!")
-		
 		meshInput = MeshData()
 		meshInput.indexResourceId = ib.resourceId
 		meshInput.indexByteOffset = ib.byteOffset
@@ -213,13 +1136,24 @@ def getMeshInputs(controller, draw):
 		meshInput.baseVertex = draw.baseVertex
 		meshInput.indexOffset = draw.indexOffset
 		meshInput.numIndices = draw.numIndices
+		meshInput.restartIndex = restartIndex
+		meshInput.topology = topology
+		meshInput.instanceOffset = draw.instanceOffset
+		meshInput.numInstances = draw.numInstances
 
 		# If the draw doesn't use an index buffer, don't use it even if bound
 		if not (draw.flags & rd.ActionFlags.Indexed):
 			meshInput.indexResourceId = rd.ResourceId.Null()
 
-		# The total offset is the attribute offset from the base of the vertex
-		meshInput.vertexByteOffset = attr.byteOffset + vbs[attr.vertexBuffer].byteOffset + draw.vertexOffset * vbs[attr.vertexBuffer].byteStride
+		# The total offset is the attribute offset from the base of the vertex.
+		# Per-instance attributes are indexed by instance, so the vertex offset doesn't apply
+		meshInput.vertexBufferOffset = vbs[attr.vertexBuffer].byteOffset
+		if attr.perInstance:
+			meshInput.perInstance = True
+			meshInput.instanceRate = attr.instanceRate
+		else:
+			meshInput.vertexBufferOffset += draw.vertexOffset * vbs[attr.vertexBuffer].byteStride
+		meshInput.vertexByteOffset = attr.byteOffset + meshInput.vertexBufferOffset
 		meshInput.format = attr.format
 		meshInput.vertexResourceId = vbs[attr.vertexBuffer].resourceId
 		meshInput.vertexByteStride = vbs[attr.vertexBuffer].byteStride
@@ -229,87 +1163,628 @@ def getMeshInputs(controller, draw):
 
 	return meshInputs
 
-def getIndices(controller, mesh):
+def getMeshOutputs(controller, draw):
+	"""
+	Get the post-vertex-shader mesh data of a draw's first instance, one entry
+	per vertex shader output, interleaved in a single buffer
+	Args:
+		controller: Replay controller
+		draw: Draw call information
+	Returns:
+		List of MeshData objects describing the outputs, position first, or an
+		empty list if the draw has no post-VS data
+	"""
+	postvs = controller.GetPostVSData(0, 0, rd.MeshDataStage.VSOut)
+	if postvs.vertexResourceId == rd.ResourceId.Null() or postvs.numIndices == 0:
+		return []
+	vs = controller.GetPipelineState().GetShaderReflection(rd.ShaderStage.Vertex)
+
+	restartIndex = None
+	if postvs.topology in restartTopologies and getattr(postvs, "allowRestart", False):
+		restartIndex = postvs.restartIndex
+
+	meshOutputs = []
+	for attr in vs.outputSignature:
+		# The post-VS data has its own index buffer into the transformed vertices
+		meshOutput = MeshData()
+		meshOutput.indexResourceId = postvs.indexResourceId
+		meshOutput.indexByteOffset = postvs.indexByteOffset
+		meshOutput.indexByteStride = postvs.indexByteStride
+		meshOutput.baseVertex = postvs.baseVertex
+		meshOutput.indexOffset = 0
+		meshOutput.numIndices = postvs.numIndices
+		meshOutput.restartIndex = restartIndex
+		meshOutput.topology = postvs.topology
+		meshOutput.postVS = True
+		meshOutput.clipPosition = attr.systemValue == rd.ShaderBuiltin.Position
+
+		meshOutput.vertexResourceId = postvs.vertexResourceId
+		meshOutput.vertexBufferOffset = postvs.vertexByteOffset
+		meshOutput.vertexByteStride = postvs.vertexByteStride
+
+		meshOutput.format = rd.ResourceFormat()
+		meshOutput.format.compByteWidth = rd.VarTypeByteSize(attr.varType)
+		meshOutput.format.compCount = attr.compCount
+		meshOutput.format.compType = rd.VarTypeCompType(attr.varType)
+		meshOutput.format.type = rd.ResourceFormatType.Regular
+		meshOutput.name = attr.semanticIdxName if attr.varName == '' else attr.varName
+		meshOutputs.append(meshOutput)
+
+	# The position is stored first, the other outputs follow in signature order
+	meshOutputs.sort(key=lambda meshOutput: not meshOutput.clipPosition)
+
+	# Every output takes 4 bytes per component (8 for doubles)
+	accumOffset = 0
+	for meshOutput in meshOutputs:
+		meshOutput.vertexByteOffset = postvs.vertexByteOffset + accumOffset
+		fmt = meshOutput.format
+		accumOffset += (8 if fmt.compByteWidth > 4 else 4) * fmt.compCount
+
+	return meshOutputs
+
+def clipToWorld(values, matrix):
+	"""
+	Transform clip-space positions to world space
+	Args:
+		values: Decoded (x, y, z, w) positions
+		matrix: Clip-to-world matrix as 16 floats, row major
+	Returns:
+		List of (x, y, z, 1.0) world-space positions. Restart entries stay zero
+	"""
+	m = [float(v) for v in matrix]
+	result = []
+	for x, y, z, w in values:
+		worldW = m[12] * x + m[13] * y + m[14] * z + m[15] * w
+		if worldW == 0.0:
+			result.append((0.0, 0.0, 0.0, 0.0))
+			continue
+		result.append(((m[0] * x + m[1] * y + m[2] * z + m[3] * w) / worldW,
+			(m[4] * x + m[5] * y + m[6] * z + m[7] * w) / worldW,
+			(m[8] * x + m[9] * y + m[10] * z + m[11] * w) / worldW, 1.0))
+	return result
+
+def fetchIndexData(controller, mesh, bufferCache=None, eventId=0):
+	"""
+	Fetch the indices a draw uses, and nothing else of the index buffer
+	Args:
+		controller: Replay controller
+		mesh: Mesh data object
+		bufferCache: Optional BufferCache to fetch the index buffer through
+		eventId: Event the indices are needed at, for the buffer cache
+	Returns:
+		bytes object with the draw's raw indices, or None without an index buffer
+	"""
+	if mesh.indexResourceId == rd.ResourceId.Null():
+		return None
+	byteOffset = mesh.indexByteOffset + mesh.indexOffset * mesh.indexByteStride
+	byteSize = mesh.numIndices * mesh.indexByteStride
+	if bufferCache is not None:
+		return bufferCache.get(mesh.indexResourceId, byteOffset, eventId, byteSize)
+	return controller.GetBufferData(mesh.indexResourceId, byteOffset, byteSize)
+
+# Unsigned array typecodes for each index width
+indexTypecodes = {1: 'B', 2: 'H', 4: 'I'}
+
+def unpackIndices(mesh, ibdata):
+	"""
+	Unpack index data fetched by fetchIndexData
+	Args:
+		mesh: Mesh data object
+		ibdata: Raw indices of the draw, or None without an index buffer
+	Returns:
+		array of vertex indices with baseVertex applied; primitive restarts are -1
+	"""
+	# With no index buffer, just generate a range
+	if ibdata is None:
+		return array.array('q', range(mesh.numIndices))
+
+	# Native arrays of the index width, read straight from the buffer
+	typecode = indexTypecodes[mesh.indexByteStride]
+	raw = array.array(typecode)
+	if len(ibdata) % raw.itemsize:
+		# The buffer ended part way through an index
+		ibdata = ibdata[:len(ibdata) - len(ibdata) % raw.itemsize]
+	raw.frombytes(ibdata)
+	if sys.byteorder != "little":
+		raw.byteswap()
+
+	baseVertex = mesh.baseVertex
+	restart = None
+	if mesh.restartIndex is not None:
+		# The restart value is all ones at the index width
+		restart = mesh.restartIndex & ((1 << (8 * mesh.indexByteStride)) - 1)
+		if restart not in raw:
+			restart = None
+
+	if restart is not None:
+		return array.array('q', [i + baseVertex if i != restart else -1 for i in raw])
+	if baseVertex == 0:
+		return array.array('q', raw)
+	return array.array('q', map(baseVertex.__add__, raw))
+
+def vertexFetchRange(attr, indices):
+	"""
+	Get the part of a vertex buffer an attribute needs for a draw
+	Args:
+		attr: Mesh data object of the attribute
+		indices: Vertex indices of the draw from unpackIndices
+	Returns:
+		Tuple of (first vertex index, byte offset, byte size), or None without vertices
+	"""
+	first, last = indexRange(indices)
+	if first is None:
+		return None
+	stride = attr.vertexByteStride
+	elementEnd = attr.vertexByteOffset - attr.vertexBufferOffset + attr.format.compCount * attr.format.compByteWidth
+	# Attributes within the stride share one range, so they share the fetch
+	return (first, attr.vertexBufferOffset + first * stride, (last - first) * stride + max(stride, elementEnd))
+
+def fetchVertexData(controller, attr, indices, bufferCache=None, eventId=0):
+	"""
+	Fetch only the vertices a draw references from an attribute's vertex buffer
+	Args:
+		controller: Replay controller
+		attr: Mesh data object of the attribute
+		indices: Vertex indices of the draw from unpackIndices
+		bufferCache: Optional BufferCache to fetch the vertex buffer through
+		eventId: Event the vertices are needed at, for the buffer cache
+	Returns:
+		Tuple of (data, first vertex index in data), for decodeAttribute's baseIndex
+	"""
+	fetchRange = vertexFetchRange(attr, indices)
+	if fetchRange is None:
+		return (b"", 0)
+	first, byteOffset, byteSize = fetchRange
+	if bufferCache is not None:
+		return (bufferCache.get(attr.vertexResourceId, byteOffset, eventId, byteSize), first)
+	return (controller.GetBufferData(attr.vertexResourceId, byteOffset, byteSize), first)
+
+def getIndices(controller, mesh, bufferCache=None, eventId=0):
 	"""
 	Extract index data from mesh
 	Args:
 		controller: Replay controller
 		mesh: Mesh data object
+		bufferCache: Optional BufferCache to fetch the index buffer through
+		eventId: Event the indices are needed at, for the buffer cache
 	Returns:
-		List of indices
-	"""
-	# Get the character for the width of index
-	indexFormat = 'B'
-	if mesh.indexByteStride == 2:
-		indexFormat = 'H'
-	elif mesh.indexByteStride == 4:
-		indexFormat = 'I'
-
-	# Duplicate the format by the number of indices
-	indexFormat = str(mesh.numIndices) + indexFormat
-
-	# If we have an index buffer
-	if mesh.indexResourceId != rd.ResourceId.Null():
-		# Fetch the data
-		ibdata = controller.GetBufferData(mesh.indexResourceId, mesh.indexByteOffset, 0)
-		# Unpack all the indices, starting from the first index to fetch
-		offset = mesh.indexOffset * mesh.indexByteStride
-		indices = struct.unpack_from(indexFormat, ibdata, offset)
-
-		# Apply the baseVertex offset
-		return [i + mesh.baseVertex for i in indices]
-	else:
-		# With no index buffer, just generate a range
-		return tuple(range(mesh.numIndices))
+		array of vertex indices
+	"""
+	return unpackIndices(mesh, fetchIndexData(controller, mesh, bufferCache, eventId))
 
-def printMeshData(controller, meshData, draw):
+def instanceElements(attr):
 	"""
-	Export mesh data to CSV file and save output textures
+	Get the elements of a per-instance attribute that a draw's instances read
 	Args:
-		controller: Replay controller
-		meshData: List of mesh input data
-		draw: Draw call information
+		attr: Mesh data object of a per-instance attribute
+	Returns:
+		array of element indices, one per distinct element. Instance i reads
+		element i // instanceRate; with a rate of 0 every instance reads the first
 	"""
-	if isPrint:
-		print("Processing mesh data...")
-	
-	indices = getIndices(controller, meshData[0])
+	rate = attr.instanceRate
+	count = min(1, attr.numInstances) if rate <= 0 else (attr.numInstances + rate - 1) // rate
+	return array.array('q', range(attr.instanceOffset, attr.instanceOffset + count))
 
-	csvArray = []
-	fileheader = []
+def broadcastInstances(values, rate, numInstances):
+	"""
+	Repeat each decoded element of a per-instance attribute for the instances that read it
+	Args:
+		values: Decoded values, one per element from instanceElements
+		rate: Instance step rate of the attribute
+		numInstances: Number of instances in the draw
+	Returns:
+		List with one value per instance
+	"""
+	if rate <= 0:
+		return values[:1] * numInstances
+	if rate == 1:
+		return values[:numInstances]
+	return list(itertools.islice(itertools.chain.from_iterable(map(itertools.repeat, values, itertools.repeat(rate))), numInstances))
+
+def expandInstances(indices, attrs, attrValues, instanceValues, numInstances, separate):
+	"""
+	Build all instances of a draw as one mesh: the draw's rows are repeated once per
+	instance, and each per-instance value is repeated over its instance's rows.
+	Each instance's indices are offset past the previous instance's, so rows of
+	different instances never share an IDX
+	Args:
+		indices: Vertex indices of the draw
+		attrs: Per-vertex attributes of the draw
+		attrValues: Decoded per-vertex values, one list per attribute
+		instanceValues: Per-instance values from broadcastInstances, one list per attribute
+		numInstances: Number of instances in the draw
+		separate: Put a primitive restart between instances, for strips and fans
+	Returns:
+		Tuple of (indices, per-vertex values followed by the per-instance values)
+	"""
+	if separate and len(indices) > 0:
+		indices = indices + array.array('q', [-1])
+		attrValues = [values + [(0,) * attr.format.compCount] for attr, values in zip(attrs, attrValues)]
+
+	rows = len(indices)
+	indexStride = max(indices) + 1 if rows > 0 else 0
+	expandedIndices = array.array(indices.typecode, indices)
+	for instance in range(1, numInstances):
+		offset = instance * indexStride
+		expandedIndices.extend(idx + offset if idx >= 0 else idx for idx in indices)
+	expanded = [values * numInstances for values in attrValues]
+	expanded += [list(itertools.chain.from_iterable(map(itertools.repeat, values, itertools.repeat(rows))))
+		for values in instanceValues]
+
+	if separate and len(expandedIndices) > 0:
+		# No restart after the last instance
+		expandedIndices.pop()
+		for values in expanded:
+			values.pop()
+	return (expandedIndices, expanded)
+
+# Magic bytes at the start of a .meshbin file
+MESHBIN_MAGIC = b"RDMESH\x00\x01"
+
+# Standard-size struct characters for each component type and byte width
+binaryChars = {}
+#                                 012345678
+binaryChars[rd.CompType.UInt]  = "xBHxIxxxQ"
+binaryChars[rd.CompType.SInt]  = "xbhxixxxq"
+binaryChars[rd.CompType.Float] = "xxexfxxxd"
+binaryChars[rd.CompType.UNorm] = binaryChars[rd.CompType.UInt]
+binaryChars[rd.CompType.UScaled] = binaryChars[rd.CompType.UInt]
+binaryChars[rd.CompType.SNorm] = binaryChars[rd.CompType.SInt]
+binaryChars[rd.CompType.SScaled] = binaryChars[rd.CompType.SInt]
+
+def writeMeshBinary(outPath, fileheader, indices, attrs, rawValues, topology=None):
+	"""
+	Write mesh data as a .meshbin file: magic, JSON header, then one
+	8-byte aligned little-endian block per column. Attribute columns keep
+	their original component type; UNorm/SNorm columns are stored raw and
+	flagged so the reader normalises them exactly like unpackData.
+	Args:
+		outPath: Output file path
+		fileheader: Column names, same as the CSV header
+		indices: Vertex indices of the draw
+		attrs: Non-special mesh attributes, in column order
+		rawValues: Per-attribute lists of unnormalised values, one per index
+		topology: Primitive topology name of the draw, stored in the header
+	"""
+	numRows = len(indices)
+	blocks = [struct.pack("<%dI" % numRows, *range(numRows)), struct.pack("<%dq" % numRows, *indices)]
+	columns = [{"name": fileheader[0], "type": "I"}, {"name": fileheader[1], "type": "q"}]
+
+	for attr, values in zip(attrs, rawValues):
+		fmt = attr.format
+		typeChar = binaryChars[fmt.compType][fmt.compByteWidth]
+		normalize = None
+		if fmt.compType == rd.CompType.UNorm:
+			normalize = "unorm"
+		elif fmt.compType == rd.CompType.SNorm:
+			normalize = "snorm"
+
+		for j in range(fmt.compCount):
+			columns.append({"name": fileheader[len(columns)], "type": typeChar, "normalize": normalize})
+			blocks.append(struct.pack("<%d%s" % (numRows, typeChar), *[v[j] for v in values]))
+
+	# Column offsets are relative to the data section, which starts at the
+	# first 8-byte boundary after the header
+	def align(n):
+		return (n + 7) & ~7
+
+	offset = 0
+	for column, block in zip(columns, blocks):
+		column["offset"] = offset
+		offset = align(offset + len(block))
+	header = {"version": 1, "rows": numRows, "topology": topology, "columns": columns}
+	headerBytes = json.dumps(header).encode("utf-8")
+	dataStart = align(len(MESHBIN_MAGIC) + 4 + len(headerBytes))
+
+	with open(outPath, "wb") as binFile:
+		binFile.write(MESHBIN_MAGIC)
+		binFile.write(struct.pack("<I", len(headerBytes)))
+		binFile.write(headerBytes)
+		for column, block in zip(columns, blocks):
+			binFile.write(bytes(dataStart + column["offset"] - binFile.tell()))
+			binFile.write(block)
+
+def drawStats(attrs, instanceAttrs, attrValues, indices):
+	"""
+	Summarise a decoded draw for its JSON and the catalog
+	Args:
+		attrs: Per-vertex attributes of the draw
+		instanceAttrs: Per-instance attributes of the draw
+		attrValues: Decoded values of attrs, one list per attribute
+		indices: Vertex indices of the draw; -1 marks a primitive restart
+	Returns:
+		Dict with vertexCount (distinct vertices), indexCount, bounds ({min, max}
+		of the position attribute, or None) and the attribute layout
+	"""
+	first, last = indexRange(indices)
+	restarts = first is not None and min(indices) < 0
+	stats = {
+		"vertexCount": 0 if first is None else len(set(indices)) - restarts,
+		"indexCount": len(indices),
+		"bounds": None,
+		"attributes": [{"name": attr.name, "type": compTypeNames.get(attr.format.compType, "Unknown"),
+			"width": attr.format.compByteWidth, "components": attr.format.compCount,
+			"perInstance": attr.perInstance} for attr in attrs + instanceAttrs],
+	}
+
+	for attr, values in zip(attrs, attrValues):
+		if "POS" not in attr.name.upper():
+			continue
+		if first is None:
+			break
+		if restarts:
+			values = list(itertools.compress(values, [i >= 0 for i in indices]))
+		# meshbin keeps UNorm/SNorm values raw, bounds are always normalised
+		if outputFormat == "meshbin" and attr.format.compType in (rd.CompType.UNorm, rd.CompType.SNorm):
+			values = list(map(getPostProcess(attr.format), values))
+		columns = list(zip(*values))[:3]
+		stats["bounds"] = {"min": [min(column) for column in columns], "max": [max(column) for column in columns]}
+		break
+	return stats
+
+def attributeColumns(attrs):
+	"""
+	Get the CSV column names of attributes
+	Args:
+		attrs: Mesh data objects of the attributes
+	Returns:
+		List with one "{name}.x/.y/.z/.w" column per component
+	"""
 	formatxyzw = [".x", ".y", ".z", ".w"]
+	return ["{0}{1}".format(attr.name, formatxyzw[i]) for attr in attrs for i in range(attr.format.compCount)]
 
-	if isPrint:
-		print("Mesh configuration:")
-	
-	# Build CSV header
-	fileheader.append("VTX")
-	fileheader.append("IDX")
-	for attr in meshData:
-		if not attr.format.Special():
-			if isPrint:
-				print("\t%s:" % attr.name)
-				print("\t\t- vertex: %s / %d stride" % (attr.vertexResourceId, attr.vertexByteStride))
-				print("\t\t- format: %s x %s @ %d" % (attr.format.compType, attr.format.compCount, attr.vertexByteOffset))
-			
-			headFormat = "{0}{1}"
-			for i in range(0, attr.format.compCount):
-				newStr = headFormat.format(attr.name, formatxyzw[i])
-				fileheader.append(newStr)
+def writeInstanceTable(modelsFolder, eventId, attrs, instanceValues, instanceOffset, numInstances):
+	"""
+	Write the per-instance attributes of a draw as a table with one row per
+	instance: INST is the instance, IDX the instance index including the
+	draw's instance offset. Same format as the mesh file (CSV or .meshbin).
+	Args:
+		modelsFolder: Folder the mesh is written to
+		eventId: The event ID of the draw
+		attrs: Per-instance attributes of the draw
+		instanceValues: Values from broadcastInstances, one list per attribute
+		instanceOffset: First instance of the draw
+		numInstances: Number of instances in the draw
+	Returns:
+		File name of the table, relative to modelsFolder
+	"""
+	fileheader = ["INST", "IDX"] + attributeColumns(attrs)
+	instanceIds = array.array('q', range(instanceOffset, instanceOffset + numInstances))
+	if outputFormat == "meshbin":
+		outName = "model_event{0}_instances.meshbin".format(eventId)
+		writeMeshBinary("{0}/{1}".format(modelsFolder, outName), fileheader, instanceIds, attrs, instanceValues)
+	else:
+		outName = "model_event{0}_instances.csv".format(eventId)
+		with open("{0}/{1}".format(modelsFolder, outName), "w", newline='') as csvFile:
+			writer = csv.writer(csvFile)
+			writer.writerow(fileheader)
+			for i, idx in enumerate(instanceIds):
+				row = [i, idx]
+				for values in instanceValues:
+					row.extend(values[i])
+				writer.writerow(row)
+	return outName
+
+class DecodedDraw:
+	"""
+	Decoded indices and attributes of a draw, filled in by the writer thread
+	that decodes it and waited on by later draws that reuse the decode.
+	"""
+	def __init__(self):
+		self.ready = threading.Event()
+		self.value = None
+		self.cacheKey = None
 
-	# Create models folder if it doesn't exist
-	modelsFolder = "{0}/models".format(folderName)
-	if not os.path.exists(modelsFolder):
-		os.makedirs(modelsFolder)
-
-	# Create CSV file with EID in filename, all in models folder
-	csvArray.append(fileheader)
-	outPath = "{0}/model_event{1}.csv".format(modelsFolder, draw.eventId)
-	csvFile = open(outPath, "w", newline='')
-	writer = csv.writer(csvFile)
-	
+	def set(self, value):
+		self.value = value
+		self.ready.set()
+
+	def wait(self):
+		self.ready.wait()
+		return self.value
+
+# Bump when the exported file contents change, so older cache entries stop matching
+meshCacheVersion = 2
+
+def meshCacheKey(job):
+	"""
+	Hash the raw data and layout a draw's exported files are built from
+	Args:
+		job: MeshJob with its indices and vertex data fetched
+	Returns:
+		Hex digest keying the draw's files in the MeshCache
+	"""
+	first = job.meshData[0]
+	layout = [meshCacheVersion, outputFormat, instanceMode, topologyNames.get(first.topology, "Unknown"), first.restartIndex,
+		first.instanceOffset, first.numInstances, first.postVS, postVSWorldMatrix and [float(v) for v in postVSWorldMatrix]]
+	layout += [[attr.name, int(attr.format.compType), attr.format.compByteWidth, attr.format.compCount,
+		attr.format.BGRAOrder(), attr.vertexByteOffset - attr.vertexBufferOffset, attr.vertexByteStride,
+		attr.perInstance, attr.instanceRate] for attr in job.attrs + job.instanceAttrs]
+
+	digest = hashlib.sha256(json.dumps(layout).encode("utf-8"))
+	digest.update(job.indices.tobytes())
+	for data, baseIndex in job.vbData:
+		digest.update(struct.pack("<qQ", baseIndex, len(data)))
+		digest.update(data)
+	for elements, data, baseIndex in job.instanceData:
+		digest.update(struct.pack("<qQ", baseIndex, len(data)))
+		digest.update(data)
+	return digest.hexdigest()
+
+def linkOrCopy(src, dst):
+	"""
+	Hard-link src as dst, copying where links aren't supported (e.g. across drives).
+	dst is replaced atomically, so a file linked elsewhere is never written through.
+	Args:
+		src: Existing file
+		dst: Path to create or replace
+	"""
+	# Replacing a link with itself is a no-op that would leave the temporary link behind
+	if os.path.exists(dst) and os.path.samefile(src, dst):
+		return
+	tmpPath = "{0}.{1}.{2}.tmp".format(dst, os.getpid(), threading.get_ident())
+	try:
+		try:
+			os.link(src, tmpPath)
+		except OSError:
+			shutil.copyfile(src, tmpPath)
+		os.replace(tmpPath, dst)
+	finally:
+		removeFile(tmpPath)
+
+def removeFile(path):
+	"""Remove a file if it exists"""
+	try:
+		os.remove(path)
+	except FileNotFoundError:
+		pass
+
+class MeshCache:
+	"""
+	On-disk cache of exported mesh files, shared across runs and captures and
+	keyed by meshCacheKey. A hit hard-links the cached files into the models
+	folder instead of decoding and writing the draw again. Each entry is the
+	mesh file, the instance table if any, and a JSON written last that marks
+	the entry complete and records its last use for LRU eviction.
+	Args:
+		folder: Cache folder
+		maxBytes: Least recently used entries are evicted past this size by evict
+		startTime: Start of the run, entries used since are kept by evict. Defaults to now
+	"""
+	def __init__(self, folder, maxBytes, startTime=None):
+		self.folder = folder
+		self.maxBytes = maxBytes
+		self.lock = threading.Lock()
+		# File times can lag the clock slightly
+		self.startTime = (time.time() if startTime is None else startTime) - 2.0
+		self.hitCount = 0
+		self.storeCount = 0
+		os.makedirs(folder, exist_ok=True)
+
+	def entryPath(self, key, suffix):
+		return os.path.join(self.folder, key + suffix)
+
+	def restore(self, key, modelsFolder, eventId):
+		"""
+		Link a cached draw's files into the models folder
+		Args:
+			key: Cache key of the draw
+			modelsFolder: Folder to export the draw to
+			eventId: The event ID of the draw
+		Returns:
+			Tuple of (mesh path, topology name, instances info, stats), or None on a miss
+		"""
+		try:
+			with open(self.entryPath(key, ".json"), "r") as entryFile:
+				entry = json.load(entryFile)
+			extension = entry["extension"]
+			outPath = "{0}/model_event{1}{2}".format(modelsFolder, eventId, extension)
+			linkOrCopy(self.entryPath(key, extension), outPath)
+			instances = entry.get("instances")
+			if entry.get("table"):
+				tableName = "model_event{0}_instances{1}".format(eventId, extension)
+				linkOrCopy(self.entryPath(key, "_instances" + extension), "{0}/{1}".format(modelsFolder, tableName))
+				instances = dict(instances, table=tableName)
+			# The entry's modification time is its last use
+			os.utime(self.entryPath(key, ".json"))
+		except (OSError, ValueError, KeyError):
+			return None
+		with self.lock:
+			self.hitCount += 1
+		return (outPath, entry["topology"], instances, entry.get("stats"))
+
+	def store(self, key, outPath, topology, instances, stats=None):
+		"""
+		Add a written draw's files to the cache
+		Args:
+			key: Cache key of the draw
+			outPath: Path of the exported mesh file
+			topology: Primitive topology name of the draw
+			instances: Instancing info of the draw, or None
+			stats: Draw stats from drawStats, or None
+		"""
+		extension = os.path.splitext(outPath)[1]
+		entry = {"extension": extension, "topology": topology, "instances": instances, "stats": stats}
+		linkOrCopy(outPath, self.entryPath(key, extension))
+		if instances is not None and "table" in instances:
+			tablePath = "{0}/{1}".format(os.path.dirname(outPath), instances["table"])
+			linkOrCopy(tablePath, self.entryPath(key, "_instances" + extension))
+			entry["table"] = True
+			entry["instances"] = dict((name, value) for name, value in instances.items() if name != "table")
+		tmpPath = self.entryPath(key, ".json.{0}.{1}.tmp".format(os.getpid(), threading.get_ident()))
+		with open(tmpPath, "w") as entryFile:
+			json.dump(entry, entryFile)
+		os.replace(tmpPath, self.entryPath(key, ".json"))
+		with self.lock:
+			self.storeCount += 1
+
+	def evict(self):
+		"""
+		Remove least recently used entries until the cache fits in maxBytes.
+		Entries used by this run are kept. Only call once no export is using the cache
+		Returns:
+			Number of entries removed
+		"""
+		entries = {}
+		for name in os.listdir(self.folder):
+			path = os.path.join(self.folder, name)
+			try:
+				st = os.stat(path)
+			except OSError:
+				continue
+			# Keys are 64 hex digits; files of incomplete entries have no JSON and sort first
+			entry = entries.setdefault(name[:64], {"size": 0, "lastUse": 0.0, "files": []})
+			entry["size"] += st.st_size
+			entry["files"].append(path)
+			if name == name[:64] + ".json":
+				entry["lastUse"] = st.st_mtime
+
+		total = sum(entry["size"] for entry in entries.values())
+		removed = 0
+		for key, entry in sorted(entries.items(), key=lambda item: item[1]["lastUse"]):
+			if total <= self.maxBytes:
+				break
+			if entry["lastUse"] >= self.startTime:
+				continue
+			for path in entry["files"]:
+				removeFile(path)
+			total -= entry["size"]
+			removed += 1
+		return removed
+
+# Mesh cache of the current run, None when meshCacheFolder isn't set
+meshCache = None
+
+class MeshJob:
+	"""
+	Everything a writer thread needs to export one draw, fetched on the
+	replay thread so no replay controller calls happen during decoding.
+	"""
+	def __init__(self, eventId, name, meshData):
+		self.eventId = eventId
+		self.name = name
+		self.meshData = meshData
+		self.attrs = [attr for attr in meshData if not attr.format.Special() and not attr.perInstance]
+		self.instanceAttrs = [attr for attr in meshData if not attr.format.Special() and attr.perInstance]
+		self.indices = None
+		self.vbData = []
+		self.instanceData = []
+		self.decoded = None
+		self.reuseDecoded = False
+		self.textures = {}
+
+def fetchMeshJob(controller, meshData, draw):
+	"""
+	Fetch the raw buffers of a draw and save its output textures (replay thread)
+	Args:
+		controller: Replay controller
+		meshData: List of mesh input data
+		draw: Draw call information
+	Returns:
+		MeshJob ready for writeMeshJob
+	"""
 	# Save output textures in both PNG and EXR formats
-	for inputIter in draw.outputs:
+	for inputIter in (draw.outputs if drawFilter.saveTextures(draw.eventId) else []):
 		# Save as PNG
 		if not pySaveTexture(inputIter, draw.eventId, controller, "output"):
 			break
@@ -317,41 +1792,280 @@ def printMeshData(controller, meshData, draw):
 		if not pySaveTextureEXR(inputIter, draw.eventId, controller, "output"):
 			break
 
-	# Process each vertex
-	i = 0
-	for idx in indices:
-		# Build vertex data array
-		indiceArray = []
-		
-		if isPrint:
-			print("Vertex %d is index %d:" % (i, idx))
-		
-		indiceArray.append(i)
-		indiceArray.append(idx)
-		
-		for attr in meshData:
-			if not attr.format.Special():
-				# This is the data we're reading from. This would be good to cache instead of
-				# re-fetching for every attribute for every index
-				offset = attr.vertexByteOffset + attr.vertexByteStride * idx
-				data = controller.GetBufferData(attr.vertexResourceId, offset, 0)
-
-				# Get the value from the data
-				value = unpackData(attr.format, data)
-				
-				for j in range(0, attr.format.compCount):
-					indiceArray.append(value[j])
+	# Buffers are fetched once and reused by later draws while unchanged. Their
+	# contents are those of the event the controller is at, which is the previous
+	# event when the seek to this draw was skipped
+	bufferCache = getBufferCache(controller)
+	eventId = replayStats["eventId"]
+	job = MeshJob(draw.eventId, draw.name, meshData)
+	job.textures = json.loads(json.dumps(textureRegistry.getDrawTextures(draw.eventId)))
+
+	if meshData[0].postVS:
+		# Post-VS buffers are replay-internal and rewritten for every draw, so they
+		# bypass the buffer cache. The outputs are interleaved in one buffer, fetched once
+		job.indices = getIndices(controller, meshData[0])
+		widest = max(job.attrs, key=lambda attr: attr.vertexByteOffset + attr.format.compCount * attr.format.compByteWidth)
+		job.vbData = [fetchVertexData(controller, widest, job.indices)] * len(job.attrs)
+		job.decoded = DecodedDraw()
+		if meshCache is not None:
+			with profiler.stage("HashMesh", draw.eventId):
+				job.decoded.cacheKey = meshCacheKey(job)
+		return job
+
+	# Draws with the same buffers and layout reuse the previous decode
+	fingerprint = drawFingerprint(meshData)
+	resourceIds = ([meshData[0].indexResourceId] + [attr.vertexResourceId for attr in job.attrs]
+		+ [attr.vertexResourceId for attr in job.instanceAttrs])
+	job.decoded = bufferCache.getDecoded(fingerprint, resourceIds, eventId)
+	if job.decoded is not None:
+		job.reuseDecoded = True
+		return job
+
+	# Only the draw's indices, and the vertices between the lowest and highest of them
+	job.indices = getIndices(controller, meshData[0], bufferCache, eventId)
+	for attr in job.attrs:
+		job.vbData.append(fetchVertexData(controller, attr, job.indices, bufferCache, eventId))
+	# Per-instance attributes: only the elements the instances read, each once
+	for attr in job.instanceAttrs:
+		elements = instanceElements(attr)
+		job.instanceData.append((elements,) + fetchVertexData(controller, attr, elements, bufferCache, eventId))
+	job.decoded = DecodedDraw()
+	if meshCache is not None:
+		with profiler.stage("HashMesh", draw.eventId):
+			job.decoded.cacheKey = meshCacheKey(job)
+	bufferCache.putDecoded(fingerprint, eventId, job.decoded)
+	return job
+
+def writeMeshJob(job):
+	"""
+	Decode a fetched draw and export it to CSV (or .meshbin) (writer thread).
+	If the job fails before its decode is handed off, draws reusing the decode
+	are released with a failure instead of waiting forever.
+	Args:
+		job: MeshJob from fetchMeshJob
+	"""
+	try:
+		exportMeshJob(job)
+	finally:
+		if not job.reuseDecoded and not job.decoded.ready.is_set():
+			job.decoded.set(None)
+
+def exportMeshJob(job):
+	"""
+	Body of writeMeshJob, which releases draws reusing this job's decode on failure
+	Args:
+		job: MeshJob from fetchMeshJob
+	"""
+	meshData = job.meshData
+	attrs = job.attrs
+
+	# Create models folder if it doesn't exist
+	modelsFolder = "{0}/models".format(folderName)
+	os.makedirs(modelsFolder, exist_ok=True)
+
+	# Byte-identical draws exported before are linked from the mesh cache
+	cacheKey = job.decoded.cacheKey
+	if meshCache is not None and cacheKey is not None:
+		with profiler.stage("MeshCache", job.eventId):
+			restored = meshCache.restore(cacheKey, modelsFolder, job.eventId)
+		if restored is not None:
+			if not job.reuseDecoded:
+				# Draws reusing this one's decode are restored from the cache as well
+				job.decoded.set(meshCacheHit)
+			outPath, topology, instances, stats = restored
+			writeDrawInfo(modelsFolder, job.eventId, job.name, job.textures, outPath, topology, instances, stats)
+			print("Linked cached mesh data: {0}".format(outPath))
+			return
+
+	if job.reuseDecoded:
+		decoded = job.decoded.wait()
+		if decoded is None:
+			raise RuntimeError("Decoding the draw reused by event {0} failed".format(job.eventId))
+		if decoded is meshCacheHit:
+			raise RuntimeError("Mesh cache entry of the draw reused by event {0} is missing".format(job.eventId))
+		indices, attrValues, instanceValues = decoded
+	else:
+		with profiler.stage("DecodeAttributes", job.eventId):
+			indices = job.indices
+
+			# Decode every attribute for all indices at once from the fetched vertex ranges
+			attrValues = []
+			for attr, (data, baseIndex) in zip(attrs, job.vbData):
+				offset = attr.vertexByteOffset - attr.vertexBufferOffset
+				attrValues.append(decodeAttribute(attr.format, data, attr.vertexByteStride, offset, indices,
+					outputFormat != "meshbin", baseIndex))
+
+			# Per-instance attributes decode each element once, then repeat it per instance
+			instanceValues = []
+			for attr, (elements, data, baseIndex) in zip(job.instanceAttrs, job.instanceData):
+				offset = attr.vertexByteOffset - attr.vertexBufferOffset
+				values = decodeAttribute(attr.format, data, attr.vertexByteStride, offset, elements,
+					outputFormat != "meshbin", baseIndex)
+				instanceValues.append(broadcastInstances(values, attr.instanceRate, attr.numInstances))
+
+			# Post-VS positions in world space instead of clip space
+			if postVSWorldMatrix is not None:
+				attrValues = [clipToWorld(values, postVSWorldMatrix) if attr.clipPosition else values
+					for attr, values in zip(attrs, attrValues)]
+		job.decoded.set((indices, attrValues, instanceValues))
+
+	# Counts and bounds for the catalog, before any instances are expanded
+	with profiler.stage("DrawStats", job.eventId):
+		stats = drawStats(attrs, job.instanceAttrs, attrValues, indices)
+
+	# Strips and fans are written in index order; the converter expands them
+	topology = topologyNames.get(meshData[0].topology, "Unknown")
+	numInstances = meshData[0].numInstances
+	instances = None
+	if job.instanceAttrs:
+		instances = {
+			"count": numInstances,
+			"offset": meshData[0].instanceOffset,
+			"attributes": [attr.name for attr in job.instanceAttrs],
+		}
+		if instanceMode == "expand":
+			with profiler.stage("ExpandInstances", job.eventId):
+				indices, attrValues = expandInstances(indices, attrs, attrValues, instanceValues, numInstances,
+					meshData[0].topology in restartTopologies)
+			attrs = attrs + job.instanceAttrs
+			instances["expanded"] = True
+
+	if isPrint:
+		print("Mesh configuration:")
+		for attr in attrs:
+			print("\t%s:" % attr.name)
+			print("\t\t- vertex: %s / %d stride" % (attr.vertexResourceId, attr.vertexByteStride))
+			print("\t\t- format: %s x %s @ %d" % (attr.format.compType, attr.format.compCount, attr.vertexByteOffset))
+
+	# Build CSV header
+	fileheader = ["VTX", "IDX"] + attributeColumns(attrs)
+
+	# Files from an earlier run may be hard links into the mesh cache, even when
+	# this run doesn't use it, so they are replaced rather than written through
+	outPath = "{0}/model_event{1}.{2}".format(modelsFolder, job.eventId, "meshbin" if outputFormat == "meshbin" else "csv")
+	removeFile(outPath)
+	removeFile("{0}/model_event{1}_instances{2}".format(modelsFolder, job.eventId, os.path.splitext(outPath)[1]))
+
+	if instances is not None and not instances.get("expanded"):
+		with profiler.stage("WriteInstances", job.eventId):
+			instances["table"] = writeInstanceTable(modelsFolder, job.eventId, job.instanceAttrs, instanceValues,
+				meshData[0].instanceOffset, numInstances)
+
+	if outputFormat == "meshbin":
+		# Binary columns with the original component types, EID in filename
+		with profiler.stage("WriteMeshbin", job.eventId):
+			writeMeshBinary(outPath, fileheader, indices, attrs, attrValues, topology)
+		profiler.addBytes("WriteMeshbin", os.path.getsize(outPath))
+	else:
+		# Create CSV file with EID in filename, all in models folder
+		writeStage = profiler.stage("WriteCSV", job.eventId)
+		with writeStage, open(outPath, "w", newline='') as csvFile:
+			writer = csv.writer(csvFile)
+			writer.writerow(fileheader)
+
+			# Rows are written as they are produced instead of collected first
+			for i, idx in enumerate(indices):
+				# Build vertex data array
+				indiceArray = [i, idx]
 
 				if isPrint:
-					print("\tAttribute '%s': %s" % (attr.name, value))
+					print("Vertex %d is index %d:" % (i, idx))
+
+				for attr, values in zip(attrs, attrValues):
+					value = values[i]
+					indiceArray.extend(value)
+
+					if isPrint:
+						print("\tAttribute '%s': %s" % (attr.name, value))
 
-		csvArray.append(indiceArray)
-		i = i + 1
+				writer.writerow(indiceArray)
+		profiler.addBytes("WriteCSV", os.path.getsize(outPath))
 
-	writer.writerows(csvArray)
-	csvFile.close()
+	if meshCache is not None and cacheKey is not None:
+		with profiler.stage("MeshCache", job.eventId):
+			meshCache.store(cacheKey, outPath, topology, instances, stats)
+
+	writeDrawInfo(modelsFolder, job.eventId, job.name, job.textures, outPath, topology, instances, stats)
 	print("Saved mesh data: {0}".format(outPath))
 
+# Decode result of a draw restored from the mesh cache instead of decoded
+meshCacheHit = ()
+
+class ExportPipeline:
+	"""
+	Bounded producer/consumer queue between the replay thread, which fetches
+	raw buffers, and writer threads, which decode and write the mesh files.
+	The replay thread blocks when the queue is full, so memory stays bounded.
+	Args:
+		numWorkers: Number of writer threads, 0 writes inline on the replay thread
+		queueDepth: Maximum number of fetched draws waiting for a writer
+	"""
+	def __init__(self, numWorkers, queueDepth):
+		self.queue = queue.Queue(maxsize=max(1, queueDepth))
+		self.errors = []
+		self.workers = []
+		for i in range(numWorkers):
+			worker = threading.Thread(target=self.run, name="MeshWriter{0}".format(i))
+			worker.daemon = True
+			worker.start()
+			self.workers.append(worker)
+
+	def run(self):
+		while True:
+			job = self.queue.get()
+			if job is None:
+				return
+			try:
+				writeMeshJob(job)
+			except Exception as e:
+				self.errors.append((job.eventId, e))
+
+	def submit(self, job):
+		"""
+		Hand a fetched draw to the writers, blocking while the queue is full
+		Args:
+			job: MeshJob from fetchMeshJob
+		"""
+		if not self.workers:
+			writeMeshJob(job)
+		else:
+			self.queue.put(job)
+
+	def close(self):
+		"""
+		Wait for all queued draws to be written, then re-raise the first writer error
+		"""
+		for worker in self.workers:
+			self.queue.put(None)
+		for worker in self.workers:
+			worker.join()
+		self.workers = []
+		if self.errors:
+			eventId, error = self.errors[0]
+			print("Failed to export {0} draws, first failure at event {1}".format(len(self.errors), eventId))
+			raise error
+
+# Writer pipeline of the current run, None writes inline
+exportPipeline = None
+
+def printMeshData(controller, meshData, draw):
+	"""
+	Export mesh data to CSV (or .meshbin) file and save output textures.
+	Buffers are fetched here; decoding and writing happen on the writer threads.
+	Args:
+		controller: Replay controller
+		meshData: List of mesh input data
+		draw: Draw call information
+	"""
+	if isPrint:
+		print("Processing mesh data...")
+
+	job = fetchMeshJob(controller, meshData, draw)
+	if exportPipeline is not None:
+		exportPipeline.submit(job)
+	else:
+		writeMeshJob(job)
+
 def sampleCodePreDraw(controller, draw):
 	"""
 	Process individual draw call if within specified range
@@ -360,38 +2074,138 @@ def sampleCodePreDraw(controller, draw):
 		draw: Draw call information
 	"""
 	if draw.eventId >= startIndex and draw.eventId <= endIndex:
-		# Move to that draw
-		controller.SetFrameEvent(draw.eventId, True)
+		profiler.currentEventId = draw.eventId
+		with profiler.stage("Draw", draw.eventId):
+			sampleCodeDraw(controller, draw)
 
-		if isPrint:
-			print("Decoding mesh inputs at %d: %s\n\n" % (draw.eventId, draw.name))
-
-		# Calculate the mesh input configuration
-		meshInputs = getMeshInputs(controller, draw)
-		
-		# Fetch and export the data from the mesh inputs
-		printMeshData(controller, meshInputs, draw)
+def canSkipSeek(draw):
+	"""
+	Check whether a draw can be exported without moving the controller to it.
+	A draw right after the event the controller is at has no API call in between,
+	so it sees the same bindings, and its input buffers hold what they held after
+	that event. Its textures and post-VS data need the draw itself replayed.
+	Args:
+		draw: Draw call information
+	Returns:
+		True if the controller can stay where it is
+	"""
+	return (not forceReplay and replayStats["eventId"] is not None and draw.eventId == replayStats["eventId"] + 1
+		and meshStage != "vsout" and not drawFilter.saveTextures(draw.eventId))
 
-def sampleCodeRecursion(controller, draw):
+def sampleCodeDraw(controller, draw):
 	"""
-	Recursively process draw calls and their children
+	Replay to a draw call and export it
 	Args:
 		controller: Replay controller
 		draw: Draw call information
 	"""
-	sampleCodePreDraw(controller, draw)
+	# Move to that draw
+	# Moving forward through the frame doesn't need a forced full replay
+	if canSkipSeek(draw):
+		replayStats["skipped"] += 1
+	else:
+		controller.SetFrameEvent(draw.eventId, forceReplay)
+		replayStats["seeks"] += 1
+		replayStats["eventId"] = draw.eventId
+
+	if isPrint:
+		print("Decoding mesh inputs at %d: %s\n\n" % (draw.eventId, draw.name))
+
+	# Calculate the mesh input configuration
+	meshInputs = getMeshInputs(controller, draw)
+	if meshStage == "vsout":
+		meshOutputs = getMeshOutputs(controller, draw)
+		# Outputs are only usable if at least one of them can be decoded
+		if any(not meshOutput.format.Special() for meshOutput in meshOutputs):
+			meshInputs = meshOutputs
+		else:
+			print("No post-VS data at event {0}, exported the vertex inputs".format(draw.eventId))
+
+	# Draws that pull their vertices in the shader have no vertex inputs to export
+	if not meshInputs:
+		print("No vertex inputs at event {0}, skipped its mesh".format(draw.eventId))
+		return
 	
-	for d in draw.children:
-		sampleCodeRecursion(controller, d)
+	# Fetch and export the data from the mesh inputs
+	printMeshData(controller, meshInputs, draw)
 
-def sampleCode(controller):
+def sampleCode(controller, shard=None):
 	"""
-	Main processing function - iterate through all root draw calls
+	Main processing function - iterate through all draw calls in range
 	Args:
 		controller: Replay controller
+		shard: Optional (shardIndex, shardCount) to export only a contiguous
+			part of the draws in range, for a sharded run
 	"""
-	for draw in controller.GetRootActions():
-		sampleCodeRecursion(controller, draw)
+	global textureRegistry, drawIndexCache, bufferCacheState, replayStats, exportPipeline, profiler, exportedDraws, meshCache
+	global drawFilter
+
+	# Time every replay call and export stage when profiling
+	profiler = Profiler(profileOutput is not None)
+	if profiler.enabled:
+		controller = ProfiledController(controller, profiler)
+
+	# Textures and buffers are only reused within a single run
+	shardFolder = "{0}/{1}".format(folderName, shardFolderName)
+	textureRegistry = TextureExportRegistry(shardFolder + "/claims" if shard is not None else None)
+	exportedDraws = []
+	bufferCache = BufferCache(controller, bufferCacheMB * 1024 * 1024)
+	bufferCacheState = (controller, bufferCache)
+	replayStats = {"seeks": 0, "skipped": 0, "eventId": None}
+	meshCache = MeshCache(meshCacheFolder, meshCacheMB * 1024 * 1024) if meshCacheFolder else None
+
+	# Flatten the action tree once per run
+	drawIndex = DrawIndex(controller.GetRootActions())
+	drawIndexCache = (controller, drawIndex)
+
+	# Select the range with a bisect over the flattened action index
+	draws = drawIndex.range(startIndex, endIndex)
+
+	# Filters only look at the action tree, so filtered-out draws are never replayed
+	drawFilter = DrawFilter(includeFilter, excludeFilter, minIndices, requireFlags, skipFlags, exportTextures, textureFilter)
+	rangeCount = len(draws)
+	draws = drawFilter.select(draws, drawIndex)
+	if len(draws) < rangeCount:
+		print("Filters: {0} of {1} actions in range selected".format(len(draws), rangeCount))
+
+	if shard is not None:
+		# Contiguous shards keep each process replaying forward through the frame
+		shardIndex, count = shard
+		draws = draws[len(draws) * shardIndex // count:len(draws) * (shardIndex + 1) // count]
+
+	exportPipeline = ExportPipeline(writerThreads, queueDepth)
+	try:
+		for draw in draws:
+			sampleCodePreDraw(controller, draw)
+	finally:
+		pipeline = exportPipeline
+		exportPipeline = None
+		pipeline.close()
+
+	print("Saved {0} unique textures, skipped {1} duplicate saves".format(len(textureRegistry.saved) - textureRegistry.otherShardCount, textureRegistry.skippedCount))
+	print("Replays: {0} seeks, {1} skipped for draws right after the current event".format(replayStats["seeks"], replayStats["skipped"]))
+	print("Buffers: {0} fetched, {1} fetches avoided, {2} draws reused a previous decode".format(bufferCache.fetchCount, bufferCache.reuseCount, bufferCache.decodeReuseCount))
+
+	if meshCache is not None:
+		print("Mesh cache: {0} draws linked, {1} stored".format(meshCache.hitCount, meshCache.storeCount))
+
+	if shard is None:
+		writeManifest("{0}/manifest.json".format(folderName), exportedDraws, textureRegistry.saved.values())
+		if catalogName:
+			writeCatalog("{0}/{1}".format(folderName, catalogName), exportedDraws)
+		if meshCache is not None:
+			print("Mesh cache: {0} least recently used entries evicted".format(meshCache.evict()))
+	else:
+		# Merged into manifest.json once every shard has finished
+		writeManifest("{0}/manifest_shard{1}.json".format(shardFolder, shard[0]), exportedDraws,
+			textureRegistry.saved.values(), shard[1])
+
+	if profiler.enabled:
+		prefix = profileOutput if shard is None else "{0}.shard{1}".format(profileOutput, shard[0])
+		profiler.write(prefix)
+		print("Profile by stage:")
+		profiler.printSummary()
+		print("Profile written to: {0}.trace.json".format(prefix))
 
 def loadCapture(filename):
 	"""
@@ -426,34 +2240,159 @@ def loadCapture(filename):
 
 	return (cap, controller)
 
+# Sub-folder of folderName holding texture claims and per-shard manifests
+shardFolderName = ".shards"
+
+# Configuration passed on to shard processes
+configNames = ["folderName", "startIndex", "endIndex", "isPrint", "forceReplay", "reuseAcrossDraws", "bufferCacheMB",
+	"writerThreads", "queueDepth", "profileOutput", "outputFormat", "meshStage", "postVSWorldMatrix", "instanceMode",
+	"meshCacheFolder", "meshCacheMB", "catalogName", "includeFilter", "excludeFilter", "minIndices", "requireFlags",
+	"skipFlags", "exportTextures", "textureFilter"]
+
+def exportShard(filename, shardIndex, count, config):
+	"""
+	Shard process entry: open the capture with its own replay and export one shard
+	Args:
+		filename: Path to RenderDoc capture file
+		shardIndex: Index of the shard to export
+		count: Number of shards
+		config: Configuration values of the parent process, by name
+	"""
+	globals().update(config)
+	rd.InitialiseReplay(rd.GlobalEnvironment(), [])
+	cap, controller = loadCapture(filename)
+	try:
+		sampleCode(controller, (shardIndex, count))
+	finally:
+		controller.Shutdown()
+		cap.Shutdown()
+		rd.ShutdownReplay()
+
+def mergeShardManifests(count):
+	"""
+	Combine the per-shard manifests into folderName/manifest.json and the catalog
+	Args:
+		count: Number of shards
+	"""
+	shardFolder = "{0}/{1}".format(folderName, shardFolderName)
+	draws = []
+	textures = []
+	for shardIndex in range(count):
+		with open("{0}/manifest_shard{1}.json".format(shardFolder, shardIndex), "r") as manifestFile:
+			manifest = json.load(manifestFile)
+		draws.extend(manifest["draws"])
+		textures.extend(manifest["textures"])
+	writeManifest("{0}/manifest.json".format(folderName), draws, textures, count)
+	if catalogName:
+		writeCatalog("{0}/{1}".format(folderName, catalogName), draws)
+	shutil.rmtree(shardFolder, ignore_errors=True)
+
+def runShardedExport(filename, count):
+	"""
+	Export the draw range with one replay process per shard, then merge their manifests
+	Args:
+		filename: Path to RenderDoc capture file
+		count: Number of shard processes
+	"""
+	startTime = time.time()
+
+	# Fresh claims, so textures of a previous run don't count as saved
+	shardFolder = "{0}/{1}".format(folderName, shardFolderName)
+	shutil.rmtree(shardFolder, ignore_errors=True)
+	os.makedirs(shardFolder + "/claims")
+
+	config = dict((name, globals()[name]) for name in configNames)
+	ctx = multiprocessing.get_context("spawn")
+	processes = [ctx.Process(target=exportShard, args=(filename, shardIndex, count, config), name="shard{0}".format(shardIndex))
+		for shardIndex in range(count)]
+	for process in processes:
+		process.start()
+	for process in processes:
+		process.join()
+
+	failed = [process.name for process in processes if process.exitcode != 0]
+	if failed:
+		raise RuntimeError("Export failed in: " + ", ".join(failed))
+	mergeShardManifests(count)
+
+	# Evicted once no shard is using the cache any more
+	if meshCacheFolder:
+		removed = MeshCache(meshCacheFolder, meshCacheMB * 1024 * 1024, startTime).evict()
+		print("Mesh cache: {0} least recently used entries evicted".format(removed))
+
+def printExportSummary():
+	"""Print where the exported files were saved"""
+	print("Export completed!")
+	print("Models saved in: {0}/models/".format(folderName))
+	print("PNG textures saved in: {0}/textures/".format(folderName))
+	print("EXR textures saved in: {0}/textures_exr/".format(folderName))
+
 # Main execution logic
 if 'pyrenderdoc' in globals():
 	# Running inside RenderDoc UI
 	if isPrint:
 		print("Running inside RenderDoc UI...")
 	pyrenderdoc.Replay().BlockInvoke(sampleCode)
-else:
-	# Running as standalone script
+	printExportSummary()
+elif __name__ == "__main__":
+	# Running as standalone script (importing the module, e.g. from the
+	# benchmarks, only defines the functions)
 	if isPrint:
 		print("Running as standalone script...")
 	
-	rd.InitialiseReplay(rd.GlobalEnvironment(), [])
-
-	if len(sys.argv) <= 1:
+	import argparse
+	parser = argparse.ArgumentParser(description="Export the meshes and textures of a range of draws from a RenderDoc capture.")
+	parser.add_argument("capture", nargs="?", help="RenderDoc capture file (.rdc)")
+	parser.add_argument("--shards", type=int, default=shardCount, help="Worker processes exporting the range in parallel")
+	parser.add_argument("--folder", default=folderName, help="Output folder")
+	parser.add_argument("--start", type=int, default=startIndex, help="First event ID of the range")
+	parser.add_argument("--end", type=int, default=endIndex, help="Last event ID of the range")
+	parser.add_argument("--print", action="store_true", default=isPrint, help="Print decoding details")
+	parser.add_argument("--stage", choices=["vsin", "vsout"], default=meshStage,
+		help="Export the vertex inputs (vsin) or the post-vertex-shader stream (vsout)")
+	parser.add_argument("--world-matrix", type=float, nargs=16, default=postVSWorldMatrix, metavar="M",
+		help="vsout: clip-to-world matrix, 16 floats row major, to write positions in world space")
+	parser.add_argument("--include", default=includeFilter, metavar="REGEX",
+		help="Only export draws whose marker path (\"Marker/.../Draw name\") matches")
+	parser.add_argument("--exclude", default=excludeFilter, metavar="REGEX",
+		help="Skip draws whose marker path matches, e.g. \"UI|Shadow|Blit\"")
+	parser.add_argument("--min-indices", type=int, default=minIndices, metavar="N", help="Skip draws with fewer indices")
+	parser.add_argument("--flags", default=requireFlags, metavar="FLAGS",
+		help="ActionFlags every exported draw has, joined by \"|\" (e.g. \"Drawcall|Indexed\")")
+	parser.add_argument("--skip-flags", default=skipFlags, metavar="FLAGS", help="Skip draws with any of these ActionFlags")
+	parser.add_argument("--no-textures", dest="textures", action="store_false", default=exportTextures,
+		help="Don't save textures")
+	parser.add_argument("--texture-filter", default=textureFilter, metavar="REGEX",
+		help="Only save the textures of draws whose marker path matches")
+	args = parser.parse_args()
+
+	folderName, startIndex, endIndex, isPrint = args.folder, args.start, args.end, args.print
+	meshStage, postVSWorldMatrix = args.stage, args.world_matrix
+	includeFilter, excludeFilter, minIndices = args.include, args.exclude, args.min_indices
+	requireFlags, skipFlags, exportTextures, textureFilter = args.flags, args.skip_flags, args.textures, args.texture_filter
+	try:
+		# Checked before the capture is opened
+		DrawFilter(includeFilter, excludeFilter, minIndices, requireFlags, skipFlags, exportTextures, textureFilter)
+	except (ValueError, re.error) as e:
+		parser.error(str(e))
+
+	if args.capture is None:
 		if isPrint:
-			print('Usage: python3 {} filename.rdc'.format(sys.argv[0]))
+			parser.print_usage()
 		sys.exit(0)
 
-	cap, controller = loadCapture(sys.argv[1])
+	if args.shards > 1:
+		# Every shard process opens the capture with its own replay
+		runShardedExport(args.capture, args.shards)
+	else:
+		rd.InitialiseReplay(rd.GlobalEnvironment(), [])
 
-	sampleCode(controller)
+		cap, controller = loadCapture(args.capture)
 
-	controller.Shutdown()
-	cap.Shutdown()
+		sampleCode(controller)
 
-	rd.ShutdownReplay()
+		controller.Shutdown()
+		cap.Shutdown()
 
-print("Export completed!")
-print("Models saved in: {0}/models/".format(folderName))
-print("PNG textures saved in: {0}/textures/".format(folderName))
-print("EXR textures saved in: {0}/textures_exr/".format(folderName))
\ No newline at end of file
+		rd.ShutdownReplay()
+	printExportSummary()
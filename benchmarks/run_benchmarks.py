@@ -0,0 +1,328 @@
+# Benchmarks for the decode and conversion hot paths. Runs without RenderDoc:
+# RenderDocExport.py is imported against stub_renderdoc.py and fed synthetic
+# vertex/index buffers, and csv_to_obj.py converts scaled copies of the sample
+# CSVs. Every case runs in a fresh process so its peak RSS can be measured.
+#
+#   python benchmarks/run_benchmarks.py -o results.json
+#   python benchmarks/run_benchmarks.py --baseline results.json   # regression check
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import struct
+import sys
+import tempfile
+import time
+
+benchDir = os.path.dirname(os.path.abspath(__file__))
+repoDir = os.path.dirname(benchDir)
+
+# (case name, compType name, byte width, component count, BGRA order)
+decodeFormats = [
+	("unorm8x4", "UNorm", 1, 4, False),
+	("unorm8x4_bgra", "UNorm", 1, 4, True),
+	("snorm16x4", "SNorm", 2, 4, False),
+	("half2", "Float", 2, 2, False),
+	("float3", "Float", 4, 3, False),
+]
+
+# (case name, bytes per index)
+indexFormats = [
+	("index16", 2),
+	("index32", 4),
+]
+
+sampleCsvs = ["chair.csv", "carpet.csv"]
+
+# csv_to_obj output formats; OBJ cases keep their original names
+convertFormats = ["obj", "glb"]
+
+def importExporter():
+	"""
+	Import RenderDocExport.py with the stub renderdoc module
+	Returns:
+		Tuple of (exporter module, stub renderdoc module)
+	"""
+	sys.path.insert(0, benchDir)
+	sys.path.insert(0, repoDir)
+	import stub_renderdoc
+	sys.modules["renderdoc"] = stub_renderdoc
+	import RenderDocExport
+	return RenderDocExport, stub_renderdoc
+
+def peakRssMB():
+	"""
+	Peak resident set size of the current process
+	Returns:
+		Peak RSS in MB, or None where the resource module isn't available
+	"""
+	try:
+		import resource
+	except ImportError:
+		return None
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	# Linux reports KB, macOS reports bytes
+	if sys.platform == "darwin":
+		return peak / (1024.0 * 1024.0)
+	return peak / 1024.0
+
+def randomComponents(compType, compByteWidth, count):
+	"""
+	Generate random raw component values for a format
+	Args:
+		compType: Name of the CompType
+		compByteWidth: Bytes per component
+		count: Number of components
+	Returns:
+		List of values suitable for stub_renderdoc.packValues
+	"""
+	if compType == "Float":
+		return [random.uniform(-1.0, 1.0) for _ in range(count)]
+	bits = compByteWidth * 8
+	if compType in ("SNorm", "SInt"):
+		return [random.randint(-(2 ** (bits - 1)), 2 ** (bits - 1) - 1) for _ in range(count)]
+	return [random.randint(0, 2 ** bits - 1) for _ in range(count)]
+
+def benchDecode(case, numVertices, numIndices, repeat):
+	"""
+	Time fetching and decoding one attribute for a draw through a stub controller
+	Returns:
+		Result dict for the case
+	"""
+	exporter, rd = importExporter()
+	random.seed(1)
+
+	for name, compTypeName, width, count, bgra in decodeFormats:
+		if name == case:
+			break
+	else:
+		raise ValueError("Unknown decode case: " + case)
+
+	compType = getattr(rd.CompType, compTypeName)
+	# Interleave with 8 bytes of other attributes, as in a typical vertex
+	attrSize = width * count
+	stride = ((attrSize + 3) & ~3) + 8
+	padding = bytes(stride - attrSize)
+	vbdata = b"".join(rd.packValues(compType, width, randomComponents(compTypeName, width, count)) + padding
+		for _ in range(numVertices))
+	indices = [random.randrange(numVertices) for _ in range(numIndices)]
+	ibdata = struct.pack("<{0}I".format(numIndices), *indices)
+
+	mesh = exporter.MeshData()
+	mesh.indexResourceId = rd.ResourceId(2)
+	mesh.indexByteStride = 4
+	mesh.numIndices = numIndices
+	mesh.vertexResourceId = rd.ResourceId(1)
+	mesh.vertexByteStride = stride
+	mesh.format = rd.ResourceFormat(compType, width, count, bgra)
+
+	best = None
+	for _ in range(repeat):
+		controller = rd.StubController({1: vbdata, 2: ibdata})
+		start = time.perf_counter()
+		cache = exporter.BufferCache(controller)
+		drawIndices = exporter.getIndices(controller, mesh, cache)
+		data, baseIndex = exporter.fetchVertexData(controller, mesh, drawIndices, cache)
+		exporter.decodeAttribute(mesh.format, data, stride, 0, drawIndices, True, baseIndex)
+		elapsed = time.perf_counter() - start
+		best = elapsed if best is None else min(best, elapsed)
+
+	return {"suite": "decode", "case": case, "vertices": numIndices, "bytes": len(vbdata) + len(ibdata),
+		"seconds": best, "getBufferDataCalls": controller.bufferDataCalls, "bytesFetched": controller.bufferDataBytes}
+
+def benchIndices(case, numIndices, repeat):
+	"""
+	Time fetching and unpacking an index buffer through a stub controller
+	Returns:
+		Result dict for the case
+	"""
+	exporter, rd = importExporter()
+	random.seed(1)
+	width = dict(indexFormats)[case]
+	maxIndex = 2 ** (width * 8) - 1
+	indexChar = "H" if width == 2 else "I"
+	ibdata = struct.pack("<{0}{1}".format(numIndices, indexChar), *(random.randint(0, maxIndex) for _ in range(numIndices)))
+
+	mesh = exporter.MeshData()
+	mesh.indexResourceId = rd.ResourceId(2)
+	mesh.indexByteStride = width
+	mesh.numIndices = numIndices
+	mesh.baseVertex = 0
+
+	best = None
+	for _ in range(repeat):
+		controller = rd.StubController({2: ibdata})
+		start = time.perf_counter()
+		exporter.getIndices(controller, mesh)
+		elapsed = time.perf_counter() - start
+		best = elapsed if best is None else min(best, elapsed)
+
+	return {"suite": "indices", "case": case, "vertices": numIndices, "bytes": len(ibdata), "seconds": best,
+		"bytesFetched": controller.bufferDataBytes}
+
+def benchConvert(case, csvPath, repeat, outputFormat="obj"):
+	"""
+	Time converting one (scaled) CSV file with csv_to_obj
+	Returns:
+		Result dict for the case
+	"""
+	sys.path.insert(0, repoDir)
+	import csv_to_obj
+
+	convert = csv_to_obj.CONVERTERS[outputFormat]
+	outPath = os.path.splitext(csvPath)[0] + "." + outputFormat
+	best = None
+	stats = {}
+	for _ in range(repeat):
+		start = time.perf_counter()
+		with contextlib.redirect_stdout(io.StringIO()):
+			ok = convert(csvPath, outPath, stats)
+		elapsed = time.perf_counter() - start
+		if not ok:
+			raise RuntimeError("Conversion failed: " + csvPath)
+		best = elapsed if best is None else min(best, elapsed)
+
+	return {"suite": "convert", "case": case, "vertices": stats["vertices"], "bytes": os.path.getsize(csvPath),
+		"seconds": best}
+
+def runCase(func, args, resultQueue):
+	"""Child process entry: run one case and report it with the peak RSS"""
+	result = func(*args)
+	result["peakRssMB"] = peakRssMB()
+	resultQueue.put(result)
+
+def runIsolated(func, *args):
+	"""
+	Run a benchmark case in a fresh process
+	Returns:
+		Result dict with throughput and peak RSS
+	"""
+	ctx = multiprocessing.get_context("spawn")
+	resultQueue = ctx.Queue()
+	process = ctx.Process(target=runCase, args=(func, args, resultQueue))
+	process.start()
+	result = resultQueue.get()
+	process.join()
+
+	seconds = max(result["seconds"], 1e-9)
+	result["verticesPerSecond"] = result["vertices"] / seconds
+	result["mbPerSecond"] = result["bytes"] / (1024.0 * 1024.0) / seconds
+	return result
+
+def writeScaledCsv(srcPath, dstPath, scale, unique=False):
+	"""
+	Write a copy of a CSV with its data rows repeated scale times
+	Args:
+		srcPath: Source CSV
+		dstPath: Output CSV
+		scale: Number of copies of the data rows
+		unique: Append the copy number to the last value of each row, so no
+			two rows are the same and the converter can't reuse formatted rows
+	"""
+	with open(srcPath, "r", encoding="utf-8") as src:
+		header = src.readline()
+		body = src.read()
+	if body and not body.endswith("\n"):
+		body += "\n"
+	lines = body.splitlines()
+	with open(dstPath, "w", encoding="utf-8") as dst:
+		dst.write(header)
+		for copy in range(scale):
+			if unique:
+				dst.write("".join("{0}{1:03d}\n".format(line, copy) for line in lines))
+			else:
+				dst.write(body)
+
+def compareBaseline(results, baselinePath, tolerance):
+	"""
+	Compare results against a previous run
+	Args:
+		results: Result dicts of this run
+		baselinePath: JSON written by a previous run
+		tolerance: Allowed relative drop in vertices/s
+	Returns:
+		List of (suite, case, baseline, current) for regressed cases
+	"""
+	with open(baselinePath, "r", encoding="utf-8") as f:
+		baseline = {(r["suite"], r["case"]): r for r in json.load(f)["results"]}
+
+	regressions = []
+	for result in results:
+		old = baseline.get((result["suite"], result["case"]))
+		if old is not None and result["verticesPerSecond"] < old["verticesPerSecond"] * (1.0 - tolerance):
+			regressions.append((result["suite"], result["case"], old["verticesPerSecond"], result["verticesPerSecond"]))
+	return regressions
+
+def main():
+	parser = argparse.ArgumentParser(description="Benchmark the RenderDocExport decode path and csv_to_obj conversion.")
+	parser.add_argument("-o", "--output", default="benchmark_results.json", help="JSON file to write results to")
+	parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100], help="Copies of the sample CSV rows to convert")
+	parser.add_argument("--vertices", type=int, default=100000, help="Vertices in the synthetic vertex buffer")
+	parser.add_argument("--indices", type=int, default=300000, help="Indices in the synthetic draw")
+	parser.add_argument("--repeat", type=int, default=3, help="Runs per case; the fastest is reported")
+	parser.add_argument("--suite", choices=["decode", "indices", "convert"], nargs="+", default=["decode", "indices", "convert"])
+	parser.add_argument("--baseline", help="Previous results JSON to check for regressions")
+	parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative drop in vertices/s (default: 0.2)")
+	args = parser.parse_args()
+
+	results = []
+
+	def report(result):
+		results.append(result)
+		rss = result["peakRssMB"]
+		print("{0:8} {1:24} {2:>14,.0f} vertices/s {3:>9.2f} MB/s  peak RSS {4}".format(result["suite"], result["case"],
+			result["verticesPerSecond"], result["mbPerSecond"], "n/a" if rss is None else "{0:.1f} MB".format(rss)))
+
+	if "decode" in args.suite:
+		for case in decodeFormats:
+			report(runIsolated(benchDecode, case[0], args.vertices, args.indices, args.repeat))
+
+	if "indices" in args.suite:
+		for case in indexFormats:
+			report(runIsolated(benchIndices, case[0], args.indices, args.repeat))
+
+	if "convert" in args.suite:
+		tempDir = tempfile.mkdtemp(prefix="csv2obj_bench_")
+		try:
+			for csvName in sampleCsvs:
+				for scale in args.scales:
+					# Repeated copies, then copies whose rows are all distinct
+					for unique in (False, True):
+						scaledPath = os.path.join(tempDir, "{0}_x{1}{2}.csv".format(os.path.splitext(csvName)[0], scale,
+							"_unique" if unique else ""))
+						writeScaledCsv(os.path.join(repoDir, csvName), scaledPath, scale, unique)
+						for outputFormat in convertFormats:
+							case = os.path.basename(scaledPath) + ("" if outputFormat == "obj" else "." + outputFormat)
+							report(runIsolated(benchConvert, case, scaledPath, args.repeat, outputFormat))
+						os.remove(scaledPath)
+		finally:
+			shutil.rmtree(tempDir, ignore_errors=True)
+
+	output = {
+		"meta": {
+			"python": platform.python_version(),
+			"platform": platform.platform(),
+			"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+		},
+		"results": results,
+	}
+	with open(args.output, "w", encoding="utf-8") as f:
+		json.dump(output, f, indent=1)
+	print("Results written to {0}".format(args.output))
+
+	if args.baseline:
+		regressions = compareBaseline(results, args.baseline, args.tolerance)
+		for suite, case, old, new in regressions:
+			print("REGRESSION {0}/{1}: {2:,.0f} -> {3:,.0f} vertices/s".format(suite, case, old, new))
+		if regressions:
+			sys.exit(1)
+		print("No regressions against {0}".format(args.baseline))
+
+if __name__ == "__main__":
+	main()
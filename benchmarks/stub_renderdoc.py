@@ -0,0 +1,429 @@
+# Minimal stand-in for the 'renderdoc' module, so RenderDocExport.py can be
+# imported and its decode path benchmarked and tested without RenderDoc
+# installed. Only the parts of the API the exporter touches are provided.
+# A "capture" is a JSON description of buffers, vertex inputs and actions
+# (see controllerFromSpec), so shard processes can open it too.
+
+import binascii
+import enum
+import json
+import struct
+
+class CompType(enum.IntEnum):
+	Typeless = 0
+	Float = 1
+	UNorm = 2
+	SNorm = 3
+	UInt = 4
+	SInt = 5
+	UScaled = 6
+	SScaled = 7
+	Depth = 8
+	UNormSRGB = 9
+
+class ActionFlags(enum.IntFlag):
+	NoFlags = 0
+	Clear = 0x1
+	Drawcall = 0x2
+	Dispatch = 0x4
+	SetMarker = 0x10
+	PushMarker = 0x20
+	PopMarker = 0x40
+	Present = 0x80
+	Indexed = 0x10000
+	Instanced = 0x20000
+
+class ResourceUsage(enum.IntEnum):
+	Unused = 0
+	VertexBuffer = 1
+	IndexBuffer = 2
+	StreamOut = 3
+	VS_RWResource = 4
+	PS_RWResource = 5
+	CS_RWResource = 6
+	ColorTarget = 7
+	Clear = 8
+	CopySrc = 9
+	CopyDst = 10
+	CPUWrite = 11
+
+class ReplayStatus(enum.IntEnum):
+	Succeeded = 0
+
+class AlphaMapping(enum.IntEnum):
+	Discard = 0
+	BlendToColor = 1
+	BlendToCheckerboard = 2
+	Preserve = 3
+
+class FileType(enum.IntEnum):
+	DDS = 0
+	PNG = 1
+	JPG = 2
+	BMP = 3
+	TGA = 4
+	HDR = 5
+	EXR = 6
+	Raw = 7
+
+class ShaderStage(enum.IntEnum):
+	Vertex = 0
+	Hull = 1
+	Domain = 2
+	Geometry = 3
+	Pixel = 4
+	Fragment = 4
+	Compute = 5
+
+class Topology(enum.IntEnum):
+	Unknown = 0
+	PointList = 1
+	LineList = 2
+	LineStrip = 3
+	LineLoop = 4
+	TriangleList = 5
+	TriangleStrip = 6
+	TriangleFan = 7
+
+class ResourceFormatType(enum.IntEnum):
+	Regular = 0
+
+class MeshDataStage(enum.IntEnum):
+	Unknown = 0
+	VSIn = 1
+	VSOut = 2
+	GSOut = 3
+
+class ShaderBuiltin(enum.IntEnum):
+	Undefined = 0
+	Position = 1
+
+class VarType(enum.IntEnum):
+	Float = 0
+	Double = 1
+	SInt = 3
+	UInt = 4
+
+class ResourceId:
+	def __init__(self, value=0):
+		self.value = value
+
+	@staticmethod
+	def Null():
+		return ResourceId(0)
+
+	def __int__(self):
+		return self.value
+
+	def __eq__(self, other):
+		return isinstance(other, ResourceId) and other.value == self.value
+
+	def __ne__(self, other):
+		return not self == other
+
+	def __hash__(self):
+		return hash(self.value)
+
+	def __repr__(self):
+		return "ResourceId::{0}".format(self.value)
+
+class ResourceFormat:
+	def __init__(self, compType=CompType.Float, compByteWidth=4, compCount=3, bgra=False, special=False):
+		self.compType = compType
+		self.compByteWidth = compByteWidth
+		self.compCount = compCount
+		self.type = ResourceFormatType.Regular
+		self.bgra = bgra
+		self.special = special
+
+	def BGRAOrder(self):
+		return self.bgra
+
+	def Special(self):
+		return self.special
+
+def VarTypeByteSize(varType):
+	return 8 if varType == VarType.Double else 4
+
+def VarTypeCompType(varType):
+	return {VarType.Float: CompType.Float, VarType.Double: CompType.Float, VarType.SInt: CompType.SInt,
+		VarType.UInt: CompType.UInt}[varType]
+
+class MeshFormat:
+	def __init__(self):
+		self.indexResourceId = ResourceId.Null()
+		self.indexByteOffset = 0
+		self.indexByteStride = 0
+		self.baseVertex = 0
+		self.vertexResourceId = ResourceId.Null()
+		self.vertexByteOffset = 0
+		self.vertexByteStride = 0
+		self.format = ResourceFormat()
+		self.numIndices = 0
+		self.topology = Topology.TriangleList
+
+class TextureSlice:
+	def __init__(self):
+		self.sliceIndex = 0
+
+class TextureSave:
+	def __init__(self):
+		self.resourceId = ResourceId.Null()
+		self.mip = 0
+		self.slice = TextureSlice()
+		self.alpha = AlphaMapping.Discard
+		self.destType = FileType.DDS
+
+class ReplayOptions:
+	pass
+
+class GlobalEnvironment:
+	pass
+
+def InitialiseReplay(env, args):
+	pass
+
+def ShutdownReplay():
+	pass
+
+class StubAction:
+	"""
+	Action (draw or marker) in a stub capture's action tree
+	"""
+	def __init__(self, eventId, name="", children=None, flags=ActionFlags.NoFlags, numIndices=0, indexOffset=0,
+			baseVertex=0, vertexOffset=0, numInstances=1, instanceOffset=0, outputs=None):
+		self.eventId = eventId
+		self.name = name
+		self.children = children or []
+		self.flags = flags
+		self.numIndices = numIndices
+		self.indexOffset = indexOffset
+		self.baseVertex = baseVertex
+		self.vertexOffset = vertexOffset
+		self.numInstances = numInstances
+		self.instanceOffset = instanceOffset
+		self.outputs = outputs or []
+
+class StubBuffer:
+	"""Bound index or vertex buffer"""
+	def __init__(self, resourceId, byteOffset=0, byteStride=0):
+		self.resourceId = resourceId
+		self.byteOffset = byteOffset
+		self.byteStride = byteStride
+
+class StubVertexInput:
+	"""Vertex input attribute"""
+	def __init__(self, name, vertexBuffer, byteOffset, format, perInstance=False, instanceRate=0):
+		self.name = name
+		self.vertexBuffer = vertexBuffer
+		self.byteOffset = byteOffset
+		self.format = format
+		self.perInstance = perInstance
+		self.instanceRate = instanceRate
+
+class StubEventUsage:
+	"""One use of a resource at an event"""
+	def __init__(self, eventId, usage):
+		self.eventId = eventId
+		self.usage = usage
+
+class StubSignature:
+	"""Vertex shader output signature entry"""
+	def __init__(self, varName, varType=VarType.Float, compCount=4, systemValue=ShaderBuiltin.Undefined):
+		self.varName = varName
+		self.semanticIdxName = varName
+		self.varType = varType
+		self.compCount = compCount
+		self.systemValue = systemValue
+
+class StubReflection:
+	"""Shader reflection with an output signature"""
+	def __init__(self, outputSignature):
+		self.outputSignature = outputSignature
+
+class StubPipelineState:
+	"""
+	Pipeline state with fixed bound buffers and vertex inputs
+	Args:
+		ib: Bound index buffer (StubBuffer)
+		vbs: Bound vertex buffers (StubBuffer list)
+		attrs: Vertex inputs (StubVertexInput list)
+		topology: Primitive topology
+		outputs: Vertex shader output signature (StubSignature list)
+	"""
+	def __init__(self, ib, vbs, attrs, topology=Topology.TriangleList, outputs=None):
+		self.ib = ib
+		self.vbs = vbs
+		self.attrs = attrs
+		self.topology = topology
+		self.outputs = outputs or []
+
+	def GetShaderReflection(self, stage):
+		return StubReflection(self.outputs)
+
+	def GetIBuffer(self):
+		return self.ib
+
+	def GetVBuffers(self):
+		return self.vbs
+
+	def GetVertexInputs(self):
+		return self.attrs
+
+	def GetReadOnlyResources(self, stage):
+		return []
+
+	def GetPrimitiveTopology(self):
+		return self.topology
+
+	def IsRestartEnabled(self):
+		return False
+
+	def GetRestartIndex(self):
+		return 0xFFFFFFFF
+
+class StubController:
+	"""
+	Replay controller serving in-memory buffers, counting GetBufferData calls
+	Args:
+		buffers: Dict mapping int resource IDs to bytes
+		actions: Root actions (StubAction list)
+		state: StubPipelineState returned at every event
+		writes: (eventId, resourceId, bytes) CPU writes replacing a buffer's
+			contents from that event on
+		postVS: MeshFormat returned by GetPostVSData, None for no post-VS data
+	"""
+	def __init__(self, buffers, actions=None, state=None, writes=None, postVS=None):
+		self.buffers = buffers
+		self.actions = actions or []
+		self.state = state
+		self.postVS = postVS
+		self.writes = sorted(writes or [], key=lambda write: write[0])
+		self.eventId = 0
+		self.bufferDataCalls = 0
+		self.bufferDataBytes = 0
+		self.frameEvents = []
+
+	def GetRootActions(self):
+		return self.actions
+
+	def SetFrameEvent(self, eventId, force):
+		self.eventId = eventId
+		self.frameEvents.append(eventId)
+
+	def GetPipelineState(self):
+		return self.state
+
+	def Shutdown(self):
+		pass
+
+	def GetPostVSData(self, instance, view, stage):
+		return self.postVS or MeshFormat()
+
+	def GetBufferData(self, resourceId, byteOffset, byteSize):
+		self.bufferDataCalls += 1
+		data = self.buffers[int(resourceId)]
+		for eventId, writeId, written in self.writes:
+			if writeId == int(resourceId) and eventId <= self.eventId:
+				data = written
+		end = len(data) if byteSize == 0 else byteOffset + byteSize
+		data = data[byteOffset:end]
+		self.bufferDataBytes += len(data)
+		return data
+
+	def GetUsage(self, resourceId):
+		return [StubEventUsage(eventId, ResourceUsage.CPUWrite) for eventId, writeId, written in self.writes
+			if writeId == int(resourceId)]
+
+	def SaveTexture(self, texsave, path):
+		pass
+
+def packValues(compType, compByteWidth, values):
+	"""
+	Pack component values the way a GPU buffer stores them (little-endian)
+	Args:
+		compType: CompType of the components
+		compByteWidth: Bytes per component
+		values: Raw component values (integers for integer/normalized types)
+	Returns:
+		bytes object
+	"""
+	chars = {CompType.Float: "xxexfxxxd", CompType.UInt: "xBHxIxxxQ", CompType.SInt: "xbhxixxxq"}
+	chars[CompType.UNorm] = chars[CompType.UInt]
+	chars[CompType.SNorm] = chars[CompType.SInt]
+	return struct.pack("<{0}{1}".format(len(values), chars[compType][compByteWidth]), *values)
+
+def actionFromSpec(spec):
+	"""
+	Build a StubAction tree from a JSON-compatible dict
+	Args:
+		spec: Dict of StubAction arguments, flags as a list of ActionFlags names
+	Returns:
+		StubAction
+	"""
+	args = dict(spec)
+	flags = ActionFlags.NoFlags
+	for name in args.pop("flags", []):
+		flags |= ActionFlags[name]
+	args["flags"] = flags
+	args["children"] = [actionFromSpec(child) for child in args.get("children", [])]
+	return StubAction(**args)
+
+def controllerFromSpec(spec):
+	"""
+	Build a StubController from a JSON-compatible capture description:
+	{"buffers": {resourceId: hex}, "indexBuffer": {resourceId, byteStride},
+	"vertexBuffers": [{resourceId, byteStride}], "attributes": [{name, vertexBuffer,
+	byteOffset, compType, compByteWidth, compCount, perInstance, instanceRate}],
+	"actions": [action specs], "writes": [{eventId, resourceId, data: hex}],
+	"postVS": {vertexResourceId, vertexByteStride, indexResourceId, indexByteStride,
+	numIndices, outputs: [{name, varType, compCount, position}]}}
+	Args:
+		spec: Capture description
+	Returns:
+		StubController
+	"""
+	buffers = dict((int(rid), binascii.unhexlify(data)) for rid, data in spec["buffers"].items())
+	ib = spec["indexBuffer"]
+	vbs = [StubBuffer(ResourceId(vb["resourceId"]), 0, vb["byteStride"]) for vb in spec["vertexBuffers"]]
+	attrs = [StubVertexInput(attr["name"], attr["vertexBuffer"], attr["byteOffset"],
+		ResourceFormat(CompType[attr["compType"]], attr["compByteWidth"], attr["compCount"]),
+		attr.get("perInstance", False), attr.get("instanceRate", 0)) for attr in spec["attributes"]]
+	state = StubPipelineState(StubBuffer(ResourceId(ib["resourceId"]), 0, ib["byteStride"]), vbs, attrs)
+	writes = [(write["eventId"], write["resourceId"], binascii.unhexlify(write["data"])) for write in spec.get("writes", [])]
+
+	# The same post-VS data at every event
+	postVS = None
+	if "postVS" in spec:
+		out = spec["postVS"]
+		postVS = MeshFormat()
+		postVS.vertexResourceId = ResourceId(out["vertexResourceId"])
+		postVS.vertexByteStride = out["vertexByteStride"]
+		postVS.indexResourceId = ResourceId(out.get("indexResourceId", 0))
+		postVS.indexByteStride = out.get("indexByteStride", 0)
+		postVS.numIndices = out["numIndices"]
+		state.outputs = [StubSignature(output["name"], VarType[output.get("varType", "Float")], output["compCount"],
+			ShaderBuiltin.Position if output.get("position") else ShaderBuiltin.Undefined) for output in out["outputs"]]
+	return StubController(buffers, [actionFromSpec(action) for action in spec["actions"]], state, writes, postVS)
+
+class CaptureFile:
+	"""Capture handle that opens a JSON capture description as a StubController"""
+	def __init__(self):
+		self.controller = None
+
+	def OpenFile(self, filename, fileType, progress):
+		with open(filename, "r") as captureFile:
+			self.controller = controllerFromSpec(json.load(captureFile))
+		return ReplayStatus.Succeeded
+
+	def LocalReplaySupport(self):
+		return True
+
+	def OpenCapture(self, options, progress):
+		return (ReplayStatus.Succeeded, self.controller)
+
+	def Shutdown(self):
+		pass
+
+def OpenCaptureFile():
+	return CaptureFile()
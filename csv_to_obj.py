@@ -2,6 +2,60 @@
 import csv
 import argparse
 import os
+import json
+import shutil
+import tempfile
+import io
+import time
+import hashlib
+import re
+import sys
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+import mmap
+import struct
+from contextlib import contextmanager, closing
+import urllib.request
+import array
+import operator
+from itertools import chain, compress, repeat, islice
+
+# RenderDocExport.py 写出的二进制列式网格文件 (.meshbin) 的文件头标识
+MESHBIN_MAGIC = b"RDMESH\x00\x01"
+MESH_EXTENSIONS = ('.csv', '.meshbin')
+# RenderDocExport.py 写出的逐实例属性表 (model_event{N}_instances.csv)，不是网格
+INSTANCE_TABLE_SUFFIX = '_instances'
+# 批量模式下记录已转换文件的清单，位于输出目录中
+MANIFEST_FILENAME = '.csv_to_obj_manifest.json'
+# RenderDocExport.py 在导出目录 (models 文件夹的上一级) 写出的 DrawCall 目录数据库
+CATALOG_FILENAME = 'catalog.sqlite'
+# 快速路径每次读取的 CSV 字节数 / .meshbin 行数
+CHUNK_BYTES = 1 << 20
+CHUNK_ROWS = 1 << 16
+# RenderDoc 图元拓扑名称 -> 支持展开的三角形拓扑
+TOPOLOGY_ALIASES = {'TriangleList': 'list', 'TriangleStrip': 'strip', 'TriangleFan': 'fan'}
+# 表头中属性列的分量后缀
+VECTOR_COMPONENTS = ('x', 'y', 'z', 'w', 'r', 'g', 'b', 'a')
+# 属性名关键字 -> 语义，按顺序匹配 (BINORMAL/BITANGENT 须在 NORM/TANGENT 之前排除)
+GLTF_SEMANTICS = (('BINORMAL', None), ('BITANGENT', None), ('TANGENT', 'TANGENT'), ('POS', 'POSITION'),
+                  ('NORM', 'NORMAL'), ('TEX', 'TEXCOORD'), ('UV', 'TEXCOORD'), ('COLO', 'COLOR'))
+# glTF 2.0 常量
+GLTF_TYPES = {1: 'SCALAR', 2: 'VEC2', 3: 'VEC3', 4: 'VEC4'}
+GLTF_FLOAT = 5126
+GLTF_SHORT = 5122
+GLTF_UNSIGNED_SHORT = 5123
+GLTF_UNSIGNED_INT = 5125
+GLTF_ARRAY_BUFFER = 34962
+GLTF_ELEMENT_ARRAY_BUFFER = 34963
+GLTF_POINTS = 0
+GLTF_TRIANGLES = 4
+GLB_CHUNK_JSON = 0x4E4F534A
+GLB_CHUNK_BIN = 0x004E4942
+# --quantize 写出的整数顶点属性需要的 glTF 扩展
+KHR_MESH_QUANTIZATION = 'KHR_mesh_quantization'
+# --optimize 重排三角形与计算 ACMR 时假设的顶点缓存大小 (FIFO)
+VERTEX_CACHE_SIZE = 16
 
 def find_column_indices(header):
     """根据表头猜测POSITION, NORMAL, TEXCOORD的起始列索引"""
@@ -32,21 +86,559 @@ def find_column_indices(header):
         
     return indices
 
-def convert_csv_to_obj(input_filepath, output_filepath):
+def find_attributes(header):
+    """
+    按表头把 "名称.分量" 形式的相邻列分组为顶点属性，并识别其语义 (不限于位置/法线/UV)。
+    返回 [{'name', 'semantic', 'columns'}]，semantic 为 GLTF_SEMANTICS 中的语义，未识别时为 None。
+    VTX、IDX 等不带分量后缀的列不属于任何属性。
+    """
+    attributes = []
+    for i, column in enumerate(header):
+        name, dot, component = column.strip().rpartition('.')
+        if not dot or component.lower() not in VECTOR_COMPONENTS:
+            continue
+        if attributes and attributes[-1]['name'] == name and attributes[-1]['columns'][-1] == i - 1:
+            attributes[-1]['columns'].append(i)
+            continue
+        # 去掉 in_/out_/SV_ 前缀与末尾的集合编号，如 in_TEXCOORD1 -> TEXCOORD
+        base = re.sub(r'^(IN|OUT|SV)_', '', name.upper()).rstrip('0123456789')
+        semantic = next((s for key, s in GLTF_SEMANTICS if key in base), None)
+        attributes.append({'name': name, 'semantic': semantic, 'columns': [i]})
+    return attributes
+
+def gltf_attribute_names(attributes):
+    """
+    为 find_attributes 的结果分配 glTF 属性名。POSITION/NORMAL/TANGENT 各取第一个分量数合适的属性
+    (POSITION/NORMAL 多出的 w 分量被丢弃)，TEXCOORD_n/COLOR_n 按出现顺序编号；
+    其余属性写为以下划线开头的自定义属性。返回 [(glTF 属性名, 使用的列)]。
+    """
+    result = []
+    used = set()
+    sets = {'TEXCOORD': 0, 'COLOR': 0}
+    for attr in attributes:
+        semantic, columns = attr['semantic'], attr['columns']
+        gltf_name = None
+        if semantic in ('POSITION', 'NORMAL') and len(columns) >= 3 and semantic not in used:
+            gltf_name, columns = semantic, columns[:3]
+        elif semantic == 'TANGENT' and len(columns) == 4 and semantic not in used:
+            gltf_name = semantic
+        elif (semantic == 'TEXCOORD' and len(columns) == 2) or (semantic == 'COLOR' and len(columns) >= 3):
+            gltf_name = f"{semantic}_{sets[semantic]}"
+            sets[semantic] += 1
+        if gltf_name is None:
+            gltf_name = '_' + re.sub(r'\W', '_', attr['name'].upper())
+            while gltf_name in used:
+                gltf_name += '_'
+        used.add(gltf_name)
+        result.append((gltf_name, columns))
+    return result
+
+def _normalize_column(values, type_char, normalize):
+    """按照 RenderDocExport.unpackData 相同的公式对 UNorm/SNorm 列做归一化"""
+    bits = struct.calcsize('<' + type_char) * 8
+    if normalize == 'unorm':
+        divisor = float((2 ** bits) - 1)
+        return (float(i) / divisor for i in values)
+    if normalize == 'snorm':
+        max_neg = -float(2 ** bits) / 2
+        divisor = float(-(max_neg - 1))
+        return ((float(i) if (i == max_neg) else (float(i) / divisor)) for i in values)
+    return values
+
+def read_meshbin_columns(buffer):
+    """
+    解析 .meshbin 文件内容，返回 (表头, 各列的值迭代器列表)。
+    buffer 可以是 mmap 或 bytes，列数据直接从中按小端格式解码，不做文本解析。
+    """
+    view = memoryview(buffer)
+    if bytes(view[:len(MESHBIN_MAGIC)]) != MESHBIN_MAGIC:
+        raise ValueError("不是有效的 .meshbin 文件")
+    pos = len(MESHBIN_MAGIC)
+    (header_size,) = struct.unpack_from('<I', view, pos)
+    pos += 4
+    header = json.loads(bytes(view[pos:pos + header_size]).decode('utf-8'))
+    data_start = (pos + header_size + 7) & ~7
+
+    rows = header['rows']
+    names = []
+    columns = []
+    for column in header['columns']:
+        type_char = column['type']
+        start = data_start + column['offset']
+        size = struct.calcsize('<' + type_char) * rows
+        values = (v[0] for v in struct.iter_unpack('<' + type_char, view[start:start + size]))
+        names.append(column['name'])
+        columns.append(_normalize_column(values, type_char, column.get('normalize')))
+    return names, columns
+
+def iter_csv_chunks(infile, chunk_bytes=CHUNK_BYTES):
+    """
+    分块读取 CSV 数据部分 (表头之后)，每块产出一个行列表。
+    不含引号的块直接按换行切分，行保持为未拆分的字符串；含引号的块退回 csv 模块解析为字段元组。
+    """
+    tail = ''
+    while True:
+        data = infile.read(chunk_bytes)
+        if not data:
+            break
+        data = tail + data
+        cut = data.rfind('\n') + 1
+        chunk, tail = data[:cut], data[cut:]
+        if chunk:
+            yield _split_csv_chunk(chunk)
+    if tail:
+        yield _split_csv_chunk(tail + '\n')
+
+def _split_csv_chunk(chunk):
+    """将以换行结尾的若干完整 CSV 行切分为行列表"""
+    if '"' in chunk:
+        return [tuple(row) for row in csv.reader(io.StringIO(chunk))]
+    lines = chunk.split('\n')
+    lines.pop()
+    return lines
+
+def iter_meshbin_chunks(rows, chunk_rows=CHUNK_ROWS):
+    """将 .meshbin 的行迭代器按 chunk_rows 行分块"""
+    while True:
+        chunk = list(islice(rows, chunk_rows))
+        if not chunk:
+            break
+        yield chunk
+
+@contextmanager
+def open_mesh_rows(input_filepath, chunked=False):
+    """
+    打开 CSV 或 .meshbin 网格文件，产出 (表头, 行迭代器)。
+    .meshbin 通过内存映射读取，行中的值为数字而非字符串。
+    chunked 为 True 时改为产出 (表头, 行块迭代器)，供整块处理的快速路径使用；
+    此时 CSV 不含引号的行保持为未拆分的字符串 (见 iter_csv_chunks)。
+    """
+    if input_filepath.lower().endswith('.meshbin'):
+        with open(input_filepath, 'rb') as infile:
+            mapped = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            header, columns = read_meshbin_columns(mapped)
+            rows = zip(*columns)
+            yield header, iter_meshbin_chunks(rows) if chunked else rows
+        finally:
+            columns = rows = None
+            try:
+                mapped.close()
+            except BufferError:
+                # 调用方仍持有行迭代器时，映射会在迭代器被回收后自动释放
+                pass
+    else:
+        with open(input_filepath, 'r', encoding='utf-8') as infile:
+            if chunked:
+                header = next(csv.reader([infile.readline()]))
+                yield header, iter_csv_chunks(infile)
+            else:
+                reader = csv.reader(infile)
+                header = next(reader)
+                yield header, reader
+
+def read_topology(input_filepath):
+    """
+    读取网格文件记录的图元拓扑: .meshbin 读取文件头，CSV 读取同名的 .json
+    (RenderDocExport.py 为每个 DrawCall 写出的信息文件)。
+    返回 RenderDoc 拓扑名称 (如 'TriangleStrip')，没有记录时返回 None。
+    """
+    if input_filepath.lower().endswith('.meshbin'):
+        with open(input_filepath, 'rb') as infile:
+            prefix = infile.read(len(MESHBIN_MAGIC) + 4)
+            if prefix[:len(MESHBIN_MAGIC)] != MESHBIN_MAGIC:
+                return None
+            (header_size,) = struct.unpack_from('<I', prefix, len(MESHBIN_MAGIC))
+            return json.loads(infile.read(header_size).decode('utf-8')).get('topology')
+
+    info_path = os.path.splitext(input_filepath)[0] + '.json'
+    try:
+        with open(info_path, 'r', encoding='utf-8') as info_file:
+            return json.load(info_file).get('topology')
+    except (OSError, ValueError):
+        return None
+
+def _proper_triangles(ia, ib, ic):
+    """逐三角形判断三个原始索引互不相同 (非退化)，全部由 C 实现的 map/zip 完成"""
+    return map(all, zip(map(operator.ne, ia, ib), map(operator.ne, ib, ic), map(operator.ne, ia, ic)))
+
+def _expand_strip(refs, ids, start, end, chunk):
+    """展开一段三角形带 refs[start:end]，奇数三角形交换前两个顶点以保持绕序一致"""
+    for lo in range(start, end - 2, chunk):
+        hi = min(lo + chunk, end - 2)
+        a, b, c = refs[lo:hi], refs[lo + 1:hi + 1], refs[lo + 2:hi + 2]
+        # chunk 为偶数，每批的第一个三角形都是偶数三角形
+        first, second = a[:], b[:]
+        first[1::2] = b[1::2]
+        second[1::2] = a[1::2]
+        keep = _proper_triangles(ids[lo:hi], ids[lo + 1:hi + 1], ids[lo + 2:hi + 2])
+        yield list(compress(zip(first, second, c), keep))
+
+def _expand_fan(refs, ids, start, end, chunk):
+    """展开一段三角形扇 refs[start:end]，所有三角形共享第一个顶点"""
+    for lo in range(start + 1, end - 1, chunk):
+        hi = min(lo + chunk, end - 1)
+        keep = _proper_triangles(repeat(ids[start]), ids[lo:hi], ids[lo + 1:hi + 1])
+        yield list(compress(zip(repeat(refs[start]), refs[lo:hi], refs[lo + 1:hi + 1]), keep))
+
+def expand_topology(refs, ids, topology, chunk=65536):
+    """
+    将三角形带 (strip) 或扇 (fan) 的角点序列展开为三角形，按批产出 [(a, b, c), ...]。
+    refs: 每个角点的 OBJ 顶点索引 (从1开始)，0 表示图元重启 (primitive restart)；
+    ids: 每个角点的原始顶点索引，用于剔除退化三角形 (拼接条带时常见)。
+    每批用切片整体计算，不逐个三角形循环；chunk 限制每批的大小。
+    """
+    expand = _expand_strip if topology == 'strip' else _expand_fan
+    # 在重启标记处切分成独立的带/扇 (array.index 的 start 参数需要 Python 3.10，这里一次找出所有标记)
+    restarts = compress(range(len(refs)), map(operator.not_, refs))
+    start = 0
+    for end in chain(restarts, [len(refs)]):
+        if start < end:
+            yield from expand(refs, ids, start, end, chunk)
+        start = end + 1
+
+def face_template(has_uv, has_norm):
+    """根据可用的数据生成 OBJ 面定义行的模板 (三个角点的 v/vt/vn 索引相同)，供 str.format 批量格式化"""
+    if has_uv and has_norm:
+        return "f {0}/{0}/{0} {1}/{1}/{1} {2}/{2}/{2}\n"
+    elif has_uv:
+        return "f {0}/{0} {1}/{1} {2}/{2}\n"
+    elif has_norm:
+        return "f {0}//{0} {1}//{1} {2}//{2}\n"
+    return "f {0} {1} {2}\n"
+
+def _shift(column, offset):
+    """列中每个索引加上偏移 (C 实现的 map)"""
+    return map(operator.add, column, repeat(offset)) if offset else column
+
+def format_faces(a, b, c, has_uv, has_norm, offsets=(0, 0, 0)):
+    """
+    批量生成面定义行: a、b、c 为各三角形三个角点的局部顶点索引序列 (从1开始)。
+    offsets: 合并场景中此前已写出的 (v, vt, vn) 数量，面索引按各自的偏移平移；不存在的分量忽略其偏移。
+    """
+    v_off, uv_off, norm_off = offsets
+    if (not has_uv or uv_off == v_off) and (not has_norm or norm_off == v_off):
+        # 各分量的索引仍然相同，使用单索引模板
+        return ''.join(map(face_template(has_uv, has_norm).format,
+                           _shift(a, v_off), _shift(b, v_off), _shift(c, v_off)))
+    # 第 k 个角点的 v/vt/vn 分别引用第 k、k+3、k+6 个参数
+    corners = []
+    for k in range(3):
+        corner = f"{{{k}}}"
+        if has_uv:
+            corner += f"/{{{k + 3}}}"
+        if has_norm:
+            corner += f"{'' if has_uv else '/'}/{{{k + 6}}}"
+        corners.append(corner)
+    template = f"f {' '.join(corners)}\n"
+    return ''.join(map(template.format, *(_shift(col, off) for off in offsets for col in (a, b, c))))
+
+def split_rows(rows):
+    """
+    将一批行整块拆分为按行展开的字段列表，返回 (字段列表, 每行字段数)。
+    未拆分的 CSV 行用一次 join 和一次 split 拆分；各行列数不一致时按最短的行截断。
+    """
+    if isinstance(rows[0], str):
+        commas = set(map(operator.methodcaller('count', ','), rows))
+        if len(commas) == 1:
+            return ','.join(rows).split(','), commas.pop() + 1
+        rows = [row.split(',') for row in rows]
+    width = min(map(len, rows))
+    if any(len(row) != width for row in rows):
+        rows = [row[:width] for row in rows]
+    return list(chain.from_iterable(rows)), width
+
+class ChunkCache(dict):
+    """
+    按行块填充的顶点缓存: 键为一行从第 skip 列开始的内容 (去掉 VTX/IDX 等逐行不同的列)。
+    按索引导出的网格中同一顶点会重复出现多次，重复的行只需一次字典查找；
+    每块中新出现的行由子类的 build 按列整块处理，而不是逐行处理。
+    缓存超过 max_entries 项时清空，内存占用有上限。
+    """
+    def __init__(self, max_entries=1 << 16):
+        super().__init__()
+        self.max_entries = max_entries
+
+    def lookup(self, keys):
+        """返回一块行的缓存项列表，先整块加入其中新出现的行"""
+        keys = list(keys)
+        try:
+            return list(map(self.__getitem__, keys))
+        except KeyError:
+            pass
+        unique = dict.fromkeys(keys)
+        if len(self) + len(unique) > self.max_entries:
+            self.clear()
+        new = [key for key in unique if key not in self]
+        if new:
+            fields, width = split_rows(new)
+            self.update(zip(new, self.build(fields, width)))
+        return list(map(self.__getitem__, keys))
+
+class VertexLineCache(ChunkCache):
+    """OBJ 快速路径的顶点缓存: 值为该顶点的 (v, vt, vn) 输出行，不存在的分量为 None"""
+    def __init__(self, col_indices, skip, max_entries=1 << 16):
+        super().__init__(max_entries)
+        self.pos, self.uv, self.norm = (c - skip if c != -1 else -1
+                                        for c in (col_indices['pos'], col_indices['uv'], col_indices['norm']))
+        # 翻转后的 V 坐标文本，UV 的取值通常远少于顶点数
+        self.flipped = {}
+
+    def flip(self, v):
+        if len(self.flipped) >= self.max_entries:
+            self.flipped.clear()
+        text = self.flipped[v] = str(1.0 - float(v))
+        return text
+
+    def build(self, fields, width):
+        """按列格式化: 每个分段由几列文本拼接而成，只有 V 坐标需要解析为数字"""
+        if not isinstance(fields[0], str):
+            # .meshbin 的值为数字
+            fields = list(map(str, fields))
+        pos, uv, norm = self.pos, self.uv, self.norm
+        if max(pos + 3, uv + 2, norm + 3) > width:
+            raise ValueError("行的列数少于表头")
+
+        def vector(prefix, first, count):
+            columns = [fields[c::width] for c in range(first, first + count)]
+            return map(''.join, zip(repeat(prefix), map(' '.join, zip(*columns)), repeat('\n')))
+
+        lines = [vector('v ', pos, 3), repeat(None), repeat(None)]
+        if uv != -1:
+            flipped = self.flipped
+            vs = [flipped[v] if v in flipped else self.flip(v) for v in fields[uv + 1::width]]
+            lines[1] = map(''.join, zip(repeat('vt '), fields[uv::width], repeat(' '), vs, repeat('\n')))
+        if norm != -1:
+            lines[2] = vector('vn ', norm, 3)
+        return zip(*lines)
+
+class VertexBytesCache(ChunkCache):
+    """
+    .glb 快速路径的顶点缓存: 值为该顶点每个属性打包好的 float32 字节。
+    slices 为各属性在整行中的列范围。
+    """
+    def __init__(self, slices, skip, max_entries=1 << 16):
+        super().__init__(max_entries)
+        self.slices = [slice(s.start - skip, s.stop - skip) for s in slices]
+        self.width = max(s.stop for s in self.slices)
+
+    def build(self, fields, width):
+        """每个属性的各列一次解析为 float32 数组，再按顶点切分"""
+        if width < self.width:
+            raise ValueError("行的列数少于表头")
+        packed = []
+        for s in self.slices:
+            columns = [fields[c::width] for c in range(s.start, s.stop)]
+            data = array.array('f', map(float, chain.from_iterable(zip(*columns)))).tobytes()
+            size = 4 * (s.stop - s.start)
+            packed.append([data[i:i + size] for i in range(0, len(data), size)])
+        return zip(*packed)
+
+def write_vertex_chunks(chunks, col_indices, outfile, uv_spill, norm_spill):
     """
-    将RenderDoc导出的CSV文件转换为OBJ模型文件。
-    拓扑结构为三角面列表 (Triangle List)。
+    快速路径: 按行块写出 v/vt/vn，每块每个分段只做一次 join 和一次写入。
+    行从第一个用到的列开始作为缓存键 (去掉 VTX/IDX 等逐行不同的列)，重复顶点直接复用输出行。
+    返回写出的顶点数。
+    """
+    skip = min(c for c in col_indices.values() if c != -1)
+    cache = VertexLineCache(col_indices, skip)
+    num_vertices = 0
+    for chunk in chunks:
+        if chunk and isinstance(chunk[0], str):
+            keys = map(operator.itemgetter(skip), map(operator.methodcaller('split', ',', skip), chunk)) if skip else chunk
+        else:
+            keys = map(operator.itemgetter(slice(skip, None)), chunk)
+        entries = cache.lookup(keys)
+        num_vertices += len(entries)
+        outfile.write(''.join(map(operator.itemgetter(0), entries)))
+        if col_indices['uv'] != -1:
+            uv_spill.write(''.join(map(operator.itemgetter(1), entries)))
+        if col_indices['norm'] != -1:
+            norm_spill.write(''.join(map(operator.itemgetter(2), entries)))
+    return num_vertices
+
+def write_list_faces(outfile, num_vertices, has_uv, has_norm, offsets=(0, 0, 0), chunk=CHUNK_ROWS):
+    """按行号写出三角形列表的面 (第 i 个面引用第 3i+1..3i+3 行)，分块批量格式化"""
+    end = num_vertices - num_vertices % 3
+    for start in range(0, end, chunk * 3):
+        stop = min(start + chunk * 3, end)
+        outfile.write(format_faces(range(start + 1, stop, 3), range(start + 2, stop, 3),
+                                   range(start + 3, stop + 1, 3), has_uv, has_norm, offsets))
+
+def make_weld_key(header, col_indices, weld, weld_epsilon=0.0, columns=None):
+    """
+    构造顶点焊接所用的键函数。
+    weld='idx': 以 IDX 列为键，同一索引的行即同一顶点；
+    weld='attr': 以位置/UV/法线数值为键，weld_epsilon > 0 时按该精度量化后再比较。
+    columns: 按属性焊接时参与比较的列，默认为 col_indices 中的位置/UV/法线列。
+    """
+    upper_header = [h.strip().upper() for h in header]
+    if weld == 'idx':
+        if 'IDX' in upper_header:
+            idx_col = upper_header.index('IDX')
+            return lambda row: row[idx_col]
+        print("  [警告] 未找到 IDX 列，改为按属性数值焊接。")
+
+    if columns is None:
+        columns = list(range(col_indices['pos'], col_indices['pos'] + 3))
+        if col_indices['uv'] != -1:
+            columns += range(col_indices['uv'], col_indices['uv'] + 2)
+        if col_indices['norm'] != -1:
+            columns += range(col_indices['norm'], col_indices['norm'] + 3)
+
+    if weld_epsilon > 0:
+        scale = 1.0 / weld_epsilon
+        return lambda row: tuple(round(float(row[c]) * scale) for c in columns)
+    return lambda row: tuple(float(row[c]) for c in columns)
+
+def resolve_topology(input_filepath, topology=None):
+    """
+    确定网格的图元拓扑: 指定了 topology 时直接使用，否则读取导出时记录的拓扑 (见 read_topology)，
+    没有记录时按 'list' 处理。返回 'list'、'strip'、'fan'，不支持的拓扑返回 None。
+    """
+    if topology is not None:
+        return topology
+    topology_name = read_topology(input_filepath)
+    topology = TOPOLOGY_ALIASES.get(topology_name or 'TriangleList')
+    if topology is None:
+        print(f"  [警告] 不支持的图元拓扑 {topology_name}，只写出顶点，不生成面。")
+    elif topology != 'list':
+        print(f"  [OK] 图元拓扑: {topology_name}")
+    return topology
+
+def write_obj_body(header, reader, col_indices, outfile, face_out, weld=None, weld_epsilon=0.0,
+                   topology='list', offsets=(0, 0, 0)):
+    """
+    写出一个网格的 v/vt/vn 段与面，供单文件转换与合并场景共用。
+    顶点写入 outfile，面写入 face_out (单文件转换时两者是同一个文件)。
+    reader 须与 convert_csv_to_obj 的选择一致: 不焊接的三角形列表为分块的行，其余为逐行。
+    offsets: 合并场景中此前已写出的 (v, vt, vn) 数量，面索引据此平移。
+    返回 (处理的顶点行数, 写出的唯一顶点数)；没有数据行时不写出任何内容。
+    """
+    has_uv = col_indices['uv'] != -1
+    has_norm = col_indices['norm'] != -1
+    weld_key = make_weld_key(header, col_indices, weld, weld_epsilon) if weld else None
+
+    # 带/扇记录每个角点的顶点索引，读完后整体展开；IDX 为 -1 的行是图元重启
+    expand = topology in ('strip', 'fan')
+    corner_refs = array.array('q')
+    corner_ids = array.array('q')
+    upper_header = [h.strip().upper() for h in header]
+    idx_col = upper_header.index('IDX') if 'IDX' in upper_header else None
+
+    # 单次遍历输入: v 直接写入输出文件，vt/vn 先写入临时分段文件，
+    # 最后按 OBJ 的 v/vt/vn 顺序拼接，内存占用与网格大小无关
+    # (焊接时额外占用与唯一顶点数成正比的哈希表)
+    with tempfile.TemporaryFile('w+', encoding='utf-8') as uv_spill, \
+         tempfile.TemporaryFile('w+', encoding='utf-8') as norm_spill, \
+         tempfile.TemporaryFile('w+', encoding='utf-8') as face_spill:
+        num_vertices = 0
+        welded = {}
+        # 焊接的三角形列表: 角点索引攒够一批后格式化写入面分段
+        triangle_refs = array.array('q')
+        batch = CHUNK_ROWS * 3
+        if weld_key is None and topology == 'list':
+            num_vertices = write_vertex_chunks(reader, col_indices, outfile, uv_spill, norm_spill)
+        else:
+            for row in reader:
+                if expand:
+                    idx = int(row[idx_col]) if idx_col is not None else None
+                    if idx is not None and idx < 0:
+                        corner_refs.append(0)
+                        corner_ids.append(-1)
+                        continue
+
+                num_vertices += 1
+
+                if weld_key is not None:
+                    # 已出现过的顶点只记录索引，不再重复写出
+                    key = weld_key(row)
+                    ref = welded.get(key)
+                    is_new = ref is None
+                    if is_new:
+                        ref = welded[key] = len(welded) + 1
+                    if expand:
+                        corner_refs.append(ref)
+                        corner_ids.append(ref if idx is None else idx)
+                    else:
+                        triangle_refs.append(ref)
+                        if len(triangle_refs) == batch:
+                            face_spill.write(format_faces(triangle_refs[0::3], triangle_refs[1::3],
+                                                          triangle_refs[2::3], has_uv, has_norm, offsets))
+                            del triangle_refs[:]
+                    if not is_new:
+                        continue
+                elif expand:
+                    corner_refs.append(num_vertices)
+                    corner_ids.append(num_vertices if idx is None else idx)
+
+                # 写入 v (顶点位置)
+                x, y, z = row[col_indices['pos']:col_indices['pos']+3]
+                outfile.write(f"v {x} {y} {z}\n")
+
+                # 暂存 vt (纹理坐标)
+                if has_uv:
+                    u, v = row[col_indices['uv']:col_indices['uv']+2]
+                    uv_spill.write(f"vt {u} {1.0 - float(v)}\n")
+
+                # 暂存 vn (顶点法线)
+                if has_norm:
+                    nx, ny, nz = row[col_indices['norm']:col_indices['norm']+3]
+                    norm_spill.write(f"vn {nx} {ny} {nz}\n")
+
+        unique_vertices = len(welded) if weld_key is not None else num_vertices
+        if num_vertices == 0:
+            return 0, 0
+        outfile.write("\n")
+
+        # 拼接 vt 与 vn 分段
+        for present, spill in ((has_uv, uv_spill), (has_norm, norm_spill)):
+            if present:
+                spill.seek(0)
+                shutil.copyfileobj(spill, outfile)
+                outfile.write("\n")
+
+        # 写入面 f (face)
+        if expand:
+            num_faces = 0
+            for faces in expand_topology(corner_refs, corner_ids, topology):
+                if faces:
+                    num_faces += len(faces)
+                    face_out.write(format_faces(*zip(*faces), has_uv, has_norm, offsets))
+            print(f"  [OK] {len(corner_refs)} 个索引展开为 {num_faces} 个三角形")
+        elif topology == 'list':
+            if num_vertices % 3:
+                print(f"  [警告] 顶点行数 {num_vertices} 不是3的倍数，末尾 {num_vertices % 3} 行不构成完整三角形，已忽略。")
+            if weld_key is not None:
+                end = len(triangle_refs) - len(triangle_refs) % 3
+                face_spill.write(format_faces(triangle_refs[0:end:3], triangle_refs[1:end:3],
+                                              triangle_refs[2:end:3], has_uv, has_norm, offsets))
+                face_spill.seek(0)
+                shutil.copyfileobj(face_spill, face_out)
+            else:
+                write_list_faces(face_out, num_vertices, has_uv, has_norm, offsets)
+    return num_vertices, unique_vertices
+
+def convert_csv_to_obj(input_filepath, output_filepath, stats=None, weld=None, weld_epsilon=0.0, topology=None):
+    """
+    将RenderDoc导出的CSV文件(或 .meshbin 二进制文件)转换为OBJ模型文件。
+    拓扑结构默认为三角面列表 (Triangle List)，三角形带/扇会展开为三角形。
     Class举例：VTX, IDX, in_POSITION0.x, in_POSITION0.y, in_POSITION0.z, in_NORMAL0.x, in_NORMAL0.y, in_NORMAL0.z, in_NORMAL0.w, in_TANGENT0.x, in_TANGENT0.y, in_TANGENT0.z, in_TANGENT0.w, in_TEXCOORD0.x, in_TEXCOORD0.y, in_TEXCOORD1.x, in_TEXCOORD1.y
 
+    stats: 可选的字典，转换后写入 'vertices' (处理的顶点行数) 与 'unique_vertices' (写出的顶点数)。
+    weld: None 表示每行写出一个顶点；'idx' 或 'attr' 表示焊接重复顶点，只写出唯一顶点，面引用焊接后的索引。
+    weld_epsilon: 按属性焊接时的量化精度，0 表示数值完全相同才合并。
+    topology: 'list'、'strip' 或 'fan'；None 表示读取导出时记录的拓扑 (见 resolve_topology)。
     """
     print(f"正在处理: {input_filepath} -> {output_filepath}")
     try:
-        with open(input_filepath, 'r', encoding='utf-8') as infile, \
+        topology = resolve_topology(input_filepath, topology)
+
+        # 不焊接的三角形列表走分块的快速路径，其余情况逐行处理
+        chunked = weld is None and topology == 'list'
+        with open_mesh_rows(input_filepath, chunked) as (header, reader), \
              open(output_filepath, 'w', encoding='utf-8') as outfile:
-            
-            reader = csv.reader(infile)
-            
-            header = next(reader)
+
             col_indices = find_column_indices(header)
 
             if col_indices['pos'] == -1:
@@ -55,49 +647,429 @@ def convert_csv_to_obj(input_filepath, output_filepath):
 
             outfile.write(f"# Converted from {os.path.basename(input_filepath)}\n\n")
 
-            vertices = list(reader)
-            num_vertices = len(vertices)
-
+            num_vertices, unique_vertices = write_obj_body(header, reader, col_indices, outfile, outfile,
+                                                           weld, weld_epsilon, topology)
+            if stats is not None:
+                stats['vertices'] = num_vertices
+                stats['unique_vertices'] = unique_vertices
             if num_vertices == 0:
                 print("  [错误] CSV文件中没有数据行。跳过此文件。")
                 return False
 
-            # 写入 v (顶点位置)
-            for row in vertices:
-                x, y, z = row[col_indices['pos']:col_indices['pos']+3]
-                outfile.write(f"v {x} {y} {z}\n")
-            outfile.write("\n")
+            if weld:
+                print(f"  [焊接] {num_vertices} 行 -> {unique_vertices} 个唯一顶点 "
+                      f"(压缩比 {num_vertices / unique_vertices:.2f}x)")
+            print(f"  [成功] 转换完成！模型已保存到: {output_filepath}")
+            return True
 
-            # 写入 vt (纹理坐标)
-            if col_indices['uv'] != -1:
-                for row in vertices:
-                    u, v = row[col_indices['uv']:col_indices['uv']+2]
-                    outfile.write(f"vt {u} {1.0 - float(v)}\n")
-                outfile.write("\n")
-            
-            # 写入 vn (顶点法线)
-            if col_indices['norm'] != -1:
-                for row in vertices:
-                    nx, ny, nz = row[col_indices['norm']:col_indices['norm']+3]
-                    outfile.write(f"vn {nx} {ny} {nz}\n")
-                outfile.write("\n")
+    except FileNotFoundError:
+        print(f"  [错误] 输入文件 '{input_filepath}' 未找到。")
+    except Exception as e:
+        print(f"  [错误] 转换过程中发生错误: {e}")
+    return False
+
+def build_gltf(name, attributes, data, indices, mode, count, encodings=None, node=None):
+    """
+    构造单个网格的 glTF JSON 与 BIN 块列表。
+    attributes: [(glTF 属性名, 使用的列)]；data: 每个属性的数组 (按顶点连续存放)；
+    indices: 索引数组 ('H' 或 'I')，没有索引时为 None；count: 每个属性写出的顶点数。
+    encodings: 与 data 对应的整数编码 (见 quantize_attributes)，None 表示全部为 float32；
+    node: 合并到节点中的变换 (如量化位置的 translation/scale)。
+    每个属性单独占用一个缓冲视图，起始位置按 4 字节对齐，并记录各分量的 min/max。
+    返回 (gltf 字典, 依次写入 BIN 块的数组列表)。
+    """
+    buffer_views = []
+    accessors = []
+    blocks = []
+    offset = 0
+
+    def add_view(values, target, stride=None):
+        nonlocal offset
+        offset = (offset + 3) & ~3
+        buffer_views.append({'buffer': 0, 'byteOffset': offset, 'byteLength': len(values) * values.itemsize,
+                             'target': target})
+        if stride is not None:
+            buffer_views[-1]['byteStride'] = stride
+        blocks.append(values)
+        offset += len(values) * values.itemsize
+        return len(buffer_views) - 1
+
+    primitive = {'attributes': {}, 'mode': mode}
+    for (gltf_name, columns), values, encoding in zip(attributes, data, encodings or repeat(None)):
+        width = step = len(columns)
+        if encoding is None:
+            accessor = {'bufferView': add_view(values, GLTF_ARRAY_BUFFER), 'componentType': GLTF_FLOAT}
+        else:
+            # 每个顶点补齐到 4 字节，多出的分量不属于属性
+            step = encoding['step']
+            stride = step * values.itemsize if step != width else None
+            accessor = {'bufferView': add_view(values, GLTF_ARRAY_BUFFER, stride),
+                        'componentType': encoding['componentType']}
+            if encoding['normalized']:
+                accessor['normalized'] = True
+        accessor.update(count=count, type=GLTF_TYPES[width])
+        # 归一化属性不写 min/max (只有 POSITION 必须提供，且位置不归一化)
+        if count and not accessor.get('normalized'):
+            accessor['min'] = [min(values[k::step]) for k in range(width)]
+            accessor['max'] = [max(values[k::step]) for k in range(width)]
+        primitive['attributes'][gltf_name] = len(accessors)
+        accessors.append(accessor)
+
+    if indices is not None:
+        primitive['indices'] = len(accessors)
+        accessors.append({'bufferView': add_view(indices, GLTF_ELEMENT_ARRAY_BUFFER),
+                          'componentType': GLTF_UNSIGNED_SHORT if indices.typecode == 'H' else GLTF_UNSIGNED_INT,
+                          'count': len(indices), 'type': 'SCALAR'})
+
+    gltf = {
+        'asset': {'version': '2.0', 'generator': 'csv_to_obj.py'},
+        'scene': 0,
+        'scenes': [{'nodes': [0]}],
+        'nodes': [dict({'mesh': 0, 'name': name}, **(node or {}))],
+        'meshes': [{'name': name, 'primitives': [primitive]}],
+        'buffers': [{'byteLength': (offset + 3) & ~3}],
+        'bufferViews': buffer_views,
+        'accessors': accessors,
+    }
+    if encodings is not None and any(encodings):
+        gltf['extensionsUsed'] = gltf['extensionsRequired'] = [KHR_MESH_QUANTIZATION]
+    return gltf, blocks
+
+def simulate_acmr(indices, cache_size=VERTEX_CACHE_SIZE):
+    """
+    模拟 FIFO 顶点缓存，返回 ACMR (平均每个三角形的缓存未命中次数，3 为最差)。
+    顶点在第 t 次未命中时进入缓存，之后再有 cache_size 次未命中即被挤出。
+    """
+    if len(indices) < 3:
+        return 0.0
+    inserted = [-cache_size - 1] * (max(indices) + 1)
+    misses = 0
+    for v in indices:
+        if misses - inserted[v] > cache_size:
+            inserted[v] = misses
+            misses += 1
+    return misses / (len(indices) // 3)
+
+def tipsify(indices, num_vertices, cache_size=VERTEX_CACHE_SIZE):
+    """
+    Tipsify 三角形重排 (Sander 等, "Fast Triangle Reordering for Vertex Locality and Reduced Overdraw", 2007)。
+    以一个顶点为扇心输出其所有未输出的三角形，再从刚进入缓存、剩余三角形少的顶点中选下一个扇心，
+    运行时间与三角形数成线性。返回与 indices 同类型的新索引数组 (三角形内的顶点顺序不变)。
+    """
+    num_triangles = len(indices) // 3
+    # 每个顶点相邻三角形的压缩邻接表 (CSR)
+    live = [0] * num_vertices
+    for v in indices:
+        live[v] += 1
+    starts = [0] * (num_vertices + 1)
+    total = 0
+    for v in range(num_vertices):
+        starts[v] = total
+        total += live[v]
+    starts[num_vertices] = total
+    fill = starts[:]
+    adjacency = [0] * total
+    for corner, v in enumerate(indices):
+        adjacency[fill[v]] = corner // 3
+        fill[v] += 1
+
+    timestamps = [0] * num_vertices
+    emitted = bytearray(num_triangles)
+    dead_end = []
+    output = array.array(indices.typecode)
+    time_now = cache_size + 1
+    cursor = 1
+    fanning = 0 if num_triangles else -1
+    while fanning >= 0:
+        candidates = []
+        for t in adjacency[starts[fanning]:starts[fanning + 1]]:
+            if emitted[t]:
+                continue
+            emitted[t] = 1
+            corner = 3 * t
+            for v in indices[corner:corner + 3]:
+                output.append(v)
+                dead_end.append(v)
+                candidates.append(v)
+                live[v] -= 1
+                if time_now - timestamps[v] > cache_size:
+                    timestamps[v] = time_now
+                    time_now += 1
+
+        # 下一个扇心: 输出其剩余三角形后仍在缓存中、且在缓存中最久的候选顶点
+        fanning = -1
+        best = -1
+        for v in candidates:
+            if live[v]:
+                priority = time_now - timestamps[v]
+                if priority + 2 * live[v] > cache_size:
+                    priority = 0
+                if priority > best:
+                    best = priority
+                    fanning = v
+        if fanning < 0:
+            # 死胡同: 先找最近输出的仍有三角形的顶点，再按编号顺序找
+            while dead_end:
+                v = dead_end.pop()
+                if live[v]:
+                    fanning = v
+                    break
+            else:
+                while cursor < num_vertices and not live[cursor]:
+                    cursor += 1
+                if cursor < num_vertices:
+                    fanning = cursor
+    return output
+
+def reorder_vertices(indices, num_vertices):
+    """
+    按顶点在索引中首次出现的顺序重新编号，提高顶点读取的局部性。
+    未被引用的顶点排在最后。返回 (新索引数组, 新顺序中每个位置对应的原顶点编号列表)。
+    """
+    remap = [-1] * num_vertices
+    order = []
+    for v in indices:
+        if remap[v] < 0:
+            remap[v] = len(order)
+            order.append(v)
+    if len(order) < num_vertices:
+        for v in range(num_vertices):
+            if remap[v] < 0:
+                remap[v] = len(order)
+                order.append(v)
+    return array.array(indices.typecode, map(remap.__getitem__, indices)), order
+
+def permute_vertices(values, width, order):
+    """按 order (新位置 -> 原顶点编号) 重排按顶点连续存放的属性数组"""
+    result = array.array(values.typecode, bytes(len(values) * values.itemsize))
+    for k in range(width):
+        result[k::width] = array.array(values.typecode, map(values[k::width].__getitem__, order))
+    return result
+
+def _quantize_column(values, scale, bias, lowest, highest):
+    """按 round((v - bias) * scale) 量化一个分量，并限制在整数类型范围内"""
+    return array.array('h' if lowest < 0 else 'H',
+                       (min(highest, max(lowest, round((v - bias) * scale))) for v in values))
+
+def quantize_attributes(attributes, data, count):
+    """
+    按 KHR_mesh_quantization 将属性量化为 16 位整数:
+    POSITION 存为 SHORT，以所有轴共用的缩放 (保持法线方向不变) 和平移写入节点变换；
+    NORMAL/TANGENT 存为归一化的 SHORT；范围在 [0, 1] 内的 TEXCOORD 存为归一化的 UNSIGNED_SHORT。
+    其余属性保持 float32。VEC3 的每个顶点补齐到 4 个分量以满足 4 字节对齐。
+    返回 (新的数组列表, 编码列表, 节点变换)。
+    """
+    result = []
+    encodings = []
+    node = {}
+    for (gltf_name, columns), values in zip(attributes, data):
+        width = len(columns)
+        encoding = None
+        if gltf_name == 'POSITION' and count:
+            lows = [min(values[k::width]) for k in range(width)]
+            highs = [max(values[k::width]) for k in range(width)]
+            center = [(lo + hi) / 2 for lo, hi in zip(lows, highs)]
+            extent = max(hi - lo for lo, hi in zip(lows, highs)) / 2 or 1.0
+            # 放大到整数后整体缩放回原尺寸
+            scale = extent / 32767
+            node = {'translation': center, 'scale': [scale] * 3}
+            encoding = {'componentType': GLTF_SHORT, 'normalized': False,
+                        'columns': [(1 / scale, center[k], -32767, 32767) for k in range(width)]}
+        elif gltf_name in ('NORMAL', 'TANGENT'):
+            encoding = {'componentType': GLTF_SHORT, 'normalized': True,
+                        'columns': [(32767, 0.0, -32767, 32767)] * width}
+        elif gltf_name.startswith('TEXCOORD') and count and min(values) >= 0.0 and max(values) <= 1.0:
+            encoding = {'componentType': GLTF_UNSIGNED_SHORT, 'normalized': True,
+                        'columns': [(65535, 0.0, 0, 65535)] * width}
+
+        if encoding is None:
+            result.append(values)
+            encodings.append(None)
+            continue
+        step = (width + 1) & ~1
+        quantized = array.array('h' if encoding['componentType'] == GLTF_SHORT else 'H', bytes(2 * step * count))
+        for k, column in enumerate(encoding.pop('columns')):
+            quantized[k::step] = _quantize_column(values[k::width], *column)
+        encoding['step'] = step
+        result.append(quantized)
+        encodings.append(encoding)
+    return result, encodings, node
+
+def write_glb(output_filepath, gltf, blocks):
+    """
+    写出 GLB 容器: 12 字节文件头、JSON 块与 BIN 块，两个块都补齐到 4 字节。
+    blocks 按 build_gltf 计算的对齐方式依次写入，数组按小端字节序存储。
+    """
+    json_bytes = json.dumps(gltf, separators=(',', ':')).encode('utf-8')
+    json_bytes += b' ' * (-len(json_bytes) % 4)
+    bin_length = gltf['buffers'][0]['byteLength']
+    total = 12 + 8 + len(json_bytes) + 8 + bin_length
+    with open(output_filepath, 'wb') as outfile:
+        outfile.write(struct.pack('<4sII', b'glTF', 2, total))
+        outfile.write(struct.pack('<II', len(json_bytes), GLB_CHUNK_JSON))
+        outfile.write(json_bytes)
+        outfile.write(struct.pack('<II', bin_length, GLB_CHUNK_BIN))
+        written = 0
+        for values in blocks:
+            outfile.write(bytes(-written % 4))
+            written += -written % 4
+            if sys.byteorder != 'little':
+                values = array.array(values.typecode, values)
+                values.byteswap()
+            outfile.write(values.tobytes())
+            written += len(values) * values.itemsize
+        outfile.write(bytes(bin_length - written))
+
+def convert_csv_to_glb(input_filepath, output_filepath, stats=None, weld=None, weld_epsilon=0.0, topology=None,
+                       optimize=False, quantize=False):
+    """
+    将网格文件转换为 glTF 2.0 二进制文件 (.glb)。与 OBJ 不同，切线、第二套 UV、顶点颜色等
+    全部顶点属性都会写出 (见 gltf_attribute_names)，每个属性存为 float32 缓冲视图并带 min/max 范围。
+    UV 保持原值 (glTF 与 D3D 一样以左上角为原点，不做翻转)。
+    焊接或展开三角形带/扇时写出索引，唯一顶点不超过 65535 个时使用 16 位索引。
+    optimize: 用 Tipsify 重排三角形、按首次使用顺序重排顶点，并输出前后的 ACMR
+    (需要索引，未指定 --weld 时合并全部属性完全相同的顶点)；quantize: 见 quantize_attributes。
+    其余参数与返回值同 convert_csv_to_obj。
+    """
+    print(f"正在处理: {input_filepath} -> {output_filepath}")
+    try:
+        topology = resolve_topology(input_filepath, topology)
+        if optimize and weld is None and topology in ('list', 'strip', 'fan'):
+            # 重排需要索引化的网格。IDX 不一定唯一标识顶点 (例如旧版本导出的展开实例中每个实例的 IDX 相同)，
+            # 因此只合并全部属性数值完全相同的行，不会丢失任何数据
+            print("  [优化] 未指定 --weld，合并全部属性完全相同的顶点。")
+            weld, weld_epsilon = 'attr', 0.0
+
+        # 不焊接的三角形列表按块整列转换，其余情况逐行处理
+        chunked = weld is None and topology == 'list'
+        with open_mesh_rows(input_filepath, chunked) as (header, reader):
+            attributes = gltf_attribute_names(find_attributes(header))
+            if not any(gltf_name == 'POSITION' for gltf_name, _ in attributes):
+                print("  [错误] CSV文件中必须包含顶点位置数据。跳过此文件。")
+                return False
+            for gltf_name, columns in attributes:
+                print(f"  [OK] {gltf_name}: 列 {columns[0]}-{columns[-1]}")
 
-            # 写入面 f (face)
-            for i in range(0, num_vertices, 3):
-                if i + 2 < num_vertices:
-                    i1, i2, i3 = i + 1, i + 2, i + 3
-                    
-                    if col_indices['uv'] != -1 and col_indices['norm'] != -1:
-                        outfile.write(f"f {i1}/{i1}/{i1} {i2}/{i2}/{i2} {i3}/{i3}/{i3}\n")
-                    elif col_indices['uv'] != -1:
-                        outfile.write(f"f {i1}/{i1} {i2}/{i2} {i3}/{i3}\n")
-                    elif col_indices['norm'] != -1:
-                        outfile.write(f"f {i1}//{i1} {i2}//{i2} {i3}//{i3}\n")
+            all_columns = [c for _, columns in attributes for c in columns]
+            weld_key = make_weld_key(header, None, weld, weld_epsilon, all_columns) if weld else None
+            # 属性的列总是相邻的，每行每个属性只做一次切片
+            slices = [slice(columns[0], columns[-1] + 1) for _, columns in attributes]
+            data = [array.array('f') for _ in attributes]
+
+            # 焊接或展开带/扇时记录每个角点的顶点编号 (从1开始，0 表示图元重启)
+            expand = topology in ('strip', 'fan')
+            record = expand or weld_key is not None
+            corner_refs = array.array('q')
+            corner_ids = array.array('q')
+            upper_header = [h.strip().upper() for h in header]
+            idx_col = upper_header.index('IDX') if 'IDX' in upper_header else None
+
+            num_vertices = 0
+            welded = {}
+            idx = None
+            if chunked:
+                # 与 write_vertex_chunks 相同: 行从第一个用到的列开始作为缓存键，重复顶点直接复用打包好的属性
+                skip = min(all_columns)
+                cache = VertexBytesCache(slices, skip)
+                for chunk in reader:
+                    if chunk and isinstance(chunk[0], str):
+                        keys = map(operator.itemgetter(skip), map(operator.methodcaller('split', ',', skip), chunk)) if skip else chunk
                     else:
-                        outfile.write(f"f {i1} {i2} {i3}\n")
+                        keys = map(operator.itemgetter(slice(skip, None)), chunk)
+                    entries = cache.lookup(keys)
+                    num_vertices += len(entries)
+                    for k, values in enumerate(data):
+                        values.frombytes(b''.join(map(operator.itemgetter(k), entries)))
+                reader = ()
+            for row in reader:
+                if expand and idx_col is not None:
+                    idx = int(row[idx_col])
+                    if idx < 0:
+                        corner_refs.append(0)
+                        corner_ids.append(-1)
+                        continue
 
-            print(f"  [成功] 转换完成！模型已保存到: {output_filepath}")
-            return True
+                num_vertices += 1
+                if weld_key is not None:
+                    key = weld_key(row)
+                    ref = welded.get(key)
+                    if ref is not None:
+                        corner_refs.append(ref)
+                        corner_ids.append(ref if idx is None else idx)
+                        continue
+                    ref = welded[key] = len(welded) + 1
+                else:
+                    ref = num_vertices
+                if record:
+                    corner_refs.append(ref)
+                    corner_ids.append(ref if idx is None else idx)
+                for values, columns in zip(data, slices):
+                    values.extend(map(float, row[columns]))
+
+        unique_vertices = len(welded) if weld_key is not None else num_vertices
+        if stats is not None:
+            stats['vertices'] = num_vertices
+            stats['unique_vertices'] = unique_vertices
+        if num_vertices == 0:
+            print("  [错误] CSV文件中没有数据行。跳过此文件。")
+            return False
+
+        count = unique_vertices
+        indices = None
+        mode = GLTF_TRIANGLES
+        index_type = 'H' if unique_vertices <= 0xFFFF else 'I'
+        if expand:
+            indices = array.array(index_type)
+            for faces in expand_topology(corner_refs, corner_ids, topology):
+                indices.extend(map(operator.sub, chain.from_iterable(faces), repeat(1)))
+            print(f"  [OK] {len(corner_refs)} 个索引展开为 {len(indices) // 3} 个三角形")
+        elif topology == 'list':
+            if num_vertices % 3:
+                print(f"  [警告] 顶点行数 {num_vertices} 不是3的倍数，末尾 {num_vertices % 3} 行不构成完整三角形，已忽略。")
+            if weld_key is not None:
+                end = len(corner_refs) - len(corner_refs) % 3
+                indices = array.array(index_type, map(operator.sub, corner_refs[:end], repeat(1)))
+            else:
+                count = num_vertices - num_vertices % 3
+                for values, (_, columns) in zip(data, attributes):
+                    del values[count * len(columns):]
+        else:
+            # 不支持的拓扑只写出顶点
+            mode = GLTF_POINTS
+
+        if optimize and indices is not None:
+            before = simulate_acmr(indices)
+            reordered = tipsify(indices, count)
+            after = simulate_acmr(reordered)
+            note = ''
+            if after < before:
+                indices = reordered
+            else:
+                # 游戏资源的三角形顺序通常已优化过，重排没有改善时保持原顺序
+                after = before
+                note = '，原三角形顺序更优，已保留'
+            indices, order = reorder_vertices(indices, count)
+            data = [permute_vertices(values, len(columns), order) for values, (_, columns) in zip(data, attributes)]
+            print(f"  [优化] ACMR {before:.3f} -> {after:.3f} (缓存大小 {VERTEX_CACHE_SIZE}){note}")
+
+        encodings = None
+        node = None
+        if quantize:
+            float_bytes = sum(len(values) * values.itemsize for values in data)
+            data, encodings, node = quantize_attributes(attributes, data, count)
+            quantized_bytes = sum(len(values) * values.itemsize for values in data)
+            print(f"  [量化] 顶点数据 {float_bytes:,} -> {quantized_bytes:,} 字节 "
+                  f"(减少 {100 * (1 - quantized_bytes / max(float_bytes, 1)):.1f}%)")
+
+        name = os.path.splitext(os.path.basename(input_filepath))[0]
+        gltf, blocks = build_gltf(name, attributes, data, indices, mode, count, encodings, node)
+        write_glb(output_filepath, gltf, blocks)
+
+        if weld_key is not None:
+            print(f"  [焊接] {num_vertices} 行 -> {unique_vertices} 个唯一顶点 "
+                  f"(压缩比 {num_vertices / unique_vertices:.2f}x)")
+        print(f"  [成功] 转换完成！模型已保存到: {output_filepath}")
+        return True
 
     except FileNotFoundError:
         print(f"  [错误] 输入文件 '{input_filepath}' 未找到。")
@@ -105,6 +1077,349 @@ def convert_csv_to_obj(input_filepath, output_filepath):
         print(f"  [错误] 转换过程中发生错误: {e}")
     return False
 
+def file_sha256(filepath):
+    """分块计算文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_manifest(output_dir):
+    """读取输出目录中的转换清单，不存在或损坏时返回空清单"""
+    try:
+        with open(os.path.join(output_dir, MANIFEST_FILENAME), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') == 1:
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return {'version': 1, 'files': {}}
+
+def save_manifest(output_dir, manifest):
+    """先写入临时文件再替换，避免中断时留下损坏的清单"""
+    path = os.path.join(output_dir, MANIFEST_FILENAME)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+def plan_incremental(csv_files, manifest, options, output_dir='.'):
+    """
+    根据清单找出需要重新转换的文件。
+    大小与修改时间都未变时直接跳过；否则比较内容哈希，内容未变时只更新清单中的时间戳。
+    返回 (需要转换的文件列表, 跳过的文件列表)。
+    """
+    to_convert = []
+    skipped = []
+    for filename in csv_files:
+        entry = manifest['files'].get(filename)
+        if entry is None or entry.get('options') != options or \
+                not os.path.exists(os.path.join(output_dir, entry.get('output', ''))):
+            to_convert.append(filename)
+            continue
+
+        st = os.stat(filename)
+        if entry.get('size') == st.st_size and entry.get('mtime') == st.st_mtime:
+            skipped.append(filename)
+        elif entry.get('size') == st.st_size and entry.get('sha256') == file_sha256(filename):
+            entry['mtime'] = st.st_mtime
+            skipped.append(filename)
+        else:
+            to_convert.append(filename)
+    return to_convert, skipped
+
+def _convert_batch_item(filename, capture_output=False, options=None, output_format='obj'):
+    """
+    批量模式中转换单个文件，返回结果字典 (是否成功、输出日志、耗时、顶点数、字节数)。
+    capture_output 为 True 时收集该文件的全部输出，供进程池按顺序打印。
+    options: 传给转换函数的关键字参数 (如 weld)。
+    output_format: 'obj' 或 'glb'，见 CONVERTERS。
+    """
+    options = options or {}
+    convert = CONVERTERS[output_format]
+    base_name = os.path.splitext(filename)[0]
+    output_filename = f"{base_name}.{output_format}"
+    stats = {'vertices': 0}
+    log = io.StringIO()
+
+    start = time.perf_counter()
+    if capture_output:
+        with redirect_stdout(log):
+            ok = convert(filename, output_filename, stats, **options)
+    else:
+        ok = convert(filename, output_filename, stats, **options)
+    elapsed = time.perf_counter() - start
+
+    result = {'file': filename, 'ok': ok, 'log': log.getvalue(), 'elapsed': elapsed,
+              'vertices': stats['vertices'], 'bytes': 0, 'output': output_filename}
+    if ok:
+        # 转换成功的文件记录到清单中，供下次增量转换比较
+        st = os.stat(filename)
+        result.update(bytes=st.st_size, mtime=st.st_mtime, sha256=file_sha256(filename))
+    return result
+
+def _format_throughput(vertices, size, elapsed):
+    """格式化耗时与吞吐量 (顶点/秒, MB/秒)"""
+    elapsed = max(elapsed, 1e-9)
+    return (f"耗时 {elapsed:.3f}s | {vertices / elapsed:,.0f} 顶点/s | "
+            f"{size / (1024 * 1024) / elapsed:.2f} MB/s")
+
+def convert_batch(csv_files, jobs=1, options=None, output_format='obj'):
+    """
+    批量转换文件列表。options 为传给转换函数的关键字参数，output_format 为 'obj' 或 'glb'。
+    jobs > 1 时使用进程池并行转换，
+    每个文件的输出被收集后按输入顺序打印，不会交错。
+    返回每个文件的结果字典列表。
+    """
+    batch_results = []
+    success_count = 0
+    fail_count = 0
+    total_vertices = 0
+    total_bytes = 0
+    start = time.perf_counter()
+
+    if jobs > 1:
+        executor = ProcessPoolExecutor(max_workers=jobs)
+        results = executor.map(_convert_batch_item, csv_files, [True] * len(csv_files),
+                               [options] * len(csv_files), [output_format] * len(csv_files))
+    else:
+        executor = None
+        results = (_convert_batch_item(filename, False, options, output_format) for filename in csv_files)
+
+    try:
+        for result in results:
+            batch_results.append(result)
+            print(result['log'], end='')
+            print(f"  {_format_throughput(result['vertices'], result['bytes'], result['elapsed'])}")
+            if result['ok']:
+                success_count += 1
+            else:
+                fail_count += 1
+            total_vertices += result['vertices']
+            total_bytes += result['bytes']
+            print("-" * 20) # 添加分隔符
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    elapsed = time.perf_counter() - start
+    print("\n批量转换完成！")
+    print(f"总计: {success_count} 个成功, {fail_count} 个失败。")
+    print(f"总体 ({jobs} 个进程): {_format_throughput(total_vertices, total_bytes, elapsed)}")
+    return batch_results
+
+def convert_batch_incremental(csv_files, jobs=1, force=False, output_dir='.', options=None, output_format='obj'):
+    """
+    增量批量转换: 只转换新增或内容有变化的文件，并更新输出目录中的清单。
+    force 为 True 时忽略清单，重新转换全部文件。
+    options 为传给转换函数的关键字参数，选项或输出格式变化的文件也会重新转换。
+    """
+    converter_options = dict(options or {})
+    options = dict(converter_options, format=output_format)
+    manifest = load_manifest(output_dir)
+    if force:
+        to_convert, skipped = list(csv_files), []
+    else:
+        to_convert, skipped = plan_incremental(csv_files, manifest, options, output_dir)
+    if skipped:
+        print(f"跳过 {len(skipped)} 个未修改的文件 (使用 --force 强制重新转换)。\n")
+
+    results = convert_batch(to_convert, jobs, converter_options, output_format) if to_convert else []
+
+    # 本次转换的结果并入清单: 不在本次文件列表中的记录 (如 --query 只选中部分文件) 保留，
+    # 只删除输入文件已不存在的记录与本次转换失败的文件的旧记录
+    files = {name: entry for name, entry in manifest['files'].items() if os.path.exists(name)}
+    for result in results:
+        if result['ok']:
+            files[result['file']] = {'size': result['bytes'], 'mtime': result['mtime'],
+                                     'sha256': result['sha256'], 'options': options,
+                                     'output': result['output']}
+        else:
+            files.pop(result['file'], None)
+    manifest['files'] = files
+    save_manifest(output_dir, manifest)
+    return results
+
+def _event_sort_key(filename):
+    """按文件名中的事件ID (model_event{N}) 排序，没有事件ID的文件按名称排在最后"""
+    match = re.search(r'event(\d+)', os.path.basename(filename))
+    return (int(match.group(1)) if match else float('inf'), filename)
+
+def read_draw_texture(input_filepath):
+    """
+    读取 RenderDocExport.py 为 DrawCall 写出的同名 .json，返回第一张输入贴图 (PNG) 的路径，
+    没有记录时返回 None。.json 中的贴图路径相对导出目录，即网格所在 models 文件夹的上一级。
+    """
+    info_path = os.path.splitext(input_filepath)[0] + '.json'
+    try:
+        with open(info_path, 'r', encoding='utf-8') as info_file:
+            info = json.load(info_file)
+    except (OSError, ValueError):
+        return None
+    for entry in (info.get('textures') or {}).get('input', []):
+        if entry.get('png'):
+            return os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(input_filepath)), os.pardir, entry['png']))
+    return None
+
+def find_catalog(directory='.'):
+    """在目录及其上一级 (在 models 文件夹中运行时即导出目录) 查找目录数据库，找不到时返回 None"""
+    for folder in (directory, os.path.join(directory, os.pardir)):
+        path = os.path.normpath(os.path.join(folder, CATALOG_FILENAME))
+        if os.path.isfile(path):
+            return path
+    return None
+
+def query_catalog(catalog_path, where):
+    """
+    按 SQL 条件从目录数据库的 draws 表中选出网格文件，按事件ID排序。
+    where 为 WHERE 子句，可使用 draws 表的列，或通过子查询使用 attributes/textures 表，
+    例如 "vertexCount > 50000"。返回相对当前目录的网格路径，文件已不存在的 DrawCall 会被跳过。
+    """
+    # 以只读方式打开，避免路径错误时创建空数据库
+    uri = 'file:' + urllib.request.pathname2url(os.path.abspath(catalog_path)) + '?mode=ro'
+    with closing(sqlite3.connect(uri, uri=True)) as connection:
+        rows = connection.execute(f"SELECT mesh FROM draws WHERE {where} ORDER BY eventId").fetchall()
+    export_dir = os.path.dirname(os.path.abspath(catalog_path))
+    mesh_files = []
+    for (mesh,) in rows:
+        path = os.path.relpath(os.path.join(export_dir, mesh))
+        if os.path.isfile(path):
+            mesh_files.append(path)
+        else:
+            print(f"  [警告] 目录数据库中的网格文件 '{path}' 不存在，已跳过。")
+    return mesh_files
+
+def _copy_range(src, dst, start, end):
+    """将二进制文件 src 中 [start, end) 字节分块复制到文本文件 dst (顶点与面定义只含 ASCII 字符)"""
+    src.seek(start)
+    remaining = end - start
+    while remaining > 0:
+        data = src.read(min(CHUNK_BYTES, remaining))
+        if not data:
+            break
+        dst.write(data.decode('ascii'))
+        remaining -= len(data)
+
+@contextmanager
+def _spill_file():
+    """
+    以二进制模式打开的临时文件，及写入它的文本包装 (不转换换行符，写入直达二进制文件)。
+    tell() 在二进制文件上返回的是真实的字节偏移，在 Windows 上也不受 \r\n 影响。
+    返回 (二进制文件, 文本包装)。
+    """
+    with tempfile.TemporaryFile() as raw:
+        text = io.TextIOWrapper(raw, encoding='utf-8', newline='', write_through=True)
+        try:
+            yield raw, text
+        finally:
+            text.detach()
+
+def convert_scene(mesh_files, output_filepath, weld=None, weld_epsilon=0.0, topology=None):
+    """
+    合并场景: 将多个 DrawCall 的网格按事件ID顺序写入同一个OBJ，每个 DrawCall 一个 o/g 分组，
+    并引用由其第一张输入贴图生成的材质 (写入同名 .mtl)。面索引按此前已写出的 v/vt/vn 数量平移。
+    内容 (SHA-256) 与拓扑都相同的网格只写出一次顶点，之后的 DrawCall 作为实例复用这些顶点，只重复写出面。
+    每个网格的顶点先写入临时文件，成功后才连同分组一起追加到输出文件，失败的网格不会留下多余的顶点；
+    面定义暂存在临时文件中供实例复制，内存占用与场景大小无关。
+    weld、weld_epsilon、topology 的含义同 convert_csv_to_obj。
+    返回结果字典 (draws, meshes, instances, failed, vertices)。
+    """
+    print(f"正在合并场景: {len(mesh_files)} 个网格文件 -> {output_filepath}")
+    mtl_filepath = os.path.splitext(output_filepath)[0] + '.mtl'
+    mtl_dir = os.path.dirname(os.path.abspath(mtl_filepath))
+    result = {'draws': 0, 'meshes': 0, 'instances': 0, 'failed': 0, 'vertices': 0}
+    # 已写出的 v/vt/vn 数量
+    offsets = [0, 0, 0]
+    # (内容哈希, 拓扑) -> 该网格的面在 face_spill 中的 (起始, 结束) 位置
+    meshes = {}
+    # 贴图路径 -> 材质名
+    materials = {}
+
+    with open(output_filepath, 'w', encoding='utf-8') as outfile, \
+         open(mtl_filepath, 'w', encoding='utf-8') as mtlfile, \
+         _spill_file() as (vertex_spill, vertex_text), \
+         _spill_file() as (face_spill, face_text):
+        outfile.write(f"# Merged scene of {len(mesh_files)} draws\n")
+        outfile.write(f"mtllib {os.path.basename(mtl_filepath)}\n\n")
+        mtlfile.write("newmtl default\nKd 0.8 0.8 0.8\n\n")
+
+        for filename in sorted(mesh_files, key=_event_sort_key):
+            name = os.path.splitext(os.path.basename(filename))[0]
+            print(f"正在处理: {filename}")
+            try:
+                draw_topology = resolve_topology(filename, topology)
+                key = (file_sha256(filename), draw_topology)
+
+                texture = read_draw_texture(filename)
+                material = 'default'
+                if texture is not None:
+                    material = materials.get(texture)
+                    if material is None:
+                        material = materials[texture] = f"mat{len(materials)}_{os.path.splitext(os.path.basename(texture))[0]}"
+                        texture_path = os.path.relpath(texture, mtl_dir).replace(os.sep, '/')
+                        mtlfile.write(f"newmtl {material}\nKd 1.0 1.0 1.0\nmap_Kd {texture_path}\n\n")
+                group = f"o {name}\ng {name}\nusemtl {material}\n"
+
+                face_range = meshes.get(key)
+                if face_range is not None:
+                    # 实例: 面直接引用第一次写出的顶点
+                    outfile.write(group)
+                    _copy_range(face_spill, outfile, *face_range)
+                    outfile.write("\n")
+                    result['draws'] += 1
+                    result['instances'] += 1
+                    print("  [实例] 与之前的网格内容相同，复用其顶点")
+                    continue
+
+                chunked = weld is None and draw_topology == 'list'
+                with open_mesh_rows(filename, chunked) as (header, reader):
+                    col_indices = find_column_indices(header)
+                    if col_indices['pos'] == -1:
+                        print("  [错误] CSV文件中必须包含顶点位置数据。跳过此文件。")
+                        result['failed'] += 1
+                        continue
+
+                    vertex_spill.seek(0)
+                    vertex_spill.truncate()
+                    face_start = face_spill.seek(0, os.SEEK_END)
+                    num_vertices, unique_vertices = write_obj_body(header, reader, col_indices, vertex_text, face_text,
+                                                                   weld, weld_epsilon, draw_topology, tuple(offsets))
+                    vertex_end = vertex_spill.tell()
+                    face_end = face_spill.tell()
+                if num_vertices == 0:
+                    print("  [错误] CSV文件中没有数据行。跳过此文件。")
+                    result['failed'] += 1
+                    continue
+
+                # 网格完整转换后才写出分组与顶点，使偏移量与输出文件中的 v/vt/vn 数量一致
+                outfile.write(group)
+                _copy_range(vertex_spill, outfile, 0, vertex_end)
+                _copy_range(face_spill, outfile, face_start, face_end)
+                outfile.write("\n")
+                meshes[key] = (face_start, face_end)
+                offsets[0] += unique_vertices
+                if col_indices['uv'] != -1:
+                    offsets[1] += unique_vertices
+                if col_indices['norm'] != -1:
+                    offsets[2] += unique_vertices
+                result['draws'] += 1
+                result['meshes'] += 1
+                result['vertices'] += unique_vertices
+            except FileNotFoundError:
+                print(f"  [错误] 输入文件 '{filename}' 未找到。")
+                result['failed'] += 1
+            except Exception as e:
+                print(f"  [错误] 转换过程中发生错误: {e}")
+                result['failed'] += 1
+
+    print(f"\n场景合并完成！{result['draws']} 个 DrawCall ({result['meshes']} 个唯一网格, "
+          f"{result['instances']} 个实例), {result['failed']} 个失败, 共 {result['vertices']} 个顶点。")
+    print(f"模型已保存到: {output_filepath} (材质: {mtl_filepath})")
+    return result
+
+# 输出格式 -> 转换函数
+CONVERTERS = {'obj': convert_csv_to_obj, 'glb': convert_csv_to_glb}
+
 # ==============================================================================
 # 脚本主入口点
 # ==============================================================================
@@ -121,15 +1436,94 @@ if __name__ == "__main__":
         "input", 
         nargs='?', 
         default=None,
-        help="可选: 要转换的单个CSV文件路径。\n如果留空，脚本将自动转换当前目录下的所有.csv文件。"
+        help="可选: 要转换的单个CSV或.meshbin文件路径。\n如果留空，脚本将自动转换当前目录下的所有.csv文件。"
     )
     # "-o" 参数现在只在单文件模式下有意义
     parser.add_argument(
         "-o", "--output", 
         help="可选: 输出的OBJ文件路径 (仅在指定单个输入文件时有效)。"
     )
+    # "-j" 参数只在批量模式下有意义
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=1,
+        help="可选: 批量模式下并行转换的进程数 (默认: 1)。"
+    )
+    parser.add_argument(
+        "--weld",
+        choices=["idx", "attr"],
+        default=None,
+        help="可选: 焊接重复顶点，输出索引化网格。\n"
+             "idx: 按 IDX 列合并; attr: 按位置/UV/法线数值合并。"
+    )
+    parser.add_argument(
+        "--weld-epsilon",
+        type=float,
+        default=0.0,
+        help="可选: --weld attr 时的量化精度 (默认: 0，数值完全相同才合并)。"
+    )
+    parser.add_argument(
+        "--topology",
+        choices=["list", "strip", "fan"],
+        default=None,
+        help="可选: 指定图元拓扑 (默认: 读取 .meshbin 文件头或同名 .json 中记录的拓扑，\n"
+             "没有记录时按三角形列表处理)。strip/fan 会展开为三角形，IDX 为 -1 的行视为图元重启。"
+    )
+    parser.add_argument(
+        "--format",
+        choices=sorted(CONVERTERS),
+        default="obj",
+        help="可选: 输出格式 (默认: obj)。glb 为 glTF 2.0 二进制文件，\n"
+             "额外保留切线、第二套 UV、顶点颜色等 OBJ 无法存储的属性。"
+    )
+    parser.add_argument(
+        "--scene",
+        metavar="SCENE.obj",
+        default=None,
+        help="可选: 批量模式下将所有网格按事件ID顺序合并为一个场景OBJ (及同名 .mtl)，\n"
+             "每个 DrawCall 一个 o/g 分组，内容相同的网格只写出一次顶点。\n"
+             "场景只支持 OBJ 输出，不受 --format/--optimize/--quantize 影响。"
+    )
+    parser.add_argument(
+        "--optimize",
+        action="store_true",
+        help=f"可选: --format glb 时用 Tipsify 重排三角形并按使用顺序重排顶点，提高顶点缓存命中率，\n"
+             f"并输出重排前后的 ACMR (缓存大小 {VERTEX_CACHE_SIZE})。未指定 --weld 时合并属性完全相同的顶点。"
+    )
+    parser.add_argument(
+        "--quantize",
+        action="store_true",
+        help="可选: --format glb 时按 KHR_mesh_quantization 将位置、法线、切线和 [0,1] 范围内的 UV\n"
+             "存为 16 位整数，并输出顶点数据减少的字节数。"
+    )
+    parser.add_argument(
+        "--query",
+        metavar="WHERE",
+        default=None,
+        help="可选: 批量模式下按 SQL 条件从导出目录的 catalog.sqlite 中选择要转换的 DrawCall，\n"
+             "而不是当前目录下的所有文件。例如 \"vertexCount > 50000\" 或\n"
+             "\"eventId IN (SELECT eventId FROM textures WHERE resourceId = 1234)\"。"
+    )
+    parser.add_argument(
+        "--catalog",
+        metavar="CATALOG.sqlite",
+        default=None,
+        help="可选: --query 使用的目录数据库 (默认: 在当前目录及上一级查找 catalog.sqlite)。"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help=f"可选: 批量模式下忽略 {MANIFEST_FILENAME} 清单，重新转换所有文件。"
+    )
     
     args = parser.parse_args()
+    options = {'weld': args.weld, 'weld_epsilon': args.weld_epsilon, 'topology': args.topology}
+    if args.optimize or args.quantize:
+        if args.format == 'glb':
+            options.update(optimize=args.optimize, quantize=args.quantize)
+        else:
+            print("[警告] --optimize/--quantize 只用于 --format glb，已忽略。")
     if args.input:
         # **单文件模式**: 用户提供了输入文件名
         print("模式: 单文件转换")
@@ -140,34 +1534,39 @@ if __name__ == "__main__":
             output_filepath = args.output
         else:
             base_name = os.path.splitext(input_filepath)[0]
-            output_filepath = f"{base_name}.obj"
+            output_filepath = f"{base_name}.{args.format}"
         
-        convert_csv_to_obj(input_filepath, output_filepath)
+        CONVERTERS[args.format](input_filepath, output_filepath, **options)
         
     else:
         # **批量模式**: 用户没有提供输入文件名
         print("模式: 批量转换 (未指定输入文件，将搜索当前目录)")
         
-        # 查找当前目录下的所有.csv文件
-        # os.listdir('.') 获取当前目录所有文件名
-        # f.lower().endswith('.csv') 确保能匹配 .csv, .CSV, .Csv 等
-        csv_files = [f for f in os.listdir('.') if f.lower().endswith('.csv')]
+        if args.query:
+            # 只转换目录数据库中符合条件的 DrawCall，不必逐个打开网格文件
+            catalog_path = args.catalog or find_catalog()
+            if catalog_path is None:
+                parser.error(f"未找到 {CATALOG_FILENAME}，请用 --catalog 指定目录数据库。")
+            try:
+                csv_files = query_catalog(catalog_path, args.query)
+            except sqlite3.Error as e:
+                parser.error(f"查询目录数据库 '{catalog_path}' 失败: {e}")
+            print(f"目录数据库 {catalog_path} 中有 {len(csv_files)} 个 DrawCall 符合条件。")
+        else:
+            # 查找当前目录下的所有.csv文件
+            # os.listdir('.') 获取当前目录所有文件名
+            # f.lower().endswith(...) 确保能匹配 .csv, .CSV, .meshbin 等
+            csv_files = [f for f in os.listdir('.') if f.lower().endswith(MESH_EXTENSIONS)
+                         and not os.path.splitext(f)[0].endswith(INSTANCE_TABLE_SUFFIX)]
         
         if not csv_files:
-            print("在当前目录中未找到任何 .csv 文件。")
+            print("在当前目录中未找到任何 .csv 或 .meshbin 文件。")
         else:
             print(f"找到 {len(csv_files)} 个CSV文件，准备开始转换...\n")
-            success_count = 0
-            fail_count = 0
-            for filename in csv_files:
-                base_name = os.path.splitext(filename)[0]
-                output_filename = f"{base_name}.obj"
-                
-                if convert_csv_to_obj(filename, output_filename):
-                    success_count += 1
-                else:
-                    fail_count += 1
-                print("-" * 20) # 添加分隔符
-            
-            print("\n批量转换完成！")
-            print(f"总计: {success_count} 个成功, {fail_count} 个失败。")
\ No newline at end of file
+            if args.scene:
+                if args.format != 'obj':
+                    print("[警告] --scene 只支持 OBJ 输出，忽略 --format 及 --optimize/--quantize。")
+                convert_scene(csv_files, args.scene, args.weld, args.weld_epsilon, args.topology)
+            else:
+                convert_batch_incremental(csv_files, max(1, args.jobs), args.force, options=options,
+                                          output_format=args.format)
@@ -0,0 +1,533 @@
+# csv_to_obj.py 的测试，使用合成的网格文件，不需要 RenderDoc。
+#
+#   python -m unittest discover tests
+
+import array
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import struct
+import sys
+import tempfile
+import unittest
+from itertools import chain
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import csv_to_obj
+
+
+def write_mesh_csv(path, positions, uvs=None, indices=None, normals=None):
+    """按 RenderDocExport.py 的格式写出网格 CSV: 每个角点一行，IDX 默认为行号"""
+    header = ['VTX', 'IDX', 'POSITION.x', 'POSITION.y', 'POSITION.z']
+    if normals is not None:
+        header += ['NORMAL.x', 'NORMAL.y', 'NORMAL.z']
+    if uvs is not None:
+        header += ['TEXCOORD0.x', 'TEXCOORD0.y']
+    indices = range(len(positions)) if indices is None else indices
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(', '.join(header) + '\n')
+        for i, (idx, pos) in enumerate(zip(indices, positions)):
+            row = [i, idx] + list(pos)
+            row += list(normals[i]) if normals is not None else []
+            row += list(uvs[i]) if uvs is not None else []
+            f.write(', '.join(map(str, row)) + '\n')
+
+
+def write_mesh_bin(path, header, columns, topology=None):
+    """按 RenderDocExport.py 的格式写出 .meshbin: columns 为每列的 (类型字符, 归一化方式, 原始值)"""
+    def align(n):
+        return (n + 7) & ~7
+
+    specs, blocks, offset = [], [], 0
+    for name, (type_char, normalize, values) in zip(header, columns):
+        specs.append({'name': name, 'type': type_char, 'normalize': normalize, 'offset': offset})
+        blocks.append(struct.pack(f'<{len(values)}{type_char}', *values))
+        offset = align(offset + len(blocks[-1]))
+    meta = json.dumps({'version': 1, 'rows': len(columns[0][2]), 'topology': topology, 'columns': specs}).encode('utf-8')
+    data_start = align(len(csv_to_obj.MESHBIN_MAGIC) + 4 + len(meta))
+    with open(path, 'wb') as f:
+        f.write(csv_to_obj.MESHBIN_MAGIC + struct.pack('<I', len(meta)) + meta)
+        for spec, block in zip(specs, blocks):
+            f.write(bytes(data_start + spec['offset'] - f.tell()))
+            f.write(block)
+
+
+def random_triangles(count, seed):
+    """count 个三角形的角点位置与 UV"""
+    rng = random.Random(seed)
+    positions = [tuple(rng.randint(-1000, 1000) / 8.0 for _ in range(3)) for _ in range(count * 3)]
+    uvs = [tuple(rng.randint(0, 64) / 64.0 for _ in range(2)) for _ in range(count * 3)]
+    return positions, uvs
+
+
+def read_obj_groups(path):
+    """
+    解析 OBJ: 返回 {分组名: [(位置, UV), ...]}，按面的顺序展开每个角点，
+    面索引按整个文件中的 v/vt 编号解析，用来检查合并场景中的偏移量。
+    没有分组的面放在 None 下。
+    """
+    v, vt, groups, current = [], [], {}, None
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            parts = line.split()
+            if not parts:
+                continue
+            if parts[0] == 'g':
+                current = groups.setdefault(parts[1], [])
+            elif parts[0] == 'v':
+                v.append(tuple(float(x) for x in parts[1:4]))
+            elif parts[0] == 'vt':
+                vt.append(tuple(float(x) for x in parts[1:3]))
+            elif parts[0] == 'f':
+                if current is None:
+                    current = groups.setdefault(None, [])
+                for corner in parts[1:]:
+                    refs = corner.split('/')
+                    uv = vt[int(refs[1]) - 1] if len(refs) > 1 and refs[1] else None
+                    current.append((v[int(refs[0]) - 1], uv))
+    return groups
+
+
+# glTF 访问器的分量类型对应的 struct 格式字符
+GLTF_FORMATS = {5120: 'b', 5121: 'B', 5122: 'h', 5123: 'H', 5125: 'I', 5126: 'f'}
+GLTF_WIDTHS = {'SCALAR': 1, 'VEC2': 2, 'VEC3': 3, 'VEC4': 4}
+
+
+def accessor_values(gltf, data, index):
+    """按缓冲视图的步长解码访问器，返回每个元素的分量元组"""
+    accessor = gltf['accessors'][index]
+    view = gltf['bufferViews'][accessor['bufferView']]
+    element = struct.Struct('<%d%s' % (GLTF_WIDTHS[accessor['type']], GLTF_FORMATS[accessor['componentType']]))
+    stride = view.get('byteStride', element.size)
+    start = view['byteOffset'] + accessor.get('byteOffset', 0)
+    return [element.unpack_from(data, start + i * stride) for i in range(accessor['count'])]
+
+
+class CsvToObjTestCase(unittest.TestCase):
+    """每个测试使用新的临时目录，并隐藏转换时的输出"""
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.stdout = contextlib.redirect_stdout(io.StringIO())
+        self.stdout.__enter__()
+
+    def tearDown(self):
+        self.stdout.__exit__(None, None, None)
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def path(self, name):
+        return os.path.join(self.folder, name)
+
+
+class IncrementalTest(CsvToObjTestCase):
+    """增量批量转换的清单"""
+    def setUp(self):
+        CsvToObjTestCase.setUp(self)
+        # 清单中的文件名相对于当前目录
+        self.cwd = os.getcwd()
+        os.chdir(self.folder)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        CsvToObjTestCase.tearDown(self)
+
+    def convert(self, files):
+        results = csv_to_obj.convert_batch_incremental(files)
+        return sorted(result['file'] for result in results)
+
+    def test_manifest_merge(self):
+        names = ['a.csv', 'b.csv', 'c.csv']
+        for seed, name in enumerate(names):
+            write_mesh_csv(name, *random_triangles(2, seed))
+        self.assertEqual(self.convert(names), names)
+
+        # 只转换部分文件 (如 --query) 时，其余文件的记录保留
+        os.utime('a.csv', (0, 0))
+        write_mesh_csv('b.csv', *random_triangles(3, 9))
+        self.assertEqual(self.convert(['b.csv']), ['b.csv'])
+        self.assertEqual(sorted(csv_to_obj.load_manifest('.')['files']), names)
+        self.assertEqual(self.convert(names), [])
+
+        # 输入文件被删除后，它的记录才从清单中删除
+        os.remove('c.csv')
+        self.assertEqual(self.convert(['a.csv']), [])
+        self.assertEqual(sorted(csv_to_obj.load_manifest('.')['files']), ['a.csv', 'b.csv'])
+
+
+class MeshbinTest(CsvToObjTestCase):
+    """.meshbin 与内容相同的 CSV 转换结果一致"""
+    HEADER = ['VTX', 'IDX', 'POSITION.x', 'POSITION.y', 'POSITION.z',
+              'NORMAL.x', 'NORMAL.y', 'NORMAL.z', 'TEXCOORD0.x', 'TEXCOORD0.y']
+
+    def write_pair(self, name, count, topology=None):
+        """写出同一网格的 .meshbin 与 CSV: 位置为 float32，法线为 SNorm8，UV 为 UNorm16"""
+        rng = random.Random(count)
+        positions = [rng.randint(-800, 800) / 8.0 for _ in range(count * 3)]
+        normals = [rng.randint(-127, 127) for _ in range(count * 3)]
+        uvs = [rng.choice([0, 65535, rng.randint(0, 65535)]) for _ in range(count * 2)]
+        columns = [('I', None, list(range(count))), ('q', None, list(range(count)))]
+        columns += [('f', None, positions[c::3]) for c in range(3)]
+        columns += [('b', 'snorm', normals[c::3]) for c in range(3)]
+        columns += [('H', 'unorm', uvs[c::2]) for c in range(2)]
+        write_mesh_bin(self.path(name + '.meshbin'), self.HEADER, columns, topology)
+
+        with open(self.path(name + '.csv'), 'w', encoding='utf-8') as f:
+            f.write(','.join(self.HEADER) + '\n')
+            # 归一化公式与 RenderDocExport.unpackData 相同 (SNorm8 除以 129)
+            for i in range(count):
+                row = [i, i] + positions[i * 3:i * 3 + 3]
+                row += [n / 129.0 for n in normals[i * 3:i * 3 + 3]] + [u / 65535.0 for u in uvs[i * 2:i * 2 + 2]]
+                f.write(','.join(map(str, row)) + '\n')
+        if topology is not None:
+            with open(self.path(name + '.json'), 'w', encoding='utf-8') as f:
+                json.dump({'topology': topology}, f)
+
+    def convert(self, name, ext):
+        obj_path = self.path(f'{name}_{ext}.obj')
+        self.assertIsNotNone(csv_to_obj.convert_csv_to_obj(self.path(f'{name}.{ext}'), obj_path))
+        with open(obj_path, 'r', encoding='utf-8') as f:
+            # 第一行注释包含输入文件名
+            return f.readlines()[1:]
+
+    def test_round_trip(self):
+        self.write_pair('mesh', 90)
+        expected = self.convert('mesh', 'csv')
+        self.assertEqual(sum(line.startswith('v ') for line in expected), 90)
+        self.assertEqual(self.convert('mesh', 'meshbin'), expected)
+
+        glb = {}
+        for ext in ('csv', 'meshbin'):
+            glb[ext] = self.path(f'mesh_{ext}.glb')
+            self.assertIsNotNone(csv_to_obj.convert_csv_to_glb(self.path(f'mesh.{ext}'), glb[ext]))
+        with open(glb['csv'], 'rb') as a, open(glb['meshbin'], 'rb') as b:
+            self.assertEqual(a.read(), b.read())
+
+    def test_topology(self):
+        # 文件头记录的拓扑与 CSV 同名 .json 中的拓扑作用相同
+        self.write_pair('strip', 12, 'TriangleStrip')
+        expected = self.convert('strip', 'csv')
+        self.assertEqual(sum(line.startswith('f ') for line in expected), 10)
+        self.assertEqual(self.convert('strip', 'meshbin'), expected)
+
+
+class WeldTest(CsvToObjTestCase):
+    """焊接重复顶点后，面展开的角点不变"""
+    def convert(self, csv_path, **options):
+        obj_path = self.path('weld.obj')
+        stats = {}
+        self.assertTrue(csv_to_obj.convert_csv_to_obj(csv_path, obj_path, stats, **options))
+        return read_obj_groups(obj_path)[None], stats
+
+    def test_idx(self):
+        # 按索引绘制的网格: 每个角点一行，同一 IDX 的行内容相同
+        positions, uvs = random_triangles(4, 3)
+        indices = [random.Random(3).randrange(5) for _ in range(12)]
+        write_mesh_csv(self.path('indexed.csv'), [positions[i] for i in indices], [uvs[i] for i in indices], indices)
+
+        expected, _ = self.convert(self.path('indexed.csv'))
+        for weld in ('idx', 'attr'):
+            corners, stats = self.convert(self.path('indexed.csv'), weld=weld)
+            self.assertEqual(corners, expected, weld)
+            self.assertEqual((stats['vertices'], stats['unique_vertices']), (12, len(set(indices))), weld)
+
+    def test_epsilon(self):
+        # 第二个三角形与第一个相差不到 weld_epsilon
+        positions = [(i / 8.0, 1.0, -i / 4.0) for i in range(3)]
+        positions += [(x + 1e-5, y, z - 1e-5) for x, y, z in positions]
+        write_mesh_csv(self.path('near.csv'), positions)
+
+        _, stats = self.convert(self.path('near.csv'), weld='attr')
+        self.assertEqual(stats['unique_vertices'], 6)
+        corners, stats = self.convert(self.path('near.csv'), weld='attr', weld_epsilon=1e-3)
+        self.assertEqual(stats['unique_vertices'], 3)
+        self.assertEqual(corners, [(p, None) for p in positions[:3]] * 2)
+
+
+class TopologyTest(CsvToObjTestCase):
+    """三角形带/扇的展开、绕序与图元重启"""
+    def expand(self, refs, topology, ids=None, chunk=65536):
+        refs = array.array('q', refs)
+        ids = array.array('q', [r if r else -1 for r in refs] if ids is None else ids)
+        return sum(csv_to_obj.expand_topology(refs, ids, topology, chunk), [])
+
+    def test_strip(self):
+        expected = [(1, 2, 3), (3, 2, 4), (3, 4, 5), (5, 4, 6)]
+        # 分批展开时每批仍从偶数三角形开始
+        for chunk in (2, 4, 65536):
+            self.assertEqual(self.expand(range(1, 7), 'strip', chunk=chunk), expected)
+        self.assertEqual(self.expand([1, 2, 3, 4, 0, 5, 6, 7], 'strip'), [(1, 2, 3), (3, 2, 4), (5, 6, 7)])
+        # 拼接条带时重复顶点产生的退化三角形被剔除，按原始索引判断
+        self.assertEqual(self.expand([1, 2, 3, 4, 5, 6], 'strip', ids=[0, 1, 1, 2, 3, 4]),
+                         [(3, 4, 5), (5, 4, 6)])
+
+    def test_fan(self):
+        self.assertEqual(self.expand([1, 2, 3, 4, 0, 5, 6, 7], 'fan'), [(1, 2, 3), (1, 3, 4), (5, 6, 7)])
+        self.assertEqual(self.expand([1, 2, 3, 4, 0, 0, 5, 6], 'fan', chunk=2), [(1, 2, 3), (1, 3, 4)])
+
+    def test_convert(self):
+        # 平面上的两段条带，中间以 IDX 为 -1 的行重启；所有三角形都应朝向 +Z
+        strip = [(0.0, 0.0), (1.0, 0.0), (0.0, 1.0), (1.0, 1.0), (0.0, 2.0), (1.0, 2.0)]
+        positions = [(x, y, 0.0) for x, y in strip] + [(0.0, 0.0, 0.0)] + [(x, y + 5.0, 0.0) for x, y in strip[:4]]
+        indices = list(range(6)) + [-1] + list(range(6, 10))
+        write_mesh_csv(self.path('strip.csv'), positions, indices=indices)
+        with open(self.path('strip.json'), 'w', encoding='utf-8') as f:
+            json.dump({'topology': 'TriangleStrip'}, f)
+
+        obj_path = self.path('strip.obj')
+        self.assertTrue(csv_to_obj.convert_csv_to_obj(self.path('strip.csv'), obj_path))
+        corners = [p for p, _ in read_obj_groups(obj_path)[None]]
+        triangles = [corners[i:i + 3] for i in range(0, len(corners), 3)]
+        self.assertEqual(len(triangles), 6)
+        for a, b, c in triangles:
+            cross = (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+            self.assertGreater(cross, 0)
+        # 重启行不构成三角形，也不与第二段条带相连
+        self.assertEqual(len({p[1] >= 5.0 for p in triangles[4] + triangles[5]}), 1)
+
+
+class GlbTestCase(CsvToObjTestCase):
+    """转换 .glb 并检查容器结构、缓冲视图范围与访问器 min/max"""
+    def convert(self, csv_path, **options):
+        glb_path = self.path('mesh.glb')
+        self.assertTrue(csv_to_obj.convert_csv_to_glb(csv_path, glb_path, **options))
+        with open(glb_path, 'rb') as f:
+            blob = f.read()
+
+        magic, version, length = struct.unpack_from('<4sII', blob)
+        self.assertEqual((magic, version, length), (b'glTF', 2, len(blob)))
+        json_length, json_type = struct.unpack_from('<II', blob, 12)
+        self.assertEqual((json_type, json_length % 4), (csv_to_obj.GLB_CHUNK_JSON, 0))
+        gltf = json.loads(blob[20:20 + json_length])
+        bin_length, bin_type = struct.unpack_from('<II', blob, 20 + json_length)
+        self.assertEqual((bin_type, bin_length % 4), (csv_to_obj.GLB_CHUNK_BIN, 0))
+        data = blob[28 + json_length:]
+        self.assertEqual(len(data), bin_length)
+        self.assertEqual(gltf['buffers'], [{'byteLength': bin_length}])
+
+        for view in gltf['bufferViews']:
+            self.assertEqual(view['byteOffset'] % 4, 0)
+            self.assertLessEqual(view['byteOffset'] + view['byteLength'], bin_length)
+        for accessor in gltf['accessors']:
+            view = gltf['bufferViews'][accessor['bufferView']]
+            size = GLTF_WIDTHS[accessor['type']] * struct.calcsize(GLTF_FORMATS[accessor['componentType']])
+            self.assertLessEqual((accessor['count'] - 1) * view.get('byteStride', size) + size, view['byteLength'])
+        return gltf, data
+
+    def check_bounds(self, gltf, data):
+        """每个未归一化的属性都带有与数据一致的 min/max"""
+        for index in gltf['meshes'][0]['primitives'][0]['attributes'].values():
+            accessor = gltf['accessors'][index]
+            if accessor.get('normalized'):
+                self.assertNotIn('min', accessor)
+                continue
+            columns = list(zip(*accessor_values(gltf, data, index)))
+            self.assertEqual(accessor['min'], [min(c) for c in columns])
+            self.assertEqual(accessor['max'], [max(c) for c in columns])
+
+
+class GlbTest(GlbTestCase):
+    """.glb 的顶点属性与索引"""
+    def test_vertices(self):
+        positions, uvs = random_triangles(20, 4)
+        write_mesh_csv(self.path('mesh.csv'), positions + positions[:2], uvs + uvs[:2])
+        gltf, data = self.convert(self.path('mesh.csv'))
+
+        primitive = gltf['meshes'][0]['primitives'][0]
+        self.assertEqual(primitive['mode'], csv_to_obj.GLTF_TRIANGLES)
+        self.assertNotIn('indices', primitive)
+        # 不完整的最后一个三角形被丢弃，UV 不翻转
+        self.assertEqual(accessor_values(gltf, data, primitive['attributes']['POSITION']), positions)
+        self.assertEqual(accessor_values(gltf, data, primitive['attributes']['TEXCOORD_0']), uvs)
+        self.check_bounds(gltf, data)
+
+    def test_indices(self):
+        positions, uvs = random_triangles(4, 5)
+        indices = [random.Random(5).randrange(6) for _ in range(12)]
+        write_mesh_csv(self.path('mesh.csv'), [positions[i] for i in indices], [uvs[i] for i in indices], indices)
+        gltf, data = self.convert(self.path('mesh.csv'), weld='idx')
+
+        primitive = gltf['meshes'][0]['primitives'][0]
+        self.assertEqual(gltf['accessors'][primitive['indices']]['componentType'], 5123)
+        refs = [i for i, in accessor_values(gltf, data, primitive['indices'])]
+        vertices = accessor_values(gltf, data, primitive['attributes']['POSITION'])
+        self.assertEqual(len(vertices), len(set(indices)))
+        self.assertEqual([vertices[r] for r in refs], [positions[i] for i in indices])
+        self.check_bounds(gltf, data)
+
+
+def shuffled_grid(size, seed):
+    """size x size 个顶点的网格，三角形顺序随机打乱；返回 (顶点位置, 三角形列表)"""
+    positions = [(x / 4.0, y / 4.0, (x * y % 5) / 8.0) for y in range(size) for x in range(size)]
+    triangles = []
+    for y in range(size - 1):
+        for x in range(size - 1):
+            v = y * size + x
+            triangles += [(v, v + 1, v + size), (v + size, v + 1, v + size + 1)]
+    random.Random(seed).shuffle(triangles)
+    return positions, triangles
+
+
+def canonical(triangles):
+    """三角形集合的规范形式: 每个三角形旋转到最小顶点在前 (保持绕序)，再排序"""
+    result = []
+    for t in triangles:
+        k = t.index(min(t))
+        result.append(tuple(t[k:]) + tuple(t[:k]))
+    return sorted(result)
+
+
+class OptimizeTest(GlbTestCase):
+    """Tipsify 重排、顶点重新编号与属性量化"""
+    def test_tipsify(self):
+        positions, triangles = shuffled_grid(24, 6)
+        indices = array.array('I', chain.from_iterable(triangles))
+        reordered = csv_to_obj.tipsify(indices, len(positions))
+        self.assertEqual(reordered.typecode, indices.typecode)
+        split = [tuple(reordered[i:i + 3]) for i in range(0, len(reordered), 3)]
+        self.assertEqual(canonical(split), canonical(triangles))
+        before, after = csv_to_obj.simulate_acmr(indices), csv_to_obj.simulate_acmr(reordered)
+        self.assertLess(after, before * 0.6)
+
+        # 重新编号后按首次使用的顺序引用顶点，三角形不变
+        renumbered, order = csv_to_obj.reorder_vertices(reordered, len(positions))
+        self.assertEqual(sorted(order), list(range(len(positions))))
+        first_use = list(dict.fromkeys(renumbered))
+        self.assertEqual(first_use, list(range(len(first_use))))
+        self.assertEqual([order[v] for v in renumbered], list(reordered))
+
+    def test_optimize(self):
+        positions, triangles = shuffled_grid(12, 7)
+        corners = list(chain.from_iterable(triangles))
+        write_mesh_csv(self.path('grid.csv'), [positions[v] for v in corners], indices=corners)
+        gltf, data = self.convert(self.path('grid.csv'), optimize=True)
+
+        primitive = gltf['meshes'][0]['primitives'][0]
+        refs = [i for i, in accessor_values(gltf, data, primitive['indices'])]
+        vertices = accessor_values(gltf, data, primitive['attributes']['POSITION'])
+        self.assertEqual(len(vertices), len(positions))
+        self.assertEqual(canonical(zip(*[iter(vertices[r] for r in refs)] * 3)),
+                         canonical(zip(*[iter(positions[v] for v in corners)] * 3)))
+        self.assertLess(csv_to_obj.simulate_acmr(refs), csv_to_obj.simulate_acmr(corners))
+        self.check_bounds(gltf, data)
+
+    def test_quantize(self):
+        positions, uvs = random_triangles(30, 8)
+        rng = random.Random(8)
+        normals = [tuple(rng.uniform(-1.0, 1.0) for _ in range(3)) for _ in positions]
+        write_mesh_csv(self.path('mesh.csv'), positions, uvs, normals=normals)
+        gltf, data = self.convert(self.path('mesh.csv'), quantize=True)
+        self.assertEqual(gltf['extensionsRequired'], [csv_to_obj.KHR_MESH_QUANTIZATION])
+
+        attributes = gltf['meshes'][0]['primitives'][0]['attributes']
+        # 位置通过节点变换还原，各属性的误差都不超过一个量化步长 (输入先存为 float32)
+        node = gltf['nodes'][0]
+        extent = max(max(c) - min(c) for c in zip(*positions)) / 2
+        decoded = accessor_values(gltf, data, attributes['POSITION'])
+        for q, p in zip(decoded, positions):
+            for k in range(3):
+                self.assertAlmostEqual(q[k] * node['scale'][k] + node['translation'][k], p[k],
+                                       delta=extent / 32767)
+        for name, expected, divisor in (('NORMAL', normals, 32767), ('TEXCOORD_0', uvs, 65535)):
+            accessor = gltf['accessors'][attributes[name]]
+            self.assertTrue(accessor['normalized'], name)
+            for q, p in zip(accessor_values(gltf, data, attributes[name]), expected):
+                for qk, pk in zip(q, p):
+                    self.assertAlmostEqual(qk / divisor, pk, delta=1.0 / divisor)
+        # VEC3 的 SHORT 分量每个顶点补齐到 8 字节
+        self.assertEqual(gltf['bufferViews'][gltf['accessors'][attributes['NORMAL']]['bufferView']]['byteStride'], 8)
+        self.check_bounds(gltf, data)
+
+
+class ParserTest(CsvToObjTestCase):
+    """整块读取的快速路径与逐行解析的输出一致"""
+    HEADER = 'VTX, IDX, POSITION.x, POSITION.y, POSITION.z, NORMAL.x, NORMAL.y, NORMAL.z, TEXCOORD0.x, TEXCOORD0.y'
+
+    def mesh_rows(self, count, seed):
+        rng = random.Random(seed)
+        corners = [[rng.randint(-99, 99) / 4.0 for _ in range(8)] for _ in range(count // 2)]
+        rows = []
+        for i in range(count):
+            # 约一半的行重复前面的顶点
+            values = rng.choice(corners) if rng.random() < 0.5 else [rng.randint(-99, 99) / 4.0 for _ in range(8)]
+            rows.append(', '.join(map(str, [i, i] + values)))
+        return rows
+
+    def vertex_lines(self, csv_path, topology):
+        obj_path = self.path(f'{topology}.obj')
+        self.assertIsNotNone(csv_to_obj.convert_csv_to_obj(csv_path, obj_path, topology=topology))
+        with open(obj_path, 'r', encoding='utf-8') as f:
+            return [line for line in f if line.startswith(('v ', 'vt ', 'vn '))]
+
+    def test_parity(self):
+        rows = self.mesh_rows(300, 1)
+        quoted = list(rows)
+        quoted[7] = ','.join(f'"{field.strip()}"' for field in rows[7].split(','))
+        cases = {
+            'plain.csv': '\n'.join([self.HEADER] + rows) + '\n',
+            'quoted.csv': '\n'.join([self.HEADER] + quoted) + '\n',
+            # Windows 换行，最后一行没有换行符
+            'crlf.csv': '\r\n'.join([self.HEADER] + rows),
+        }
+        for name, text in cases.items():
+            csv_path = self.path(name)
+            with open(csv_path, 'w', encoding='utf-8', newline='') as f:
+                f.write(text)
+            # 三角带拓扑走逐行解析的路径，顶点部分与列表拓扑相同
+            expected = self.vertex_lines(csv_path, 'strip')
+            self.assertEqual(len(expected), 300 * 3, name)
+            self.assertEqual(self.vertex_lines(csv_path, 'list'), expected, name)
+
+    def test_chunks(self):
+        rows = self.mesh_rows(200, 2)
+        text = '\n'.join(rows) + '\n'
+        # 块边界落在行中间时，行被完整拼接
+        for chunk_bytes in (7, 64, 1000):
+            chunks = list(csv_to_obj.iter_csv_chunks(io.StringIO(text), chunk_bytes))
+            self.assertEqual(sum(chunks, []), rows)
+
+        col_indices = csv_to_obj.find_column_indices([c.strip() for c in self.HEADER.split(',')])
+        keys = [row.split(',', 2)[2] for row in rows]
+        expected = csv_to_obj.VertexLineCache(col_indices, 2).lookup(keys)
+        # 缓存在块中途写满并清空时，结果不变
+        small = csv_to_obj.VertexLineCache(col_indices, 2, max_entries=40)
+        entries = []
+        for i in range(0, len(keys), 30):
+            entries += small.lookup(keys[i:i + 30])
+        self.assertEqual(entries, expected)
+        self.assertLessEqual(len(small), 40)
+
+
+class SceneTest(CsvToObjTestCase):
+    """合并场景的面索引偏移与实例复用"""
+    def test_offsets(self):
+        meshes = {}
+        # 事件 40 的网格与事件 10 内容相同
+        for event, count, seed in ((10, 6, 1), (20, 9, 2), (40, 6, 1)):
+            positions, uvs = random_triangles(count, seed)
+            write_mesh_csv(self.path(f'model_event{event}.csv'), positions, uvs)
+            meshes[f'model_event{event}'] = [(p, (u, 1.0 - v)) for p, (u, v) in zip(positions, uvs)]
+        # 缺少位置列的网格转换失败，不能在场景中留下顶点
+        with open(self.path('model_event30.csv'), 'w', encoding='utf-8') as f:
+            f.write('VTX, IDX, TEXCOORD0.x, TEXCOORD0.y\n0, 0, 0.5, 0.5\n')
+
+        files = [self.path(f'model_event{event}.csv') for event in (40, 30, 20, 10)]
+        scene = self.path('scene.obj')
+        result = csv_to_obj.convert_scene(files, scene)
+        self.assertEqual((result['draws'], result['meshes'], result['instances'], result['failed']), (3, 2, 1, 1))
+
+        groups = read_obj_groups(scene)
+        self.assertEqual(sorted(groups), sorted(meshes))
+        for name, corners in meshes.items():
+            self.assertEqual(groups[name], corners, name)
+
+        # 实例只重复写出面，不重复写出顶点
+        with open(scene, 'r', encoding='utf-8') as f:
+            vertex_lines = sum(1 for line in f if line.startswith('v '))
+        self.assertEqual(vertex_lines, result['vertices'])
+        self.assertEqual(vertex_lines, len(meshes['model_event10']) + len(meshes['model_event20']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,414 @@
+# Tests for RenderDocExport.py. Runs without RenderDoc: the exporter is
+# imported against benchmarks/stub_renderdoc.py and replays synthetic captures.
+#
+#   python -m unittest discover tests
+
+import csv
+import json
+import os
+import random
+import shutil
+import sqlite3
+import struct
+import sys
+import tempfile
+import unittest
+
+testDir = os.path.dirname(os.path.abspath(__file__))
+repoDir = os.path.dirname(testDir)
+benchDir = os.path.join(repoDir, "benchmarks")
+
+sys.path.insert(0, benchDir)
+sys.path.insert(0, repoDir)
+import stub_renderdoc as rd
+sys.modules.setdefault("renderdoc", rd)
+import RenderDocExport as exporter
+
+# (compType name, byte width, component count, BGRA order)
+parityFormats = [
+	("UNorm", 1, 4, False),
+	("UNorm", 1, 4, True),
+	("UNorm", 2, 2, False),
+	("SNorm", 1, 4, False),
+	("SNorm", 2, 4, False),
+	("UInt", 2, 1, False),
+	("UInt", 4, 3, False),
+	("SInt", 4, 2, False),
+	("Float", 2, 2, False),
+	("Float", 4, 3, False),
+	("Float", 8, 2, False),
+]
+
+def randomRaw(compTypeName, compByteWidth, count):
+	"""Random raw component values for a format, including the extremes of integer types"""
+	if compTypeName == "Float":
+		return [random.uniform(-100.0, 100.0) for _ in range(count)]
+	bits = compByteWidth * 8
+	if compTypeName in ("SNorm", "SInt"):
+		return [random.choice([-(2 ** (bits - 1)), 2 ** (bits - 1) - 1, random.randint(-(2 ** (bits - 1)), 2 ** (bits - 1) - 1)])
+			for _ in range(count)]
+	return [random.choice([0, 2 ** bits - 1, random.randint(0, 2 ** bits - 1)]) for _ in range(count)]
+
+def gridCapture(numDraws, trianglesPerDraw=4, eventStep=10):
+	"""
+	Capture description for controllerFromSpec: numDraws indexed draws under a
+	marker, eventStep events apart, reading POSITION/NORMAL from one interleaved
+	buffer and TEXCOORD0 from a second one
+	"""
+	random.seed(7)
+	numVertices = 64
+	vb0 = b"".join(struct.pack("<6f", *[random.uniform(-1.0, 1.0) for _ in range(6)]) for _ in range(numVertices))
+	vb1 = b"".join(struct.pack("<2H", random.randrange(65536), random.randrange(65536)) for _ in range(numVertices))
+	indices = [random.randrange(numVertices) for _ in range(numDraws * trianglesPerDraw * 3)]
+	draws = [{"eventId": 10 + eventStep * i, "name": "Draw{0}".format(i), "flags": ["Drawcall", "Indexed"],
+		"numIndices": trianglesPerDraw * 3, "indexOffset": i * trianglesPerDraw * 3} for i in range(numDraws)]
+	return {
+		"buffers": {"1": vb0.hex(), "2": struct.pack("<{0}H".format(len(indices)), *indices).hex(), "3": vb1.hex()},
+		"indexBuffer": {"resourceId": 2, "byteStride": 2},
+		"vertexBuffers": [{"resourceId": 1, "byteStride": 24}, {"resourceId": 3, "byteStride": 4}],
+		"attributes": [
+			{"name": "POSITION", "vertexBuffer": 0, "byteOffset": 0, "compType": "Float", "compByteWidth": 4, "compCount": 3},
+			{"name": "NORMAL", "vertexBuffer": 0, "byteOffset": 12, "compType": "Float", "compByteWidth": 4, "compCount": 3},
+			{"name": "TEXCOORD0", "vertexBuffer": 1, "byteOffset": 0, "compType": "UNorm", "compByteWidth": 2, "compCount": 2},
+		],
+		"actions": [{"eventId": 5, "name": "Frame", "flags": ["PushMarker"], "children": draws}],
+	}
+
+def instancedCapture(before, after):
+	"""
+	Two identical instanced draws at events 10 and 20, with a CPU write to the
+	per-instance OFFSET buffer at event 15
+	"""
+	spec = gridCapture(1)
+	draw = dict(spec["actions"][0]["children"][0], numInstances=len(before) // 3, flags=["Drawcall", "Indexed", "Instanced"])
+	spec["actions"][0]["children"] = [dict(draw, eventId=10, name="Draw0"), dict(draw, eventId=20, name="Draw1")]
+	spec["buffers"]["4"] = struct.pack("<{0}f".format(len(before)), *before).hex()
+	spec["vertexBuffers"].append({"resourceId": 4, "byteStride": 12})
+	spec["attributes"].append({"name": "OFFSET", "vertexBuffer": 2, "byteOffset": 0, "compType": "Float",
+		"compByteWidth": 4, "compCount": 3, "perInstance": True, "instanceRate": 1})
+	spec["writes"] = [{"eventId": 15, "resourceId": 4, "data": struct.pack("<{0}f".format(len(after)), *after).hex()}]
+	return spec
+
+class ExportTestCase(unittest.TestCase):
+	"""Runs each test against a fresh output folder with the default configuration"""
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		self.config = dict((name, getattr(exporter, name)) for name in exporter.configNames)
+		exporter.folderName = self.folder
+		exporter.startIndex = 0
+		exporter.endIndex = 1000000
+		exporter.writerThreads = 0
+		exporter.meshCacheFolder = None
+		# Only draws, not the markers around them
+		exporter.requireFlags = "Drawcall"
+
+	def tearDown(self):
+		for name, value in self.config.items():
+			setattr(exporter, name, value)
+		shutil.rmtree(self.folder, ignore_errors=True)
+
+	def export(self, controller):
+		"""Export every draw of a stub controller, hiding the progress output"""
+		with open(os.devnull, "w") as devnull:
+			stdout = sys.stdout
+			sys.stdout = devnull
+			try:
+				exporter.sampleCode(controller)
+			finally:
+				sys.stdout = stdout
+
+	def readModels(self, folder=None):
+		"""Contents of every file in the models folder, by name"""
+		modelsFolder = os.path.join(folder or self.folder, "models")
+		files = {}
+		for name in sorted(os.listdir(modelsFolder)):
+			with open(os.path.join(modelsFolder, name), "rb") as modelFile:
+				files[name] = modelFile.read()
+		return files
+
+class DecodeParityTest(unittest.TestCase):
+	"""decodeAttribute must match unpackData bit for bit"""
+	def testParity(self):
+		random.seed(1)
+		for compTypeName, width, count, bgra in parityFormats:
+			fmt = rd.ResourceFormat(getattr(rd.CompType, compTypeName), width, count, bgra)
+			size = width * count
+			for stride, offset in ((size, 0), (size + 8, 4), (0, 0)):
+				baseIndex = 3
+				numVertices = 40
+				elementStride = stride or size
+				data = bytearray(offset + elementStride * numVertices + size)
+				for vertex in range(numVertices):
+					packed = rd.packValues(fmt.compType, width, randomRaw(compTypeName, width, count))
+					start = offset + vertex * elementStride
+					data[start:start + size] = packed
+				data = bytes(data)
+				indices = [baseIndex + random.randrange(1 if stride == 0 else numVertices) for _ in range(300)]
+
+				decoded = exporter.decodeAttribute(fmt, data, stride, offset, indices, True, baseIndex)
+				expected = [exporter.unpackData(fmt, data, offset + (index - baseIndex) * stride) for index in indices]
+				# repr tells apart -0.0 and 0.0
+				self.assertEqual(repr(decoded), repr(expected),
+					"{0}{1}x{2} bgra={3} stride={4}".format(compTypeName, width * 8, count, bgra, stride))
+
+	def testRestart(self):
+		fmt = rd.ResourceFormat(rd.CompType.Float, 4, 3)
+		data = struct.pack("<9f", *range(9))
+		decoded = exporter.decodeAttribute(fmt, data, 12, 0, [2, -1, 0], True, 0)
+		self.assertEqual(decoded, [(6.0, 7.0, 8.0), (0, 0, 0), (0.0, 1.0, 2.0)])
+
+class BufferCacheTest(unittest.TestCase):
+	"""BufferCache range lookups against a linear scan of every cached range"""
+	def testRanges(self):
+		random.seed(5)
+		size = 4096
+		writes = [(eventId, 1, bytes(random.randrange(256) for _ in range(size))) for eventId in (30, 70)]
+		controller = rd.StubController({1: bytes(random.randrange(256) for _ in range(size))}, writes=writes)
+		cache = exporter.BufferCache(controller)
+		for eventId in sorted(random.randrange(100) for _ in range(2000)):
+			controller.SetFrameEvent(eventId, False)
+			offset = random.randrange(size)
+			byteSize = random.choice([0, random.randrange(1, 64), random.randrange(1, 1024)])
+			# Only whole-buffer ranges cover the rest of the buffer
+			covered = any(start <= offset and (cachedSize == 0 or 0 < byteSize <= start + cachedSize - offset)
+				and cache.isUnchanged(rd.ResourceId(1), fetchedAt, eventId)
+				for (rid, start, cachedSize), (data, fetchedAt) in cache.buffers.items())
+
+			fetchCount = cache.fetchCount
+			data = cache.get(rd.ResourceId(1), offset, eventId, byteSize)
+			self.assertEqual(data, controller.GetBufferData(rd.ResourceId(1), offset, byteSize))
+			self.assertEqual(cache.fetchCount == fetchCount, covered)
+
+class FetchCountTest(ExportTestCase):
+	"""Each bound buffer is fetched once per draw, and not again while unchanged"""
+	def testOneFetchPerBuffer(self):
+		controller = rd.controllerFromSpec(gridCapture(1))
+		self.export(controller)
+		# Index buffer plus the two vertex buffers, however many attributes read them
+		self.assertEqual(controller.bufferDataCalls, 3)
+
+	def testReuseAcrossDraws(self):
+		exporter.reuseAcrossDraws = False
+		controller = rd.controllerFromSpec(gridCapture(5))
+		self.export(controller)
+		self.assertEqual(controller.frameEvents, [10, 20, 30, 40, 50])
+		self.assertEqual(controller.bufferDataCalls, 3 * 5)
+		expected = self.readModels()
+
+		# The stub never writes to a buffer, so ranges fetched by earlier draws are sliced
+		exporter.reuseAcrossDraws = True
+		controller = rd.controllerFromSpec(gridCapture(5))
+		self.export(controller)
+		self.assertLess(controller.bufferDataCalls, 3 * 5)
+		self.assertEqual(self.readModels(), expected)
+
+	def testInstanceBufferWrite(self):
+		# Draw 20 matches draw 10 except for the instance buffer written in between
+		before = [float(i) for i in range(6)]
+		after = [float(-i) for i in range(6)]
+		self.export(rd.controllerFromSpec(instancedCapture(before, after)))
+		for eventId, values in ((10, before), (20, after)):
+			with open(os.path.join(self.folder, "models", "model_event{0}_instances.csv".format(eventId)), "r") as csvFile:
+				rows = list(csv.reader(csvFile))
+			self.assertEqual(rows[0], ["INST", "IDX", "OFFSET.x", "OFFSET.y", "OFFSET.z"])
+			self.assertEqual([float(value) for row in rows[1:] for value in row[2:]], values)
+
+	def testSkippedSeeks(self):
+		# Back-to-back draws: every other one follows the event the controller is at
+		exporter.exportTextures = False
+		exporter.forceReplay = True
+		controller = rd.controllerFromSpec(gridCapture(5, eventStep=1))
+		self.export(controller)
+		self.assertEqual(controller.frameEvents, [10, 11, 12, 13, 14])
+		expected = self.readModels()
+
+		exporter.forceReplay = False
+		controller = rd.controllerFromSpec(gridCapture(5, eventStep=1))
+		self.export(controller)
+		self.assertEqual(controller.frameEvents, [10, 12, 14])
+		self.assertEqual(exporter.replayStats["skipped"], 2)
+		self.assertEqual(self.readModels(), expected)
+
+		# Draws that save textures are always replayed
+		exporter.exportTextures = True
+		controller = rd.controllerFromSpec(gridCapture(5, eventStep=1))
+		self.export(controller)
+		self.assertEqual(controller.frameEvents, [10, 11, 12, 13, 14])
+
+	def testValues(self):
+		spec = gridCapture(2)
+		self.export(rd.controllerFromSpec(spec))
+		buffers = dict((int(rid), bytes.fromhex(data)) for rid, data in spec["buffers"].items())
+		indices = struct.unpack("<24H", buffers[2])
+		with open(os.path.join(self.folder, "models", "model_event20.csv"), "r") as csvFile:
+			rows = list(csv.reader(csvFile))
+		self.assertEqual(rows[0][:5], ["VTX", "IDX", "POSITION.x", "POSITION.y", "POSITION.z"])
+		self.assertEqual(len(rows), 13)
+		for row, index in zip(rows[1:], indices[12:]):
+			self.assertEqual(int(row[1]), index)
+			position = struct.unpack_from("<3f", buffers[1], index * 24)
+			self.assertEqual([float(value) for value in row[2:5]], list(position))
+			u, v = struct.unpack_from("<2H", buffers[3], index * 4)
+			self.assertEqual([float(value) for value in row[8:10]], [u / 65535.0, v / 65535.0])
+
+class MeshCacheTest(ExportTestCase):
+	"""Exports through the on-disk mesh cache"""
+	def allFiles(self):
+		return sorted(os.path.relpath(os.path.join(root, name), self.folder)
+			for root, dirs, names in os.walk(self.folder) for name in names)
+
+	def testExportTwice(self):
+		exporter.meshCacheFolder = os.path.join(self.folder, "cache")
+		self.export(rd.controllerFromSpec(gridCapture(3)))
+		expected = self.readModels()
+		files = self.allFiles()
+
+		# The second run finds every draw in the cache, already linked into the models folder
+		self.export(rd.controllerFromSpec(gridCapture(3)))
+		self.assertEqual(exporter.meshCache.hitCount, 3)
+		self.assertEqual(self.readModels(), expected)
+		self.assertEqual(self.allFiles(), files)
+		self.assertFalse([name for name in files if name.endswith(".tmp")])
+
+def postVSCapture(outputs=True, inputs=True):
+	"""
+	One draw whose post-VS stream holds a clip-space position and a TEXCOORD0
+	output for each of its 12 vertices, with its own 16-bit index buffer
+	"""
+	spec = gridCapture(1)
+	random.seed(11)
+	numVertices = 12
+	vsout = b"".join(struct.pack("<6f", *[random.uniform(-1.0, 1.0) for _ in range(6)]) for _ in range(numVertices))
+	spec["buffers"]["10"] = vsout.hex()
+	spec["buffers"]["11"] = struct.pack("<12H", *reversed(range(numVertices))).hex()
+	spec["postVS"] = {"vertexResourceId": 10, "vertexByteStride": 24, "indexResourceId": 11, "indexByteStride": 2,
+		"numIndices": numVertices, "outputs": [{"name": "TEXCOORD0", "compCount": 2},
+		{"name": "SV_Position", "compCount": 4, "position": True}] if outputs else []}
+	if not inputs:
+		spec["attributes"] = []
+	return spec
+
+class PostVSTest(ExportTestCase):
+	"""meshStage = "vsout" and its fallbacks"""
+	def setUp(self):
+		ExportTestCase.setUp(self)
+		exporter.meshStage = "vsout"
+
+	def readRows(self):
+		with open(os.path.join(self.folder, "models", "model_event10.csv"), "r") as csvFile:
+			return list(csv.reader(csvFile))
+
+	def testOutputs(self):
+		spec = postVSCapture()
+		self.export(rd.controllerFromSpec(spec))
+		vsout = bytes.fromhex(spec["buffers"]["10"])
+		rows = self.readRows()
+		# Position first, then the other outputs in signature order
+		self.assertEqual(rows[0], ["VTX", "IDX", "SV_Position.x", "SV_Position.y", "SV_Position.z", "SV_Position.w",
+			"TEXCOORD0.x", "TEXCOORD0.y"])
+		self.assertEqual(len(rows), 13)
+		for row, index in zip(rows[1:], reversed(range(12))):
+			self.assertEqual(int(row[1]), index)
+			self.assertEqual([float(value) for value in row[2:]], list(struct.unpack_from("<6f", vsout, index * 24)))
+
+	def testFallback(self):
+		# Without outputs the draw exports its vertex inputs
+		self.export(rd.controllerFromSpec(postVSCapture(outputs=False)))
+		expected = self.readModels()
+		exporter.meshStage = "vsin"
+		self.export(rd.controllerFromSpec(postVSCapture(outputs=False)))
+		self.assertEqual(self.readModels(), expected)
+
+	def testNoInputs(self):
+		# Outputs without vertex inputs are exported, and a draw with neither is skipped
+		self.export(rd.controllerFromSpec(postVSCapture(inputs=False)))
+		self.assertEqual(len(self.readRows()), 13)
+		shutil.rmtree(os.path.join(self.folder, "models"))
+		self.export(rd.controllerFromSpec(postVSCapture(outputs=False, inputs=False)))
+		self.assertFalse(os.path.exists(os.path.join(self.folder, "models", "model_event10.csv")))
+
+class DrawIndexTest(unittest.TestCase):
+	"""The flattened action index on a synthetic tree"""
+	def buildTree(self, depth):
+		# A marker chain deeper than the recursion limit, with a draw at every level
+		root = rd.StubAction(1, "Marker1", flags=rd.ActionFlags.PushMarker)
+		parent = root
+		eventId = 2
+		for level in range(depth):
+			draw = rd.StubAction(eventId, "Draw{0}".format(eventId), flags=rd.ActionFlags.Drawcall, numIndices=3)
+			marker = rd.StubAction(eventId + 1, "Marker{0}".format(eventId + 1), flags=rd.ActionFlags.PushMarker)
+			parent.children = [draw, marker]
+			parent = marker
+			eventId += 2
+		return [root, rd.StubAction(eventId, "Present", flags=rd.ActionFlags.Present)]
+
+	def testDeepTree(self):
+		depth = sys.getrecursionlimit() * 2
+		roots = self.buildTree(depth)
+		index = exporter.DrawIndex(roots)
+		lastEventId = 2 * depth + 2
+		self.assertEqual(index.eventIds, list(range(1, lastEventId + 1)))
+		self.assertIs(index.find(lastEventId), roots[1])
+		self.assertIsNone(index.find(lastEventId + 1))
+
+		draws = index.range(100, 110)
+		self.assertEqual([draw.eventId for draw in draws], list(range(100, 111)))
+		self.assertEqual(index.range(lastEventId + 1, lastEventId + 10), [])
+
+		path = index.path(index.find(6)).split("/")
+		self.assertEqual(path, ["Marker1", "Marker3", "Marker5", "Draw6"])
+		self.assertEqual(len(index.path(index.find(lastEventId - 1)).split("/")), depth + 1)
+
+	def testFilterSelect(self):
+		roots = self.buildTree(10)
+		index = exporter.DrawIndex(roots)
+		draws = exporter.DrawFilter(include="Marker5/", requireFlags="Drawcall").select(index.range(0, 100), index)
+		self.assertEqual([draw.eventId for draw in draws], [6, 8, 10, 12, 14, 16, 18, 20])
+
+class ShardTest(ExportTestCase):
+	"""A sharded export writes the same files as a single process"""
+	def testSplitAndMerge(self):
+		spec = gridCapture(7)
+		self.export(rd.controllerFromSpec(spec))
+		expected = self.readModels()
+		with open(os.path.join(self.folder, "manifest.json"), "r") as manifestFile:
+			expectedDraws = json.load(manifestFile)["draws"]
+
+		# Shard processes open the capture through a module named renderdoc
+		stubFolder = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, stubFolder, True)
+		shutil.copyfile(os.path.join(benchDir, "stub_renderdoc.py"), os.path.join(stubFolder, "renderdoc.py"))
+		capturePath = os.path.join(stubFolder, "capture.json")
+		with open(capturePath, "w") as captureFile:
+			json.dump(spec, captureFile)
+
+		shardedFolder = os.path.join(self.folder, "sharded")
+		exporter.folderName = shardedFolder
+		sys.path.insert(0, stubFolder)
+		try:
+			with open(os.devnull, "w") as devnull:
+				stdout = sys.stdout
+				sys.stdout = devnull
+				try:
+					exporter.runShardedExport(capturePath, 3)
+				finally:
+					sys.stdout = stdout
+		finally:
+			sys.path.remove(stubFolder)
+
+		self.assertEqual(self.readModels(shardedFolder), expected)
+		with open(os.path.join(shardedFolder, "manifest.json"), "r") as manifestFile:
+			manifest = json.load(manifestFile)
+		self.assertEqual(manifest["shards"], 3)
+		self.assertEqual(manifest["draws"], expectedDraws)
+		self.assertFalse(os.path.exists(os.path.join(shardedFolder, exporter.shardFolderName)))
+
+		catalog = sqlite3.connect(os.path.join(shardedFolder, exporter.catalogName))
+		try:
+			eventIds = [row[0] for row in catalog.execute("SELECT eventId FROM draws ORDER BY eventId")]
+		finally:
+			catalog.close()
+		self.assertEqual(eventIds, [10 + 10 * i for i in range(7)])
+
+if __name__ == "__main__":
+	unittest.main()